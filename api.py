@@ -1,13 +1,12 @@
 from __future__ import annotations
-import duckdb
 from fastapi import FastAPI, Query
+from certus.storage.service import get_service
 # NOTE: no need for JSONResponse; FastAPI will encode datetimes automatically
 
 app = FastAPI(title="Certus Trend API", version="1.0")
 DB_PATH = "data/markets.duckdb"
 
 def fetch_trends(symbol: str | None = None, limit: int = 20):
-    con = duckdb.connect(DB_PATH)
     sql = """
       SELECT kind,
              ts,                                -- timestamp; FastAPI encodes to ISO8601
@@ -25,9 +24,9 @@ def fetch_trends(symbol: str | None = None, limit: int = 20):
         sym_clause="AND upper(symbol_clean)=upper(?)" if symbol else "",
         lim=max(1, min(limit, 200))
     )
-    rows = con.execute(sql, [symbol] if symbol else []).fetchall()
-    cols = [d[0] for d in con.description]
-    con.close()
+    with get_service(DB_PATH, read_only=True).reader() as cur:
+        rows = cur.execute(sql, [symbol] if symbol else []).fetchall()
+        cols = [d[0] for d in cur.description]
     return [dict(zip(cols, r)) for r in rows]
 
 @app.get("/")
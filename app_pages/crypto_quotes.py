@@ -1,13 +1,12 @@
-import os, duckdb, pandas as pd, streamlit as st
+import os, pandas as pd, streamlit as st
+from certus.storage.service import get_service
 
 DB_PATH = os.getenv("DUCKDB_PATH", "./data/certus.duckdb")
 
 @st.cache_data(ttl=60)
 def load_quotes():
-    con = duckdb.connect(DB_PATH, read_only=True)
-    df = con.execute("select * from v_top_mcap").fetchdf()
-    con.close()
-    return df
+    with get_service(DB_PATH, read_only=True).reader() as con:
+        return con.execute("select * from v_top_mcap").fetchdf()
 
 def render():
     st.title("Crypto Quotes (CoinGecko)")
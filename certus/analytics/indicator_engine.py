@@ -0,0 +1,270 @@
+# certus/analytics/indicator_engine.py
+"""
+Vectorized EMA / RSI / MACD over many series at once.
+
+Rows are sorted once by (key, ts) so every series is a contiguous segment of
+one NumPy array. The recursive filters are evaluated in closed form over
+fixed-size blocks of every segment at once (see ewm), so there is no
+per-series Python call and no per-group frame copy; the only Python-level
+loop carries one value per block, max_len / block steps, not one per row.
+
+Results match the pandas definitions used elsewhere in the repo:
+  * EMA:  Series.ewm(span=n, adjust=False[, min_periods=n]).mean()
+  * RSI:  Wilder smoothing (ewm alpha=1/n) or a simple rolling mean
+  * MACD: EMA12 - EMA26, signal = EMA9 of MACD starting at its first value
+
+Wilder-mode filters can also continue from saved per-series state (STATE_COLS),
+which is how analytics.indicator_state advances only new rows each run.
+"""
+from __future__ import annotations
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+INDICATOR_COLS = ["rsi_14", "ema_9", "ema_20", "macd", "macd_signal", "macd_hist"]
+
+
+STATE_COLS = ["n", "last_price", "ema_9", "ema_20", "ema_12", "ema_26", "macd_signal", "avg_gain", "avg_loss"]
+
+
+class Segments:
+    """Boundaries of contiguous runs of equal keys in a sorted key array."""
+
+    def __init__(self, keys: np.ndarray):
+        n = len(keys)
+        if n:
+            change = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            self.starts = np.concatenate(([0], change)).astype(np.int64)
+        else:
+            self.starts = np.empty(0, dtype=np.int64)
+        self.lengths = np.diff(np.append(self.starts, n))
+        self.ends = self.starts + self.lengths - 1
+        self.order = np.argsort(-self.lengths, kind="stable")
+        self.by_len_starts = self.starts[self.order]
+        self._neg_len = -self.lengths[self.order]       # ascending
+        self.max_len = int(self.lengths.max()) if n else 0
+        # position of each row inside its segment
+        self.pos = np.arange(n) - np.repeat(self.starts, self.lengths)
+        self._blocks: Dict[int, tuple] = {}
+
+    def active(self, k: int) -> int:
+        """Number of segments longer than k (they are a prefix of by_len_starts)."""
+        return int(np.searchsorted(self._neg_len, -k, side="left"))
+
+    def blocks(self, size: int) -> tuple:
+        """
+        Every segment cut into blocks of `size` rows, as a (blocks, size) layout:
+        (blocks per segment, first block of each segment, row -> flat cell).
+        """
+        if size not in self._blocks:
+            n_blocks = (self.lengths + size - 1) // size
+            block0 = np.cumsum(n_blocks) - n_blocks
+            cell = (self.per_row(block0) + self.pos // size) * size + self.pos % size
+            self._blocks[size] = (n_blocks, block0, cell)
+        return self._blocks[size]
+
+    def per_row(self, v: np.ndarray) -> np.ndarray:
+        """Broadcast one value per segment to every row of the segment."""
+        return np.repeat(v, self.lengths)
+
+    def shift(self, x: np.ndarray, first: Optional[np.ndarray] = None) -> np.ndarray:
+        """x lagged by one row within each segment; row 0 gets `first` (or NaN)."""
+        out = np.empty_like(x, dtype=np.float64)
+        out[1:] = x[:-1]
+        out[self.starts] = np.nan if first is None else first
+        return out
+
+
+EWM_BLOCK = 128
+
+
+def ewm(x: np.ndarray, seg: Segments, alpha: float, init: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Per segment: y[k] = (1 - alpha) * y[k-1] + alpha * x[k], continuing from
+    `init` (one value per segment, NaN = no state). The filter starts at the
+    first non-NaN x and holds its value across NaN inputs, like
+    Series.ewm(adjust=False) on leading NaNs. No min_periods masking.
+
+    Each segment is cut into blocks of L rows (Segments.blocks). Measured from a
+    reference level r (the segment's first value for its first block, else the
+    block's first input), the recursion inside a block has the closed form
+        y[c] - r = w**n[c] * (d_in + sum_{i<=c} alpha * (x[i] - r) / w**n[i])
+    with w = 1 - alpha, n[c] the number of non-NaN inputs so far and d_in the
+    deviation entering the block: two cumsums along the block axis for all
+    blocks at once. Only d_in is carried in Python, max_len / L steps instead
+    of max_len. A constant series stays exactly constant.
+    """
+    if not 0.0 < alpha < 1.0:
+        raise ValueError(f"alpha must be in (0, 1), got {alpha}")
+    n = len(x)
+    if not n:
+        return np.full(0, np.nan)
+    keep = 1.0 - alpha
+    # w**-L must stay finite: shorter blocks only for very fast filters
+    L = int(min(EWM_BLOCK, max(1, 600 / -np.log(keep))))
+    valid = ~np.isnan(x)
+    dense = bool(valid.all())
+    y0 = np.full(len(seg.starts), np.nan) if init is None else np.array(init, dtype=np.float64)
+    # a segment without state is seeded by its first non-NaN x, which then filters to itself
+    first = seg.starts if dense else np.minimum.reduceat(np.where(valid, np.arange(n), n), seg.starts)
+    fresh = np.isnan(y0) & (first < n)
+    y0[fresh] = x[first[fresh]]
+
+    n_blocks, block0, cell = seg.blocks(L)
+    xs = np.zeros(int(n_blocks.sum()) * L)
+    xs[cell] = x
+    xs = xs.reshape(-1, L)
+    ref = xs[:, 0].copy()
+    ref[block0] = y0
+    powers = keep ** np.arange(L + 1)
+    if dense:
+        # padding after a segment's last row is counted too; only its unused carry sees it
+        cnt = np.arange(1, L + 1)
+        acc = xs - ref[:, None]
+    else:
+        ref[np.isnan(ref)] = 0.0
+        ref[block0] = y0
+        stepped = np.zeros(xs.size, dtype=bool)
+        stepped[cell] = valid
+        stepped = stepped.reshape(-1, L)
+        cnt = stepped.cumsum(axis=1)
+        acc = np.where(stepped, xs - ref[:, None], 0.0)
+    acc *= (alpha / powers)[cnt]
+    acc = acc.cumsum(axis=1)
+    decay = powers[cnt]
+
+    # a block's last column maps its entry deviation to the next block's
+    gain = np.broadcast_to(decay, acc.shape)[:, -1]
+    carry = gain * acc[:, -1] + ref
+    d_in = np.zeros(len(ref))
+    for j in range(1, int(n_blocks.max())):
+        i = block0[seg.order[:seg.active(j * L)]] + j
+        d_in[i] = gain[i - 1] * d_in[i - 1] + carry[i - 1] - ref[i]
+    acc += d_in[:, None]
+    acc *= decay
+    acc += ref[:, None]
+    y = acc.ravel()[cell]
+    if not dense:
+        y[seg.pos < seg.per_row(np.where(fresh, first - seg.starts, 0))] = np.nan
+    return y
+
+
+def rolling_mean(x: np.ndarray, seg: Segments, window: int) -> np.ndarray:
+    """
+    Per-segment Series.rolling(window).mean() for NaN-free x. Each window is
+    summed on its own (no global cumsum), so a series' precision does not
+    depend on the magnitude of the series sorted before it.
+    """
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window).sum(axis=1) / window
+    out[seg.pos < window - 1] = np.nan          # windows reaching into the previous segment
+    return out
+
+
+def _span(n: int) -> float:
+    return 2.0 / (n + 1.0)
+
+
+def indicator_arrays(price: np.ndarray, seg: Segments, warmup: bool = True, rsi_mode: str = "wilder",
+                     rsi_period: int = 14, state: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    Indicator columns for prices sorted by (key, ts), plus the unmasked
+    recursive state (ema_12/26, raw signal, avg_gain/loss) under "_raw".
+
+    warmup=True masks outputs until they have as many observations as their
+    span (min_periods=span). `state` (STATE_COLS, one value per segment)
+    continues each series from a previous run instead of from its first row;
+    `n` is the number of prices already consumed.
+    """
+    price = price.astype(np.float64)
+    st = state or {}
+    init = lambda c: st.get(c)
+    seen = seg.per_row(np.asarray(st["n"], np.int64)) if "n" in st else 0
+    gpos = seen + seg.pos                     # position in the full history
+    w = (lambda n: n - 1) if warmup else (lambda n: 0)
+
+    raw = {
+        "ema_9": ewm(price, seg, _span(9), init("ema_9")),
+        "ema_20": ewm(price, seg, _span(20), init("ema_20")),
+        "ema_12": ewm(price, seg, _span(12), init("ema_12")),
+        "ema_26": ewm(price, seg, _span(26), init("ema_26")),
+    }
+    macd_raw = raw["ema_12"] - raw["ema_26"]
+    macd = np.where(gpos >= w(26), macd_raw, np.nan)
+    raw["macd_signal"] = ewm(macd, seg, _span(9), init("macd_signal"))   # starts at first MACD
+
+    out: Dict[str, np.ndarray] = {
+        "ema_9": np.where(gpos >= w(9), raw["ema_9"], np.nan),
+        "ema_20": np.where(gpos >= w(20), raw["ema_20"], np.nan),
+        "macd": macd,
+        "macd_signal": np.where(gpos >= w(26) + w(9), raw["macd_signal"], np.nan),
+    }
+    out["macd_hist"] = out["macd"] - out["macd_signal"]
+
+    delta = price - seg.shift(price, init("last_price"))
+    if rsi_mode == "wilder":
+        gain = np.clip(delta, 0, None)
+        loss = np.clip(-delta, 0, None)
+        raw["avg_gain"] = ewm(gain, seg, 1.0 / rsi_period, init("avg_gain"))
+        raw["avg_loss"] = ewm(loss, seg, 1.0 / rsi_period, init("avg_loss"))
+        ready = gpos >= rsi_period            # rsi_period deltas seen
+        avg_gain = np.where(ready, raw["avg_gain"], np.nan)
+        avg_loss = np.where(ready, raw["avg_loss"], np.nan)
+    elif rsi_mode == "sma":
+        if state is not None:
+            raise ValueError("rsi_mode='sma' cannot be continued from state")
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        avg_gain = rolling_mean(gain, seg, rsi_period)
+        avg_loss = rolling_mean(loss, seg, rsi_period)
+    else:
+        raise ValueError("rsi_mode must be 'wilder' or 'sma'")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+        out["rsi_14"] = 100 - (100 / (1 + rs))
+    out["_raw"] = raw
+    return out
+
+
+def final_state(price: np.ndarray, seg: Segments, arrays: Dict[str, np.ndarray],
+                state: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """STATE_COLS after the last row of each segment (input to the next run)."""
+    raw = arrays["_raw"]
+    prev_n = np.asarray(state["n"], np.int64) if state and "n" in state else 0
+    out = {c: raw[c][seg.ends] for c in STATE_COLS if c in raw}
+    out["n"] = prev_n + seg.lengths
+    out["last_price"] = np.asarray(price, np.float64)[seg.ends]
+    return out
+
+
+def compute_indicators(df: pd.DataFrame, key: str = "id", ts: str = "ts", warmup: bool = True,
+                       rsi_mode: str = "wilder", keys_sorted: bool = False) -> pd.DataFrame:
+    """
+    Sort by (key, ts) once and add INDICATOR_COLS for every series. Returns a
+    new frame (original columns + indicators) in (key, ts) order.
+    """
+    if not keys_sorted:
+        df = df.sort_values([key, ts], kind="stable")
+    df = df.reset_index(drop=True)
+    seg = Segments(df[key].to_numpy())
+    cols = indicator_arrays(df["price"].to_numpy(dtype=np.float64, na_value=np.nan), seg,
+                            warmup=warmup, rsi_mode=rsi_mode)
+    return df.assign(**{c: cols[c] for c in INDICATOR_COLS})
+
+
+def latest_per_key(df: pd.DataFrame, key: str = "id") -> pd.DataFrame:
+    """Last row of each segment of a (key, ts)-sorted frame."""
+    if df.empty:
+        return df
+    seg = Segments(df[key].to_numpy())
+    return df.iloc[seg.ends].reset_index(drop=True)
+
+
+def classify_trend(rsi: np.ndarray, ema9: np.ndarray, ema20: np.ndarray, macd: np.ndarray,
+                   neutral: Optional[str] = "Neutral") -> np.ndarray:
+    """Vectorized analytics.indicators.classify_trend."""
+    bull = (rsi > 60) & (ema9 > ema20) & (macd > 0)
+    bear = (rsi < 40) & (ema9 < ema20) & (macd < 0)
+    return np.select([bull, bear], ["Bullish", "Bearish"], default=neutral)
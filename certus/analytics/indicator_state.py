@@ -0,0 +1,140 @@
+# certus/analytics/indicator_state.py
+"""
+Incremental indicators backed by a per-asset state table.
+
+EMA, MACD signal and Wilder RSI are recursive, so the last value of each
+filter (plus the last price and the number of prices consumed) is all a run
+needs to continue a series. `indicator_state` keeps that per id together with
+`last_ts`, the asset's watermark. Each run reads only markets rows newer than
+the watermark, advances every asset with the vectorized engine, appends the
+latest indicator row per advanced asset to `indicators` and moves the
+watermarks, in one transaction.
+
+Rows without a timestamp are never read. Rows that arrive with a ts at or
+before an asset's watermark are ignored; run with reset_state() first to
+rebuild from full history.
+"""
+from __future__ import annotations
+from typing import Dict
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from certus.analytics.indicator_engine import STATE_COLS, Segments, final_state, indicator_arrays
+from certus.storage.upsert import bulk_upsert
+
+STATE_TABLE = "indicator_state"
+OUT_COLS = ["id", "symbol", "ts", "price", "rsi_14", "ema_9", "ema_20", "macd", "macd_signal", "macd_hist"]
+
+STATE_DDL = f"""
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    id          VARCHAR PRIMARY KEY,
+    symbol      VARCHAR,
+    last_ts     TIMESTAMP,
+    n           BIGINT,
+    last_price  DOUBLE,
+    ema_9       DOUBLE,
+    ema_20      DOUBLE,
+    ema_12      DOUBLE,
+    ema_26      DOUBLE,
+    macd_signal DOUBLE,
+    avg_gain    DOUBLE,
+    avg_loss    DOUBLE,
+    updated_at  TIMESTAMP DEFAULT now()
+)
+"""
+
+INDICATORS_DDL = """
+CREATE TABLE IF NOT EXISTS indicators (
+    id           VARCHAR,
+    symbol       VARCHAR,
+    ts           TIMESTAMP,
+    price        DOUBLE,
+    rsi_14       DOUBLE,
+    ema_9        DOUBLE,
+    ema_20       DOUBLE,
+    macd         DOUBLE,
+    macd_signal  DOUBLE,
+    macd_hist    DOUBLE
+)
+"""
+
+
+def ts_expr(con: duckdb.DuckDBPyConnection, table: str, alias: str = "m") -> str:
+    """Naive-UTC TIMESTAMP for a markets row: last_updated, else epoch-ms ts."""
+    cols = {r[1]: r[2] for r in con.execute(f"PRAGMA table_info('{table}')").fetchall()}
+    parts = []
+    if "last_updated" in cols:
+        parts.append(f"CAST({alias}.last_updated AS TIMESTAMP)")
+    if cols.get("ts") in ("BIGINT", "INTEGER", "HUGEINT", "DOUBLE"):
+        parts.append(f"epoch_ms(CAST({alias}.ts AS BIGINT))")
+    elif "ts" in cols:
+        parts.append(f"CAST({alias}.ts AS TIMESTAMP)")
+    if not parts:
+        raise ValueError(f"{table} has neither last_updated nor ts")
+    return parts[0] if len(parts) == 1 else f"COALESCE({', '.join(parts)})"
+
+
+def ensure_tables(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(STATE_DDL)
+    con.execute(INDICATORS_DDL)
+
+
+def reset_state(con: duckdb.DuckDBPyConnection) -> None:
+    """Forget every watermark; the next update recomputes from full history."""
+    ensure_tables(con)
+    con.execute(f"DELETE FROM {STATE_TABLE}")
+
+
+def load_state(con: duckdb.DuckDBPyConnection, ids: np.ndarray) -> Dict[str, np.ndarray]:
+    """STATE_COLS aligned to `ids`; assets without state get n=0 and NaN filters."""
+    st = con.execute(
+        f"SELECT id, {', '.join(STATE_COLS)} FROM {STATE_TABLE} WHERE id IN (SELECT unnest(?::VARCHAR[]))",
+        [list(ids)]).df().set_index("id").reindex(ids)
+    out = {c: st[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in STATE_COLS}
+    out["n"] = st["n"].fillna(0).to_numpy(dtype=np.int64)
+    return out
+
+
+def new_rows(con: duckdb.DuckDBPyConnection, table: str = "markets") -> pd.DataFrame:
+    """Rows newer than each asset's watermark, sorted by (id, ts)."""
+    ts = ts_expr(con, table)
+    return con.execute(f"""
+        SELECT m.id, upper(m.symbol) AS symbol, {ts} AS ts, m.price
+        FROM {table} m
+        LEFT JOIN {STATE_TABLE} s ON s.id = m.id
+        WHERE m.price IS NOT NULL AND m.id IS NOT NULL AND {ts} IS NOT NULL
+          AND (s.last_ts IS NULL OR {ts} > s.last_ts)
+        ORDER BY m.id, ts
+    """).df()
+
+
+def update_indicators(con: duckdb.DuckDBPyConnection, table: str = "markets") -> Dict[str, int]:
+    """Advance every asset past its watermark; returns assets advanced and rows read."""
+    ensure_tables(con)
+    df = new_rows(con, table)
+    if df.empty:
+        return {"assets": 0, "rows": 0}
+
+    seg = Segments(df["id"].to_numpy())
+    ids = df["id"].to_numpy()[seg.starts]
+    state = load_state(con, ids)
+    price = df["price"].to_numpy(dtype=np.float64)
+    arrays = indicator_arrays(price, seg, state=state)
+
+    latest = df.iloc[seg.ends].reset_index(drop=True)
+    for c in OUT_COLS[4:]:
+        latest[c] = arrays[c][seg.ends]
+    con.register("_ind_latest", latest)
+    try:
+        con.execute(f"INSERT INTO indicators ({', '.join(OUT_COLS)}) SELECT {', '.join(OUT_COLS)} FROM _ind_latest")
+    finally:
+        con.unregister("_ind_latest")
+
+    nxt = pd.DataFrame(final_state(price, seg, arrays, state))
+    nxt.insert(0, "id", ids)
+    nxt.insert(1, "symbol", latest["symbol"].to_numpy())
+    nxt.insert(2, "last_ts", latest["ts"].to_numpy())
+    bulk_upsert(con, STATE_TABLE, nxt, ["id"], stamp="updated_at")
+    return {"assets": len(ids), "rows": len(df)}
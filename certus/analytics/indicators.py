@@ -3,6 +3,8 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 
+from certus.analytics import indicator_engine
+
 def ema(series: pd.Series, span: int) -> pd.Series:
     return series.ewm(span=span, adjust=False).mean()
 
@@ -38,24 +40,10 @@ def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     if "last_updated" not in df.columns:
         raise ValueError("compute_indicators requires 'last_updated' column")
-    df = df.sort_values(["symbol", "last_updated"]).copy()
-
-    def _apply(group: pd.DataFrame):
-        px = group["price"]
-        out = group[["id", "symbol", "price", "last_updated"]].copy()
-        out["rsi_14"] = rsi(px, 14)
-        out["ema_9"] = ema(px, 9)
-        out["ema_20"] = ema(px, 20)
-        m, s, h = macd(px)
-        out["macd"] = m
-        out["macd_signal"] = s
-        out["macd_hist"] = h
-        out["trend"] = [
-            classify_trend(r, e9, e20, mm)
-            for r, e9, e20, mm in zip(out["rsi_14"], out["ema_9"], out["ema_20"], out["macd"])
-        ]
-        out.rename(columns={"last_updated": "ts"}, inplace=True)
-        return out
-
-    res = df.groupby(["symbol"], group_keys=False).apply(_apply)
-    return res
+    df = df.loc[df["symbol"].notna(), ["id", "symbol", "price", "last_updated"]]
+    # ema()/rsi()/macd() above, for every symbol in one pass (no groupby.apply)
+    out = indicator_engine.compute_indicators(df, key="symbol", ts="last_updated",
+                                              warmup=False, rsi_mode="sma")
+    out["trend"] = indicator_engine.classify_trend(
+        out["rsi_14"].to_numpy(), out["ema_9"].to_numpy(), out["ema_20"].to_numpy(), out["macd"].to_numpy())
+    return out.rename(columns={"last_updated": "ts"})
@@ -1,7 +1,34 @@
 # certus/analytics/scores.py
 from __future__ import annotations
+import duckdb
+import numpy as np
 import pandas as pd
 
+# scores as written by scripts/calc_scores.py (latest trend_score per asset)
+SCORES_DDL = """
+CREATE TABLE IF NOT EXISTS scores (
+    id           VARCHAR,
+    symbol       VARCHAR,
+    ts           TIMESTAMP,
+    price        DOUBLE,
+    trend_score  DOUBLE
+)
+"""
+
+def replace_scores(con: duckdb.DuckDBPyConnection, src: str) -> int:
+    """
+    Replace the scores of every id in `src` (a table, view or read_parquet
+    call). A scores table created by the old calc_signals.py (symbol-keyed
+    batches, ts as epoch ms) gets an id column and receives the columns it has.
+    """
+    con.execute(SCORES_DDL)
+    con.execute("ALTER TABLE scores ADD COLUMN IF NOT EXISTS id VARCHAR")
+    cols = {r[1]: r[2] for r in con.execute("PRAGMA table_info('scores')").fetchall()}
+    con.execute(f"DELETE FROM scores WHERE id IN (SELECT id FROM {src})")
+    exprs = {"ts": "epoch_ms(ts) AS ts" if cols.get("ts") == "BIGINT" else "ts"}
+    select = ", ".join(exprs.get(c, c) for c in ("id", "symbol", "ts", "price", "trend_score") if c in cols)
+    return con.execute(f"INSERT INTO scores BY NAME SELECT {select} FROM {src}").fetchone()[0]
+
 def score_row(trend: str, rsi: float, macd_hist: float) -> float:
     base = {"Bullish": 70, "Neutral": 50, "Bearish": 30}.get(trend, 50)
     rsi_adj = ((rsi or 50) - 50) * 0.5
@@ -15,3 +42,21 @@ def build_scores(ind_df: pd.DataFrame) -> pd.DataFrame:
         score_row(t, r, h) for t, r, h in zip(last["trend"], last["rsi_14"], last["macd_hist"])
     ]
     return last[["id", "symbol", "price", "trend", "trend_score", "ts"]]
+
+def compute_trend_score(df: pd.DataFrame) -> pd.DataFrame:
+    g = df.copy()
+
+    rsi = pd.to_numeric(g["rsi_14"], errors="coerce")
+    rsi_component = ((rsi - 50.0) / 50.0).clip(-1, 1).fillna(0)
+
+    ema_align  = (g["price"] > g["ema_9"]).astype(float) - (g["price"] <= g["ema_9"]).astype(float)
+    ema_trend  = (g["ema_9"] > g["ema_20"]).astype(float) - (g["ema_9"] <= g["ema_20"]).astype(float)
+    ema_component = 0.5 * ema_align + 0.5 * ema_trend
+
+    macd_bias = np.sign(
+        pd.to_numeric(g["macd"], errors="coerce") - pd.to_numeric(g["macd_signal"], errors="coerce")
+    ).fillna(0)
+
+    g["trend_score"] = (0.5 * rsi_component + 0.3 * ema_component + 0.2 * macd_bias).astype(float)
+
+    return g[["id", "symbol", "ts", "price", "trend_score"]]
@@ -0,0 +1,153 @@
+# certus/analytics/sharded.py
+"""
+Sharded, multi-process run of the indicator -> score -> signal chain.
+
+    1. DuckDB writes the price history as Parquet, one file set per shard
+       (hash(upper(symbol)) % shards, so every id of a symbol lands together
+       and per-symbol signals match the single-process run), plus the
+       latest existing `indicators` row per id, sharded the same way.
+    2. A process pool runs one shard per task: read Parquet with pyarrow,
+       compute the indicator series (indicator_engine), the latest
+       indicators row, signals and trend scores per asset, write each result
+       as Parquet. Only paths and row counts cross process boundaries.
+    3. The parent loads every shard's output with read_parquet in a single
+       storage-service transaction: indicators and signals are appended,
+       scores replaced per id, and the indicator_state rows of every
+       computed asset reset to the end of its history so incremental
+       calc_indicators runs continue from there.
+
+Signals follow scripts/calc_signals.py: the new indicators row of a symbol
+is compared with its previous row in `indicators` (not with the previous
+price point), so cross events fire between consecutive snapshots and a
+symbol's first snapshot only gets state tags.
+
+Shards are independent, so throughput grows with the number of workers.
+
+    run_chain("data/markets.duckdb", workers=8)
+"""
+from __future__ import annotations
+import glob
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from certus.analytics.indicator_engine import Segments, final_state, indicator_arrays
+from certus.analytics.indicator_state import INDICATORS_DDL, OUT_COLS, STATE_DDL, STATE_TABLE, ts_expr
+from certus.analytics.scores import SCORES_DDL, compute_trend_score, replace_scores
+from certus.analytics.signals import SIGNALS_DDL, compute_signals
+from certus.storage.service import get_service
+
+OUTPUTS = ("indicators", "signals", "scores", "state")
+
+
+def export_shards(con: duckdb.DuckDBPyConnection, table: str, root: str, shards: int) -> List[str]:
+    """
+    Write (id, symbol, ts, price) of `table` to root/shard=K/ and the latest
+    indicators row per id to root/prev/shard=K/; returns the price shard directories.
+    """
+    ts = ts_expr(con, table)
+    os.makedirs(root, exist_ok=True)
+    con.execute(f"""
+        COPY (
+            SELECT m.id, upper(m.symbol) AS symbol, {ts} AS ts, m.price,
+                   hash(upper(m.symbol)) % {shards} AS shard
+            FROM {table} m
+            WHERE m.price IS NOT NULL AND m.id IS NOT NULL AND {ts} IS NOT NULL
+        ) TO '{os.path.join(root, "prices")}' (FORMAT parquet, PARTITION_BY (shard), OVERWRITE_OR_IGNORE)
+    """)
+    has_prev = con.execute("SELECT count(*) FROM duckdb_tables() WHERE table_name = 'indicators'").fetchone()[0]
+    if has_prev:
+        con.execute(f"""
+            COPY (
+                SELECT {', '.join(c for c in OUT_COLS if c != 'symbol')}, upper(symbol) AS symbol,
+                       hash(upper(symbol)) % {shards} AS shard
+                FROM indicators
+                WHERE id IS NOT NULL
+                QUALIFY row_number() OVER (PARTITION BY id ORDER BY ts DESC) = 1
+            ) TO '{os.path.join(root, "prev")}' (FORMAT parquet, PARTITION_BY (shard), OVERWRITE_OR_IGNORE)
+        """)
+    return sorted(glob.glob(os.path.join(root, "prices", "shard=*")))
+
+
+def run_shard(in_dir: str, out_root: str, batch_ts: int) -> Dict[str, int]:
+    """Worker: full chain for one shard, Parquet in -> Parquet out."""
+    df = pq.read_table(in_dir).to_pandas()
+    name = os.path.basename(in_dir)
+    if df.empty:
+        return {"rows": 0, "assets": 0}
+    df = df.sort_values(["id", "ts"], kind="stable").reset_index(drop=True)
+    seg = Segments(df["id"].to_numpy())
+    price = df["price"].to_numpy(dtype=np.float64)
+    arrays = indicator_arrays(price, seg)
+    for c in OUT_COLS[4:]:
+        df[c] = arrays[c]
+
+    latest = df.iloc[seg.ends][OUT_COLS].reset_index(drop=True)
+    # signals compare the new row with the previous indicators snapshot, as calc_signals does
+    prev_dir = os.path.join(os.path.dirname(os.path.dirname(in_dir)), "prev", name)
+    prev = pq.read_table(prev_dir).to_pandas()[OUT_COLS] if os.path.isdir(prev_dir) else latest.iloc[:0]
+    signals = compute_signals(pd.concat([prev, latest], ignore_index=True))
+    signals["ts"] = batch_ts
+    state = pd.DataFrame(final_state(price, seg, arrays))
+    state.insert(0, "id", latest["id"].to_numpy())
+    state.insert(1, "symbol", latest["symbol"].to_numpy())
+    state.insert(2, "last_ts", latest["ts"].to_numpy())
+
+    for out, frame in zip(OUTPUTS, (latest, signals, compute_trend_score(latest), state)):
+        os.makedirs(os.path.join(out_root, out), exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False),
+                       os.path.join(out_root, out, f"{name}.parquet"))
+    return {"rows": len(df), "assets": len(latest)}
+
+
+def merge_shards(con: duckdb.DuckDBPyConnection, out_root: str) -> Dict[str, int]:
+    """Load every shard's results (transaction: see storage.service)."""
+    src = lambda out: f"read_parquet('{os.path.join(out_root, out, '*.parquet')}')"
+    for ddl in (INDICATORS_DDL, SIGNALS_DDL, SCORES_DDL, STATE_DDL):
+        con.execute(ddl)
+    stats = {}
+    stats["indicators"] = con.execute(f"INSERT INTO indicators BY NAME SELECT * FROM {src('indicators')}").fetchone()[0]
+    stats["signals"] = con.execute(f"INSERT INTO signals BY NAME SELECT * FROM {src('signals')}").fetchone()[0]
+    stats["scores"] = replace_scores(con, src("scores"))
+    con.execute(f"DELETE FROM {STATE_TABLE} WHERE id IN (SELECT id FROM {src('state')})")
+    con.execute(f"INSERT INTO {STATE_TABLE} BY NAME SELECT * FROM {src('state')}")
+    return stats
+
+
+def run_chain(db_path: str, table: str = "markets", workers: Optional[int] = None,
+              shards: Optional[int] = None, work_dir: Optional[str] = None) -> Dict[str, int]:
+    """Export, compute every shard in a process pool, merge. workers=1 runs in-process."""
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    tmp = tempfile.mkdtemp(prefix="certus_chain_", dir=work_dir)
+    try:
+        svc = get_service(db_path)
+        svc.flush()
+        in_root, out_root = os.path.join(tmp, "in"), os.path.join(tmp, "out")
+        with svc.reader() as cur:
+            dirs = export_shards(cur, table, in_root, shards)
+        if not dirs:
+            return {"rows": 0, "assets": 0}
+        batch_ts = int(time.time() * 1000)
+        if workers == 1:
+            results = [run_shard(d, out_root, batch_ts) for d in dirs]
+        else:
+            # spawn: the parent holds DuckDB threads, which must not be forked
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+                results = list(pool.map(run_shard, dirs, [out_root] * len(dirs), [batch_ts] * len(dirs)))
+        stats = {"rows": sum(r["rows"] for r in results), "assets": sum(r["assets"] for r in results),
+                 "shards": len(dirs)}
+        stats.update(svc.submit(merge_shards, out_root).result())
+        return stats
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -13,6 +13,22 @@ Notes
   fall back to a stable synthetic order.
 """
 
+# signals table (id is VARCHAR — asset id string like 'bitcoin'; ts is batch epoch ms)
+SIGNALS_DDL = """
+CREATE TABLE IF NOT EXISTS signals (
+    id VARCHAR,
+    symbol VARCHAR,
+    price DOUBLE,
+    rsi_14 DOUBLE,
+    ema_9 DOUBLE,
+    ema_20 DOUBLE,
+    macd DOUBLE,
+    signal_type VARCHAR,
+    signal_strength DOUBLE,
+    ts BIGINT
+)
+"""
+
 # ---------- helpers ----------
 
 def _pick_order_column(df: pd.DataFrame) -> str:
@@ -0,0 +1,126 @@
+# certus/analytics/sql_indicators.py
+"""
+Indicators computed inside DuckDB and materialized straight into `indicators`.
+
+No rows leave the database: one INSERT ... SELECT computes, for the latest
+row of every asset in `markets` (or `cg_prices`), the same Wilder RSI,
+EMA 9/20 and MACD as the pandas/NumPy paths (min_periods warm-up
+included), plus rolling highs/lows and simple returns.
+
+EMA(adjust=False) has the closed form
+
+    y_k = w^k * (x_0 + sum_{i=1..k} a * x_i * w^-i),     w = 1 - a
+
+so it is a running window SUM scaled by powers of w. Only the last
+`tail` rows per asset are fed to it: older rows carry weight below
+w^tail (< 1e-28 for the default tail) so the result equals a full-history
+recompute to double precision, and w^-tail stays far from overflow.
+Series no longer than `tail` are computed exactly from their first row.
+
+Assets whose latest row is already in `indicators` are skipped, so reruns
+without new prices append nothing. indicator_state is not read or written:
+the incremental path (indicator_state.update_indicators) keeps its own
+watermarks.
+"""
+from __future__ import annotations
+from typing import Dict
+
+import duckdb
+
+from certus.analytics.indicator_engine import _span
+from certus.analytics.indicator_state import INDICATORS_DDL, ts_expr
+
+TAIL_ROWS = 1000
+ROLL_PERIOD = 20
+EXTRA_COLS = {"high_20": "DOUBLE", "low_20": "DOUBLE", "return_1": "DOUBLE", "return_20": "DOUBLE"}
+
+
+def _ema(x: str, alpha: float, k: str) -> str:
+    """Running EMA of x over window `c`; k = rows since the series' first valid x (NULL before)."""
+    w = 1.0 - alpha
+    return (f"pow({w!r}, {k}) * sum(CASE WHEN {k} = 0 THEN {x} ELSE {alpha!r} * {x} END "
+            f"* pow({w!r}, -{k})) OVER c")
+
+
+def indicators_sql(con: duckdb.DuckDBPyConnection, table: str = "markets", tail: int = TAIL_ROWS,
+                   rsi_period: int = 14) -> str:
+    """SELECT producing one indicators row (latest ts) per asset of `table`."""
+    ts = ts_expr(con, table)
+    p = ROLL_PERIOD
+    a = 1.0 / rsi_period
+    return f"""
+    WITH src AS (
+        SELECT m.id, upper(m.symbol) AS symbol, {ts} AS ts, m.price
+        FROM {table} m
+        WHERE m.price IS NOT NULL AND m.id IS NOT NULL AND {ts} IS NOT NULL
+    ),
+    num AS (
+        SELECT *,
+               row_number() OVER w - 1            AS gpos,
+               count(*) OVER (PARTITION BY id)     AS n,
+               price - lag(price) OVER w           AS delta,
+               max(price) OVER (w ROWS BETWEEN {p - 1} PRECEDING AND CURRENT ROW) AS high_{p},
+               min(price) OVER (w ROWS BETWEEN {p - 1} PRECEDING AND CURRENT ROW) AS low_{p},
+               price / nullif(lag(price) OVER w, 0) - 1       AS return_1,
+               price / nullif(lag(price, {p}) OVER w, 0) - 1  AS return_{p}
+        FROM src
+        WINDOW w AS (PARTITION BY id ORDER BY ts)
+    ),
+    tail AS (
+        SELECT *,
+               gpos - greatest(n - {tail}, 0) AS j,                         -- price: first row of the tail
+               CASE WHEN delta IS NOT NULL THEN gpos - greatest(n - {tail}, 1) END AS jd
+        FROM num
+        WHERE gpos >= n - {tail}
+    ),
+    ema AS (
+        SELECT *,
+               {_ema("price", _span(9), "j")}  AS ema_9,
+               {_ema("price", _span(20), "j")} AS ema_20,
+               {_ema("price", _span(12), "j")} AS ema_12,
+               {_ema("price", _span(26), "j")} AS ema_26,
+               {_ema("greatest(delta, 0)", a, "jd")}  AS avg_gain,
+               {_ema("greatest(-delta, 0)", a, "jd")} AS avg_loss
+        FROM tail
+        WINDOW c AS (PARTITION BY id ORDER BY j ROWS UNBOUNDED PRECEDING)
+    ),
+    macd AS (
+        SELECT *,
+               CASE WHEN gpos >= 25 THEN ema_12 - ema_26 END AS macd,
+               CASE WHEN gpos >= 25 THEN gpos - greatest(n - {tail}, 25) END AS jm
+        FROM ema
+    ),
+    sig AS (
+        SELECT *, {_ema("macd", _span(9), "jm")} AS macd_signal_raw
+        FROM macd
+        WINDOW c AS (PARTITION BY id ORDER BY j ROWS UNBOUNDED PRECEDING)
+    )
+    SELECT id, symbol, ts, price,
+           CASE WHEN gpos >= {rsi_period} THEN 100 - 100 / (1 + avg_gain / nullif(avg_loss, 0)) END AS rsi_14,
+           CASE WHEN gpos >= 8 THEN ema_9 END  AS ema_9,
+           CASE WHEN gpos >= 19 THEN ema_20 END AS ema_20,
+           macd,
+           CASE WHEN gpos >= 33 THEN macd_signal_raw END AS macd_signal,
+           macd - CASE WHEN gpos >= 33 THEN macd_signal_raw END AS macd_hist,
+           high_{p}, low_{p}, return_1, return_{p}
+    FROM sig
+    WHERE gpos = n - 1
+    """
+
+
+def materialize_indicators(con: duckdb.DuckDBPyConnection, table: str = "markets",
+                           tail: int = TAIL_ROWS) -> Dict[str, int]:
+    """
+    Append the latest indicators row per asset of `table` to `indicators`,
+    computed entirely in DuckDB; assets with no row newer than their latest
+    indicators row are skipped.
+    """
+    con.execute(INDICATORS_DDL)
+    for c, typ in EXTRA_COLS.items():
+        con.execute(f"ALTER TABLE indicators ADD COLUMN IF NOT EXISTS {c} {typ}")
+    n = con.execute(f"""
+        INSERT INTO indicators BY NAME
+        SELECT n.* FROM ({indicators_sql(con, table, tail)}) n
+        ANTI JOIN indicators i ON i.id = n.id AND i.ts >= n.ts
+    """).fetchone()[0]
+    return {"assets": n}
@@ -0,0 +1,65 @@
+# certus/data/chart_columns.py
+"""
+Columnar conversion of market_chart / market_chart/range payloads.
+
+The payload holds three [[ms, value], ...] lists. Rather than one dict per
+point with caps/volumes looked up by float timestamp, each list becomes a pair
+of NumPy arrays and caps/volumes are aligned to the price timestamps with a
+sorted search, so cost scales with the array length instead of per-point
+Python objects.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CHART_SOURCE = "coingecko_market_chart"
+
+
+def _series(pairs: Optional[Sequence[Sequence[Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """[[ms, v], ...] -> (int64 ms sorted ascending, float64 values; None -> NaN)."""
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    arr = np.asarray(pairs, dtype=np.float64)
+    ts = arr[:, 0].astype(np.int64)
+    order = np.argsort(ts, kind="stable")
+    return ts[order], arr[order, 1]
+
+
+def _align(ts: np.ndarray, other_ts: np.ndarray, other_vals: np.ndarray) -> np.ndarray:
+    """Values of `other` at exactly the timestamps in `ts` (NaN where missing)."""
+    out = np.full(len(ts), np.nan)
+    if len(other_ts) == 0 or len(ts) == 0:
+        return out
+    # last occurrence wins on duplicate timestamps, as a dict build would
+    idx = np.searchsorted(other_ts, ts, side="right") - 1
+    ok = idx >= 0
+    ok[ok] = other_ts[idx[ok]] == ts[ok]
+    out[ok] = other_vals[idx[ok]]
+    return out
+
+
+def chart_frame(chart: Dict[str, Any], coin_id: str, symbol: str, vs_currency: str,
+                volume_col: str = "total_volume", source: Optional[str] = CHART_SOURCE) -> pd.DataFrame:
+    """
+    One row per price point: ts (ms), id, symbol, vs_currency, price,
+    market_cap, <volume_col> and, unless `source` is None, source.
+    Rows come out in timestamp order.
+    """
+    ts, price = _series(chart.get("prices"))
+    cap_ts, caps = _series(chart.get("market_caps"))
+    vol_ts, vols = _series(chart.get("total_volumes"))
+    n = len(ts)
+    cols: Dict[str, Any] = {
+        "ts": ts,
+        "id": np.full(n, coin_id, dtype=object),
+        "symbol": np.full(n, symbol, dtype=object),
+        "vs_currency": np.full(n, vs_currency.upper(), dtype=object),
+        "price": price,
+        "market_cap": _align(ts, cap_ts, caps),
+        volume_col: _align(ts, vol_ts, vols),
+    }
+    if source is not None:
+        cols["source"] = np.full(n, source, dtype=object)
+    return pd.DataFrame(cols)
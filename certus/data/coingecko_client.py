@@ -1,21 +1,113 @@
 # certus/data/coingecko_client.py
+import asyncio
+import json
 import os
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_fixed
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from dotenv import load_dotenv
 
+from certus.data.http_cache import ResponseCache
+from certus.data.key_pool import KeyPool, _mask, shared_key_pool
+from certus.utils.rate_limit import parse_retry_after
+from certus.utils.singleflight import SingleFlight
+
 
 class CoinGeckoHTTPError(Exception):
     """Raised when CoinGecko returns a non-2xx response with useful context."""
 
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Calls-per-minute budgets per plan (override with CG_CALLS_PER_MIN)
+PLAN_CALLS_PER_MIN = {
+    "public": 10,   # keyless public API (documented as 5-15/min)
+    "demo": 30,     # demo key on the public host
+    "pro": 500,     # Analyst and up
+}
+
+# Cooldown when a 429 arrives without a Retry-After header
+DEFAULT_RETRY_AFTER = 15.0
+
+# On-disk cache TTLs (seconds) for slow-changing endpoints. Within the TTL the
+# cached body is served without a request; after it we revalidate with
+# If-None-Match / If-Modified-Since. Endpoints not listed are never cached.
+CACHE_TTLS: Dict[str, float] = {
+    "/coins/list": 6 * 3600,
+    "/coins/categories/list": 24 * 3600,
+    "/asset_platforms": 24 * 3600,
+}
+
+# market_chart/range granularity is picked by the API from the span:
+# <= 1 day -> 5-minutely, <= 90 days -> hourly, beyond -> daily. To get a finer
+# tier over a long window, split it into chunks no longer than the tier's limit.
+# (Older than ~1 day, 5-minute data needs an Enterprise key; other plans get hourly.)
+# "daily" is one request thinned to the last point per UTC day (see daily_points),
+# since windows up to 90 days come back hourly.
+RANGE_CHUNK_SECONDS: Dict[str, Optional[int]] = {
+    "5m": 86_400,
+    "hourly": 90 * 86_400,
+    "daily": None,
+    "auto": None,
+}
+RANGE_SERIES = ("prices", "market_caps", "total_volumes")
+
+
+def range_chunks(frm_unix: int, to_unix: int, span: Optional[int]) -> List[tuple]:
+    """
+    Split [frm, to] into the fewest consecutive, equal windows of at most
+    `span` seconds. Equal windows are never shorter than span / 2, so there is
+    no short tail chunk that CoinGecko would answer at a finer granularity
+    (a <= 1 day tail of an hourly range comes back in 5-minute points).
+    """
+    if not span or to_unix - frm_unix <= span:
+        return [(frm_unix, to_unix)]
+    n = -(-(to_unix - frm_unix) // span)
+    edges = [frm_unix + (to_unix - frm_unix) * i // n for i in range(n + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def stitch_ranges(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatenate chunk payloads, dropping points repeated at chunk edges."""
+    out: Dict[str, Any] = {}
+    for key in RANGE_SERIES:
+        seen: Dict[int, Any] = {}
+        for part in parts:
+            for ts, v in part.get(key) or []:
+                seen.setdefault(int(ts), v)
+        out[key] = [[ts, seen[ts]] for ts in sorted(seen)]
+    return out
+
+
+def daily_points(chart: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the last point of each UTC day in every series."""
+    out: Dict[str, Any] = dict(chart)
+    for key in RANGE_SERIES:
+        last: Dict[int, list] = {}
+        for ts, v in sorted(chart.get(key) or [], key=lambda p: p[0]):
+            last[int(ts) // 86_400_000] = [ts, v]
+        out[key] = list(last.values())
+    return out
+
+
+def _is_retryable(e: BaseException) -> bool:
+    if not isinstance(e, CoinGeckoHTTPError):
+        return False
+    return e.status_code is None or e.status_code in RETRY_STATUS
 
-def _mask(s: str, head: int = 6) -> str:
-    if not s:
-        return ""
-    return s[:head] + "…" + f"({len(s)} chars)"
+
+def _api_keys() -> List[str]:
+    """COINGECKO_API_KEYS (comma-separated) plus COINGECKO_API_KEY, de-duplicated."""
+    raw = (os.getenv("COINGECKO_API_KEYS") or "").split(",") + [os.getenv("COINGECKO_API_KEY") or ""]
+    return list(dict.fromkeys(k.strip() for k in raw if k.strip()))
 
 
 # Load .env from repo root, and allow it to override the process env for certainty
@@ -23,23 +115,50 @@ _REPO_ROOT = Path(__file__).resolve().parents[2]
 load_dotenv(dotenv_path=_REPO_ROOT / ".env", override=True)
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+# Process-wide: identical concurrent requests from any client instance share one
+# HTTP call; CG_RESULT_TTL (seconds, default off) also reuses recent bodies.
+_FLIGHTS = SingleFlight(ttl=_env_float("CG_RESULT_TTL", 0.0))
+
+
+def _default_cache() -> Optional[ResponseCache]:
+    if (os.getenv("CG_CACHE") or "1").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    return ResponseCache(os.getenv("CG_CACHE_DIR") or _REPO_ROOT / "data" / "http_cache")
+
+
 class CoinGeckoClient:
     """
     Async CoinGecko client.
 
     Base URL priority:
       1) CG_BASE_URL (if set)
-      2) Pro URL if COINGECKO_API_KEY present
+      2) Pro URL if COINGECKO_API_KEY / COINGECKO_API_KEYS present
       3) Public URL fallback
 
     Notes:
       - coins/markets requires 'vs_currency'
       - To receive percent change columns, you MUST pass 'price_change_percentage'
         (we default to "1h,24h,7d")
+      - Every request draws from a token bucket shared by all clients in the process
+        that use the same base URL + key (PLAN_CALLS_PER_MIN, or CG_CALLS_PER_MIN).
+        Set CG_RATE_STATE=<path> to share the budget across processes too.
+      - COINGECKO_API_KEYS=k1,k2,... rotates requests over several keys, each with
+        its own budget; rejected / exhausted keys drop out (see key_pool.KeyPool).
+      - Endpoints in CACHE_TTLS are cached on disk (CG_CACHE_DIR, default
+        data/http_cache; CG_CACHE=0 disables) and revalidated conditionally.
+      - Concurrent identical GETs are coalesced into one request (single-flight).
     """
 
     def __init__(self, timeout: float = 60.0):
-        api_key = (os.getenv("COINGECKO_API_KEY") or "").strip()
+        api_keys = _api_keys()
+        api_key = api_keys[0] if api_keys else ""
         env_base = (os.getenv("CG_BASE_URL") or "").strip()
 
         if env_base:
@@ -51,9 +170,8 @@ class CoinGeckoClient:
                 "https://pro-api.coingecko.com/api/v3" if is_pro else "https://api.coingecko.com/api/v3"
             )
 
+        # The key header is set per request by the key pool
         headers = {}
-        if api_key:
-            headers["x-cg-pro-api-key"] = api_key
 
         # A couple of polite headers (not required but nice to have)
         headers["Accept"] = "application/json"
@@ -61,10 +179,17 @@ class CoinGeckoClient:
 
         # Diagnostics (safe/masked)
         print(f"[CG] Base URL: {base_url}")
-        print(f"[CG] Using Pro: {is_pro} | Key present: {bool(api_key)} ({_mask(api_key) if api_key else ''})")
+        print(f"[CG] Using Pro: {is_pro} | Key present: {bool(api_key)} ({_mask(api_key) if api_key else ''})"
+              + (f" | keys in rotation: {len(api_keys)}" if len(api_keys) > 1 else ""))
 
         self.base_url = base_url
         self.is_pro = is_pro
+        self.plan = "pro" if is_pro else ("demo" if api_key else "public")
+        self.keys = self._make_key_pool(api_keys)
+        # Optional hook called per HTTP attempt with (status_code | None, elapsed_s),
+        # e.g. AIMDController.observe for adaptive concurrency.
+        self.on_response: Optional[Callable[[Optional[int], float], None]] = None
+        self.cache = _default_cache()
         self._client = httpx.AsyncClient(base_url=self.base_url, headers=headers, timeout=timeout)
 
         # Default params we always apply to coins/markets
@@ -75,6 +200,13 @@ class CoinGeckoClient:
             "price_change_percentage": "1h,24h,7d",
         }
 
+    def _make_key_pool(self, api_keys: List[str]) -> KeyPool:
+        cpm = _env_float("CG_CALLS_PER_MIN", PLAN_CALLS_PER_MIN[self.plan])
+        state_path = (os.getenv("CG_RATE_STATE") or "").strip() or None
+        print(f"[CG] Rate limit: {cpm:g} calls/min per key ({self.plan})")
+        return shared_key_pool(self.base_url, api_keys or [""], cpm,
+                               header="x-cg-pro-api-key", state_path=state_path)
+
     async def __aenter__(self):
         return self
 
@@ -84,47 +216,131 @@ class CoinGeckoClient:
     async def close(self):
         await self._client.aclose()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1.2))
-    async def _get(self, endpoint: str, params: Dict[str, Any]) -> Any:
+    # 429s are paced by the limiter (pause + re-acquire); the jittered wait only
+    # spreads out retries of 5xx / transport errors.
+    @retry(
+        stop=stop_after_attempt(4),
+        wait=wait_random_exponential(multiplier=0.5, max=8),
+        retry=retry_if_exception(_is_retryable),
+        reraise=True,
+    )
+    async def _send(self, endpoint: str, params: Dict[str, Any],
+                    headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        slot = await self.keys.acquire()
+        t0 = time.monotonic()
         try:
-            r = await self._client.get(endpoint, params=params)
-            r.raise_for_status()
-            return r.json()
+            try:
+                r = await self._client.get(endpoint, params=params, headers={**(headers or {}), **slot.headers})
+            except httpx.RequestError:
+                self._observe(None, time.monotonic() - t0)
+                raise
+            self._observe(r.status_code, time.monotonic() - t0)
+            self.keys.report(slot, r.status_code, parse_retry_after(r.headers.get("Retry-After")),
+                             default_cooldown=DEFAULT_RETRY_AFTER)
+            if r.status_code != 304:
+                r.raise_for_status()
+            return r
         except httpx.HTTPStatusError as e:
             body = ""
             try:
                 body = r.text[:500]  # type: ignore[name-defined]
             except Exception:
                 pass
+            status = getattr(e.response, "status_code", None)
             raise CoinGeckoHTTPError(
-                f"HTTP {getattr(e.response, 'status_code', '???')} on {self.base_url}{endpoint} "
-                f"params={params} body={body}"
+                f"HTTP {status or '???'} on {self.base_url}{endpoint} "
+                f"params={params} body={body}",
+                status_code=status,
+                retry_after=parse_retry_after(e.response.headers.get("Retry-After")),
             ) from e
         except httpx.RequestError as e:
             raise CoinGeckoHTTPError(f"Request error calling {self.base_url}{endpoint}: {e}") from e
 
+    async def _get_raw(self, endpoint: str, params: Dict[str, Any]) -> bytes:
+        key = (self.base_url, endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+        return await _FLIGHTS.do(key, lambda: self._fetch_raw(endpoint, params))
+
+    async def _fetch_raw(self, endpoint: str, params: Dict[str, Any]) -> bytes:
+        ttl = CACHE_TTLS.get(endpoint)
+        if ttl is None or self.cache is None:
+            return (await self._send(endpoint, params)).content
+
+        key = self.cache.key(self.base_url + endpoint, params)
+        entry = self.cache.get(key)
+        if entry is not None and entry.age < ttl:
+            return entry.body
+        r = await self._send(endpoint, params, headers=entry.validators() if entry else None)
+        if r.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            return entry.body
+        self.cache.put(key, r.content, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        return r.content
+
+    async def _get(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        return json.loads(await self._get_raw(endpoint, params))
+
+    def _observe(self, status: Optional[int], elapsed: float) -> None:
+        if self.on_response is not None:
+            self.on_response(status, elapsed)
+
     async def ping(self) -> Any:
         return await self._get("/ping", {})
 
-    async def coins_markets(
-        self,
-        vs_currency: str = "usd",
-        per_page: int = 250,
-        page: int = 1,
-        order: Optional[str] = None,
-        price_change_percentage: Optional[str] = None,
-        sparkline: Optional[bool] = None,
-        **extra: Any,
-    ) -> List[Dict[str, Any]]:
+    async def coins_list(self, include_platform: bool = False) -> List[Dict[str, Any]]:
+        """GET /coins/list — every coin's id/symbol/name (disk-cached, see CACHE_TTLS)."""
+        return await self._get("/coins/list", {"include_platform": "true" if include_platform else "false"})
+
+    async def market_chart(
+        self, coin_id: str, vs_currency: str = "usd", days: Union[str, int] = 1, interval: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        GET /coins/markets
+        GET /coins/{id}/market_chart
 
-        Returns a list of market snapshots. Ensures 'price_change_percentage=1h,24h,7d'
-        unless explicitly overridden. This is what populates:
-          - price_change_percentage_1h
-          - price_change_percentage_24h
-          - price_change_percentage_7d
+        Returns {'prices': [[ms, v], ...], 'market_caps': [...], 'total_volumes': [...]}.
+        `days` may be a number or "max"; `interval` ("daily"/"hourly") is optional.
+        """
+        params: Dict[str, Any] = {"vs_currency": (vs_currency or "usd").lower(), "days": days}
+        if interval:
+            params["interval"] = interval
+        return await self._get(f"/coins/{coin_id}/market_chart", params)
+
+    async def market_chart_range(
+        self, coin_id: str, vs_currency: str = "usd", frm_unix: int = 0, to_unix: int = 0,
+        granularity: str = "auto", concurrency: int = 4,
+    ) -> Dict[str, Any]:
+        """
+        GET /coins/{id}/market_chart/range  (from/to in unix seconds)
+
+        Same payload shape as market_chart. With granularity "5m" or "hourly"
+        the window is split per RANGE_CHUNK_SECONDS, chunks are fetched
+        concurrently (still paced by the key pool) and stitched in time order;
+        "daily" keeps one point per UTC day whatever the span.
         """
+        if granularity not in RANGE_CHUNK_SECONDS:
+            raise ValueError(f"granularity must be one of {sorted(RANGE_CHUNK_SECONDS)}")
+        vs = (vs_currency or "usd").lower()
+        chunks = range_chunks(int(frm_unix), int(to_unix), RANGE_CHUNK_SECONDS[granularity])
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(a: int, b: int) -> Dict[str, Any]:
+            async with sem:
+                return await self._get(f"/coins/{coin_id}/market_chart/range",
+                                       {"vs_currency": vs, "from": a, "to": b})
+
+        parts = await asyncio.gather(*(one(a, b) for a, b in chunks))
+        out = parts[0] if len(parts) == 1 else stitch_ranges(parts)
+        return daily_points(out) if granularity == "daily" else out
+
+    def _markets_params(
+        self,
+        vs_currency: str,
+        per_page: int,
+        page: int,
+        order: Optional[str],
+        price_change_percentage: Optional[str],
+        sparkline: Optional[bool],
+        extra: Dict[str, Any],
+    ) -> Dict[str, Any]:
         # Normalize inputs
         vs_currency = (vs_currency or "usd").lower()
 
@@ -146,5 +362,42 @@ class CoinGeckoClient:
         # Pass through any extra params if ever needed (e.g., category filters)
         merged.update(extra)
         params.update(merged)
+        return params
 
+    async def coins_markets(
+        self,
+        vs_currency: str = "usd",
+        per_page: int = 250,
+        page: int = 1,
+        order: Optional[str] = None,
+        price_change_percentage: Optional[str] = None,
+        sparkline: Optional[bool] = None,
+        **extra: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        GET /coins/markets
+
+        Returns a list of market snapshots. Ensures 'price_change_percentage=1h,24h,7d'
+        unless explicitly overridden. This is what populates:
+          - price_change_percentage_1h
+          - price_change_percentage_24h
+          - price_change_percentage_7d
+        """
+        params = self._markets_params(vs_currency, per_page, page, order,
+                                      price_change_percentage, sparkline, extra)
         return await self._get("/coins/markets", params)
+
+    async def coins_markets_raw(
+        self,
+        vs_currency: str = "usd",
+        per_page: int = 250,
+        page: int = 1,
+        order: Optional[str] = None,
+        price_change_percentage: Optional[str] = None,
+        sparkline: Optional[bool] = None,
+        **extra: Any,
+    ) -> bytes:
+        """Same as coins_markets but returns the undecoded body (see markets_columns)."""
+        params = self._markets_params(vs_currency, per_page, page, order,
+                                      price_change_percentage, sparkline, extra)
+        return await self._get_raw("/coins/markets", params)
@@ -6,11 +6,11 @@ Fetch CoinGecko markets and save to Parquet + DuckDB.
 import os
 import time
 import asyncio
-import duckdb
 import pandas as pd
 from typing import List, Dict, Any
 
 from certus.data.coingecko_client import CoinGeckoClient
+from certus.storage.service import get_service
 from certus.utils.logging import setup_logger
 
 log = setup_logger("fetch_markets")
@@ -70,13 +70,12 @@ def save_markets(
     log.info(f"[✔] Saved Parquet: {parquet_path}")
 
     # DuckDB
-    _ensure_dir(os.path.dirname(duckdb_path))
-    con = duckdb.connect(duckdb_path)
-    try:
-        con.register("df", df)
-        con.execute(f"CREATE OR REPLACE TABLE {duckdb_table} AS SELECT * FROM df")
-    finally:
-        con.close()
+    def _replace(con):
+        con.register("markets_df", df)
+        con.execute(f"CREATE OR REPLACE TABLE {duckdb_table} AS SELECT * FROM markets_df")
+        con.unregister("markets_df")
+
+    get_service(duckdb_path).submit(_replace).result()
     log.info(f"[✔] Updated DuckDB table '{duckdb_table}' → {duckdb_path}")
 
 # ============== 3) Runner ==============
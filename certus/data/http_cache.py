@@ -0,0 +1,94 @@
+# certus/data/http_cache.py
+from __future__ import annotations
+import hashlib, json, os, tempfile, time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def validators(self) -> Dict[str, str]:
+        """Headers for a conditional re-request."""
+        h: Dict[str, str] = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+
+class ResponseCache:
+    """
+    On-disk response cache keyed by URL + params.
+
+    Layout: <root>/<k[:2]>/<k>.body (raw bytes) + <k>.json (validators, stored_at).
+    Writes go through a temp file + os.replace so concurrent readers never see a
+    partial body.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(url: str, params: Dict[str, Any]) -> str:
+        canon = json.dumps({"url": url, "params": {k: str(v) for k, v in sorted(params.items())}},
+                           sort_keys=True)
+        return hashlib.sha1(canon.encode()).hexdigest()
+
+    def _paths(self, key: str):
+        d = self.root / key[:2]
+        return d / f"{key}.body", d / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        body_p, meta_p = self._paths(key)
+        try:
+            meta = json.loads(meta_p.read_text())
+            return CacheEntry(body=body_p.read_bytes(), stored_at=float(meta["stored_at"]),
+                              etag=meta.get("etag"), last_modified=meta.get("last_modified"))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, body: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        body_p, meta_p = self._paths(key)
+        body_p.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(body_p, body)
+        self._write_meta(meta_p, {"stored_at": time.time(), "etag": etag, "last_modified": last_modified})
+
+    def touch(self, key: str) -> None:
+        """Mark an entry fresh again after a 304."""
+        _, meta_p = self._paths(key)
+        try:
+            meta = json.loads(meta_p.read_text())
+        except (OSError, ValueError):
+            return
+        meta["stored_at"] = time.time()
+        self._write_meta(meta_p, meta)
+
+    @staticmethod
+    def _write_meta(path: Path, meta: Dict[str, Any]) -> None:
+        _atomic_write(path, json.dumps(meta).encode())
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,125 @@
+# certus/data/key_pool.py
+from __future__ import annotations
+import asyncio, hashlib, os, threading, time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from certus.utils.rate_limit import TokenBucket, shared_bucket
+
+
+class KeysExhausted(Exception):
+    """Raised when every API key in a pool has been permanently rejected."""
+
+
+@dataclass
+class KeySlot:
+    key: str                      # "" = keyless public access
+    bucket: TokenBucket
+    header: str = "x-cg-pro-api-key"
+    disabled_until: float = 0.0   # inf = rejected for good (401/403)
+    consecutive_429: int = 0
+    calls: int = 0
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {self.header: self.key} if self.key else {}
+
+    def active(self, now: float) -> bool:
+        return self.disabled_until <= now
+
+
+@dataclass
+class KeyPool:
+    """
+    Rotates requests across several API keys, each with its own token bucket.
+
+    `acquire()` picks the active key with the most tokens left, so load spreads
+    by remaining budget rather than round-robin. `report()` feeds back status:
+    401/403 retire a key for good; `max_429` consecutive 429s bench it for
+    `bench_seconds` (monthly credits exhausted or a revoked plan look like this).
+    """
+    slots: List[KeySlot]
+    max_429: int = 3
+    bench_seconds: float = 600.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _pick(self) -> Tuple[Optional[KeySlot], float]:
+        now = time.time()
+        with self._lock:
+            live = [s for s in self.slots if s.active(now)]
+            if live:
+                return max(live, key=lambda s: s.bucket.available()), 0.0
+            soonest = min(s.disabled_until for s in self.slots)
+        if soonest == float("inf"):
+            raise KeysExhausted("all CoinGecko API keys were rejected (401/403)")
+        return None, soonest - now
+
+    async def acquire(self) -> KeySlot:
+        while True:
+            slot, wait = self._pick()
+            if slot is None:
+                await asyncio.sleep(wait)
+                continue
+            await slot.bucket.acquire()
+            if slot.active(time.time()):
+                slot.calls += 1
+                return slot
+
+    def report(self, slot: KeySlot, status: Optional[int], retry_after: Optional[float] = None,
+               default_cooldown: float = 15.0) -> None:
+        with self._lock:
+            if status in (401, 403) and slot.key:
+                slot.disabled_until = float("inf")
+                print(f"[CG] Key {_mask(slot.key)} rejected (HTTP {status}); removed from rotation.")
+            elif status == 429:
+                slot.consecutive_429 += 1
+                slot.bucket.pause(retry_after if retry_after is not None else default_cooldown)
+                if slot.consecutive_429 >= self.max_429 and len(self.slots) > 1:
+                    slot.disabled_until = time.time() + self.bench_seconds
+                    slot.consecutive_429 = 0
+                    print(f"[CG] Key {_mask(slot.key)} throttled {self.max_429}x in a row; "
+                          f"benched for {self.bench_seconds:.0f}s.")
+            elif status is not None and status < 400:
+                slot.consecutive_429 = 0
+
+    def stats(self) -> List[dict]:
+        now = time.time()
+        return [{"key": _mask(s.key), "calls": s.calls, "active": s.active(now),
+                 "tokens": round(s.bucket.available(), 2)} for s in self.slots]
+
+
+def _mask(s: str, head: int = 6) -> str:
+    """Loggable form of an API key."""
+    return f"{s[:head]}…({len(s)} chars)" if s else "(none)"
+
+
+def key_id(key: str) -> str:
+    """Stable non-secret name for a key (bucket names, state file paths)."""
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+_POOLS: Dict[Tuple[str, Tuple[str, ...]], KeyPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def shared_key_pool(base_url: str, keys: List[str], calls_per_min: float, header: str,
+                    state_path: Optional[str] = None) -> KeyPool:
+    """
+    One pool per (base_url, keys) per process, so benching is seen by every client.
+    With `state_path`, each key's bucket is file-backed (one file per key when
+    there are several) and shared with other processes.
+    """
+    ident = (base_url, tuple(keys))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(ident)
+        if pool is None:
+            slots = []
+            for k in keys:
+                name = f"coingecko:{base_url}:{key_id(k)}"
+                state = state_path
+                if state_path and len(keys) > 1:
+                    root, ext = os.path.splitext(state_path)
+                    state = f"{root}.{key_id(k)}{ext or '.json'}"
+                slots.append(KeySlot(k, shared_bucket(name, calls_per_min, state_path=state), header=header))
+            pool = _POOLS[ident] = KeyPool(slots)
+        return pool
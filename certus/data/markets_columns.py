@@ -0,0 +1,159 @@
+# certus/data/markets_columns.py
+"""
+Columnar decode of /coins/markets pages.
+
+Instead of building a 30-key dict per coin and then a DataFrame from the list,
+the response bytes are parsed once (orjson when installed) and Arrow converts
+the decoded list into one struct array of the API fields in a single native
+pass; each canonical column is a (cast / coalesced) child of it, with no
+Python code per row or per column. A page Arrow rejects (integers beyond
+int64 in a supply field) falls back to one list comprehension per field.
+The resulting pa.Table can be registered in DuckDB or written to Parquet
+without going through pandas.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def loads(payload: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            pass  # e.g. integers beyond 64 bits (some total_supply values); stdlib copes
+    return json.loads(payload)
+
+
+# Canonical markets columns (DuckDB types) shared by the fetchers
+CANON_COLS: List[Tuple[str, str]] = [
+    ("ts", "BIGINT"),
+    ("id", "VARCHAR"),
+    ("symbol", "VARCHAR"),
+    ("name", "VARCHAR"),
+    ("vs_currency", "VARCHAR"),
+    ("price", "DOUBLE"),
+    ("market_cap", "DOUBLE"),
+    ("total_volume", "DOUBLE"),
+    ("high_24h", "DOUBLE"),
+    ("low_24h", "DOUBLE"),
+    ("price_change_24h", "DOUBLE"),
+    ("price_change_percentage_1h", "DOUBLE"),
+    ("price_change_percentage_24h", "DOUBLE"),
+    ("price_change_percentage_7d", "DOUBLE"),
+    ("market_cap_change_24h", "DOUBLE"),
+    ("market_cap_change_percentage_24h", "DOUBLE"),
+    ("circulating_supply", "DOUBLE"),
+    ("total_supply", "DOUBLE"),
+    ("max_supply", "DOUBLE"),
+    ("ath", "DOUBLE"),
+    ("ath_change_percentage", "DOUBLE"),
+    ("ath_date", "TIMESTAMP"),
+    ("atl", "DOUBLE"),
+    ("atl_change_percentage", "DOUBLE"),
+    ("atl_date", "TIMESTAMP"),
+    ("last_updated", "TIMESTAMP"),
+    ("image", "VARCHAR"),
+    ("roi_times", "DOUBLE"),
+    ("roi_currency", "VARCHAR"),
+    ("roi_percentage", "DOUBLE"),
+]
+
+_ARROW_TYPES = {
+    "BIGINT": pa.int64(),
+    "DOUBLE": pa.float64(),
+    "VARCHAR": pa.string(),
+    "TIMESTAMP": pa.timestamp("ms"),
+}
+
+MARKETS_SCHEMA = pa.schema([(c, _ARROW_TYPES[t]) for c, t in CANON_COLS])
+
+# Canonical column -> API field(s); first non-null wins.
+_SOURCE: Dict[str, Sequence[str]] = {
+    "price": ("current_price",),
+    "price_change_percentage_1h": ("price_change_percentage_1h_in_currency",),
+    "price_change_percentage_24h": ("price_change_percentage_24h_in_currency", "price_change_percentage_24h"),
+    "price_change_percentage_7d": ("price_change_percentage_7d_in_currency",),
+}
+_ROI = {"roi_times": "times", "roi_currency": "currency", "roi_percentage": "percentage"}
+_CONST = ("ts", "vs_currency")
+
+# API field -> Arrow type it is read as (timestamps stay ISO strings until cast)
+_FIELDS: Dict[str, pa.DataType] = {}
+for _col, _typ in CANON_COLS:
+    if _col not in _CONST and _col not in _ROI:
+        for _key in _SOURCE.get(_col, (_col,)):
+            _FIELDS[_key] = pa.string() if _typ == "TIMESTAMP" else _ARROW_TYPES[_typ]
+_ROI_TYPE = pa.struct([(k, _ARROW_TYPES[dict(CANON_COLS)[c]]) for c, k in _ROI.items()])
+_API_TYPE = pa.struct(list(_FIELDS.items()) + [("roi", _ROI_TYPE)])
+
+
+def _fields_arrow(mkts: List[dict]) -> Dict[str, pa.Array]:
+    """Every API field in one C++ pass over the decoded dicts (extra keys are ignored)."""
+    page = pa.array(mkts, type=_API_TYPE)
+    out = {k: pc.struct_field(page, k) for k in _FIELDS}
+    roi = pc.struct_field(page, "roi")
+    out.update({c: pc.struct_field(roi, k) for c, k in _ROI.items()})
+    return out
+
+
+def _fields_python(mkts: List[dict]) -> Dict[str, pa.Array]:
+    """Fallback for values Arrow rejects (integers beyond int64): one list per field."""
+    out = {}
+    for k, typ in _FIELDS.items():
+        values = [m.get(k) for m in mkts]
+        try:
+            out[k] = pa.array(values, type=typ)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            if typ != pa.float64():
+                raise
+            out[k] = pa.array([None if v is None else float(v) for v in values], type=typ)
+    rois = [m.get("roi") if isinstance(m.get("roi"), dict) else {} for m in mkts]
+    for c, k in _ROI.items():
+        out[c] = pa.array([r.get(k) for r in rois], type=_ROI_TYPE.field(k).type)
+    return out
+
+
+def decode_markets_page(payload: bytes, ts_ms: int, vs_currency: str = "usd",
+                        rows: Optional[List[dict]] = None) -> pa.Table:
+    """
+    Turn one /coins/markets response body into a pa.Table with MARKETS_SCHEMA.
+    Pass `rows` instead of `payload` if the JSON is already parsed.
+    """
+    mkts = rows if rows is not None else loads(payload)
+    n = len(mkts)
+    try:
+        fields = _fields_arrow(mkts)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        fields = _fields_python(mkts)
+    cols: Dict[str, pa.Array] = {}
+    for col, typ in CANON_COLS:
+        if col == "ts":
+            cols[col] = pa.array(np.full(n, ts_ms, dtype=np.int64))
+        elif col == "vs_currency":
+            cols[col] = pa.array([vs_currency.upper()] * n, type=pa.string())
+        elif col == "symbol":
+            cols[col] = pc.utf8_upper(pc.fill_null(fields["symbol"], ""))
+        elif col in _ROI:
+            cols[col] = fields[col]
+        else:
+            keys = _SOURCE.get(col, (col,))
+            arr = fields[keys[0]] if len(keys) == 1 else pc.coalesce(*(fields[k] for k in keys))
+            if typ == "TIMESTAMP":
+                # ISO strings with 'Z': parse as UTC, store naive (DuckDB TIMESTAMP)
+                arr = pc.cast(pc.cast(arr, pa.timestamp("ms", tz="UTC")), pa.timestamp("ms"))
+            cols[col] = arr
+    return pa.table(cols, schema=MARKETS_SCHEMA)
+
+
+def empty_markets_table() -> pa.Table:
+    return MARKETS_SCHEMA.empty_table()
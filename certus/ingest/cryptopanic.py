@@ -1,13 +1,19 @@
 from __future__ import annotations
 from typing import Any, Dict
 from certus.utils.env import get_env
-from certus.utils.http import get_json
+from certus.utils.http import get_json, aget_json
 
 BASE = "https://cryptopanic.com/api/developer/v2"
 
-def latest_posts(public: bool = True, currencies: str | None = None, page: int = 1) -> Dict[str, Any]:
+def _posts_params(public: bool, currencies: str | None, page: int) -> Dict[str, Any]:
     token = get_env("CRYPTOPANIC_API_KEY")
     params = {"auth_token": token, "public": str(public).lower(), "page": page}
     if currencies:
         params["currencies"] = currencies
-    return get_json(f"{BASE}/posts/", params=params)
+    return params
+
+def latest_posts(public: bool = True, currencies: str | None = None, page: int = 1) -> Dict[str, Any]:
+    return get_json(f"{BASE}/posts/", params=_posts_params(public, currencies, page))
+
+async def alatest_posts(public: bool = True, currencies: str | None = None, page: int = 1) -> Dict[str, Any]:
+    return await aget_json(f"{BASE}/posts/", params=_posts_params(public, currencies, page))
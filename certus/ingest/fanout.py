@@ -0,0 +1,45 @@
+from __future__ import annotations
+import asyncio, os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple
+from certus.utils.logging import logger
+from certus.utils.rate_limit import TokenBucket, shared_bucket
+
+# (calls per minute, burst) per provider, free-tier defaults.
+# Override with <PROVIDER>_CALLS_PER_MIN, e.g. FINNHUB_CALLS_PER_MIN=300.
+PROVIDER_LIMITS: Dict[str, Tuple[float, float]] = {
+    "finnhub": (60, 30),        # 60/min, hard cap 30/s
+    "alphavantage": (5, 5),     # 5/min (and 25/day on free keys)
+    "cryptopanic": (60, 5),
+    "coinmarketcal": (60, 5),
+}
+
+def provider_bucket(provider: str) -> TokenBucket:
+    cpm, burst = PROVIDER_LIMITS.get(provider, (60, 5))
+    try:
+        cpm = float(os.getenv(f"{provider.upper()}_CALLS_PER_MIN") or cpm)
+    except ValueError:
+        pass
+    return shared_bucket(f"provider:{provider}", cpm, burst=min(burst, cpm))
+
+async def fan_out(fn: Callable[[Any], Awaitable[Any]], items: Iterable[Hashable], provider: str,
+                  concurrency: int = 16) -> Dict[Hashable, Any]:
+    """
+    Run `fn(item)` for every item concurrently, paced by the provider's shared
+    token bucket and capped at `concurrency` in flight.
+    Returns {item: result}; failures map to the raised exception instead.
+    """
+    bucket = provider_bucket(provider)
+    sem = asyncio.Semaphore(concurrency)
+    items = list(dict.fromkeys(items))
+
+    async def one(item):
+        async with sem:
+            await bucket.acquire()
+            try:
+                return await fn(item)
+            except Exception as e:
+                logger.warning(f"[fan_out:{provider}] {item} — {e}")
+                return e
+
+    results = await asyncio.gather(*(one(i) for i in items))
+    return dict(zip(items, results))
@@ -1,11 +1,16 @@
 from __future__ import annotations
 from typing import Any, Dict
 from certus.utils.env import get_env
-from certus.utils.http import get_json
+from certus.utils.http import get_json, aget_json
 
 BASE = "https://finnhub.io/api/v1"
 
-def quote(symbol: str = "AAPL") -> Dict[str, Any]:
+def _quote_params(symbol: str) -> Dict[str, Any]:
     token = get_env("FINNHUB_API_KEY")
-    params = {"symbol": symbol, "token": token}
-    return get_json(f"{BASE}/quote", params=params)
+    return {"symbol": symbol, "token": token}
+
+def quote(symbol: str = "AAPL") -> Dict[str, Any]:
+    return get_json(f"{BASE}/quote", params=_quote_params(symbol))
+
+async def aquote(symbol: str = "AAPL") -> Dict[str, Any]:
+    return await aget_json(f"{BASE}/quote", params=_quote_params(symbol))
@@ -0,0 +1,217 @@
+"""
+Async historical backfill engine.
+
+Fetches market_chart history for many coins concurrently through
+CoinGeckoClient (so the plan's rate budget, key rotation and retries apply),
+buffers the results and writes them to DuckDB in batches through the
+process-wide storage service (one writer connection, see storage.service).
+
+Progress is recorded per coin in `backfill_progress`, in the same transaction
+as the coin's rows, so an interrupted run resumes with exactly the coins that
+were not written yet. Once a run leaves every coin of its universe done, the
+job is complete and its checkpoints are cleared: the next run fetches a fresh
+window instead of skipping everything.
+
+With `gaps_only=True` the engine plans against what is already stored
+(see gaps.plan_gaps) and requests market_chart/range only for the missing
+ranges; coins that are fully covered cost no request at all.
+"""
+
+from __future__ import annotations
+import asyncio, logging, time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from ..data.chart_columns import chart_frame
+from ..data.coingecko_client import CoinGeckoClient, CoinGeckoHTTPError
+from ..storage.schema import MARKETS_SCHEMA
+from ..storage.service import StorageService, get_service
+from .gaps import DAY_MS, EARLIEST_MS, INTERVAL_MS, Gap, clip_to_gap, plan_gaps
+
+log = logging.getLogger("certus.backfill")
+
+CHECKPOINT_TABLE = "backfill_progress"
+CHECKPOINT_DDL = f"""
+CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+    job        VARCHAR,
+    id         VARCHAR,
+    status     VARCHAR,      -- 'done' | 'error'
+    rows       BIGINT,
+    error      VARCHAR,
+    updated_at TIMESTAMP
+)
+"""
+
+
+@dataclass
+class BackfillStats:
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    rows: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class BackfillEngine:
+    def __init__(self, db_path: str, vs: str = "usd", days: str = "90", interval: Optional[str] = "daily",
+                 table: str = "markets", job: Optional[str] = None,
+                 concurrency: int = 8, batch_rows: int = 50_000, gaps_only: bool = False):
+        self.db_path = db_path
+        self.vs = vs.lower()
+        self.days = str(days)
+        self.interval = interval
+        self.table = table
+        # same parameters -> same job -> resumable
+        self.job = job or f"market_chart:{self.vs}:{self.days}:{interval or 'auto'}"
+        self.concurrency = concurrency
+        self.batch_rows = batch_rows
+        self.gaps_only = gaps_only
+        self.step_ms = INTERVAL_MS.get(interval or "", DAY_MS)
+        self._plan: Dict[str, List[Gap]] = {}
+        self._svc: Optional[StorageService] = None
+        self._buffer: List[Tuple[str, pd.DataFrame]] = []
+        self._buffered_rows = 0
+
+    # ---- storage (shared writer service) ----
+    def _open(self) -> StorageService:
+        svc = get_service(self.db_path)
+        if self.table == "markets":
+            svc.execute(MARKETS_SCHEMA)
+        svc.execute(CHECKPOINT_DDL).result()
+        return svc
+
+    def completed_ids(self) -> set:
+        with self._svc.reader() as cur:
+            rows = cur.execute(
+                f"SELECT DISTINCT id FROM {CHECKPOINT_TABLE} WHERE job = ? AND status = 'done'", [self.job]
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def reset(self) -> None:
+        self._svc.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE job = ?", [self.job]).result()
+
+    def window(self, now_ms: Optional[int] = None) -> Tuple[int, int]:
+        end = now_ms if now_ms is not None else int(time.time() * 1000)
+        start = EARLIEST_MS if self.days == "max" else end - int(float(self.days) * DAY_MS)
+        return start, end
+
+    def plan(self, ids: List[str]) -> Dict[str, List[Gap]]:
+        """Missing ranges per coin; coins already done for this job skip their head gap."""
+        start, end = self.window()
+        done = self.completed_ids()
+        with self._svc.reader() as cur:
+            return plan_gaps(cur, self.table, ids, start, end, self.step_ms, head_known=done)
+
+    def _mark(self, con, coin_id: str, status: str, rows: int = 0, error: Optional[str] = None) -> None:
+        con.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE job = ? AND id = ?", [self.job, coin_id])
+        con.execute(
+            f"INSERT INTO {CHECKPOINT_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+            [self.job, coin_id, status, rows, error, datetime.now(timezone.utc).replace(tzinfo=None)],
+        )
+
+    def _write_batch(self, con, batch: List[Tuple[str, pd.DataFrame]]) -> int:
+        # runs on the storage writer thread, inside its transaction
+        frames = [df for _, df in batch if not df.empty]
+        if frames:
+            staging = pd.concat(frames, ignore_index=True)
+            con.register("staging_df", staging)
+            con.execute(f"CREATE TABLE IF NOT EXISTS {self.table} AS SELECT * FROM staging_df LIMIT 0")
+            existing = {r[1] for r in con.execute(f"PRAGMA table_info('{self.table}')").fetchall()}
+            for col, dtype in zip(staging.columns, staging.dtypes):
+                if col not in existing:
+                    typ = "DOUBLE" if pd.api.types.is_float_dtype(dtype) else \
+                          "BIGINT" if pd.api.types.is_integer_dtype(dtype) else "VARCHAR"
+                    con.execute(f"ALTER TABLE {self.table} ADD COLUMN {col} {typ}")
+            # skip points already stored for (id, ts)
+            con.execute(f"""
+                INSERT INTO {self.table} BY NAME
+                SELECT s.* FROM staging_df s
+                ANTI JOIN (SELECT id, ts FROM {self.table}) m
+                ON s.id = m.id AND s.ts = m.ts
+            """)
+            con.unregister("staging_df")
+        for coin_id, df in batch:
+            self._mark(con, coin_id, "done", len(df))
+        return sum(len(df) for _, df in batch)
+
+    async def _mark_error(self, coin_id: str, error: str) -> None:
+        await asyncio.wrap_future(self._svc.submit(self._mark, coin_id, "error", 0, error[:500]))
+
+    async def _flush(self) -> None:
+        batch, self._buffer, self._buffered_rows = self._buffer, [], 0
+        if batch:
+            await asyncio.wrap_future(self._svc.submit(self._write_batch, batch))
+
+    # ---- fetch ----
+    async def _fetch(self, client: CoinGeckoClient, coin_id: str, symbol: str) -> pd.DataFrame:
+        if not self.gaps_only:
+            chart = await client.market_chart(coin_id, self.vs, self.days, self.interval)
+            return chart_frame(chart, coin_id, symbol, self.vs)
+        step = self.step_ms if self.interval else None
+        frames = []
+        for gap in self._plan.get(coin_id, []):
+            frm, to = gap
+            chart = await client.market_chart_range(coin_id, self.vs, frm // 1000, -(-to // 1000),
+                                                    granularity=self.interval if self.interval == "hourly" else "auto")
+            frames.append(clip_to_gap(chart_frame(chart, coin_id, symbol, self.vs), gap, step))
+        frames = [f for f in frames if not f.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    async def run(self, universe: List[Tuple[str, str]], restart: bool = False,
+                  client: Optional[CoinGeckoClient] = None) -> BackfillStats:
+        stats = BackfillStats()
+        self._svc = self._open()
+        own_client = client is None
+        client = client or CoinGeckoClient()
+        try:
+            if restart:
+                self.reset()
+            if self.gaps_only:
+                # coverage is the checkpoint: fully covered coins have no gaps
+                self._plan = self.plan([cid for cid, _ in universe])
+                pending = [(cid, sym) for cid, sym in universe if self._plan.get(cid)]
+                n_gaps = sum(len(g) for g in self._plan.values())
+                log.info(f"[backfill] gap plan: {n_gaps} ranges across {len(pending)} coins")
+            else:
+                done = self.completed_ids()
+                pending = [(cid, sym) for cid, sym in universe if cid not in done]
+            stats.skipped = len(universe) - len(pending)
+            log.info(f"[backfill] job={self.job} pending={len(pending)} already_done={stats.skipped}")
+
+            sem = asyncio.Semaphore(self.concurrency)
+            total = len(pending)
+
+            async def one(i: int, coin_id: str, symbol: str):
+                async with sem:
+                    try:
+                        df = await self._fetch(client, coin_id, symbol)
+                    except Exception as e:
+                        # any per-coin failure (HTTP, transport, malformed payload) is recorded
+                        # and the run goes on; only the storage writer can stop the whole job
+                        msg = str(e) if isinstance(e, (CoinGeckoHTTPError, ValueError)) else f"{type(e).__name__}: {e}"
+                        stats.failed += 1
+                        stats.errors[coin_id] = msg
+                        await self._mark_error(coin_id, msg)
+                        log.error(f"[{i}/{total}] Failed {symbol} ({coin_id}): {msg}")
+                        return
+                stats.done += 1
+                stats.rows += len(df)
+                log.info(f"[{i}/{total}] {symbol:<8} ({coin_id}) → rows: {len(df)}")
+                self._buffer.append((coin_id, df))
+                self._buffered_rows += len(df)
+                if self._buffered_rows >= self.batch_rows:
+                    await self._flush()
+
+            await asyncio.gather(*(one(i, cid, sym) for i, (cid, sym) in enumerate(pending, start=1)))
+            await self._flush()
+            # gaps_only plans from coverage and keeps 'done' as the head-gap record
+            if not self.gaps_only and self.completed_ids() >= {cid for cid, _ in universe}:
+                log.info(f"[backfill] job={self.job} complete; clearing checkpoints")
+                self.reset()
+        finally:
+            if own_client:
+                await client.close()
+            self._svc = None
+        return stats
@@ -0,0 +1,102 @@
+"""
+Coverage gap planner for per-coin price history.
+
+Stored points are bucketed by the backfill step (a day or an hour); a gap is
+any run of empty buckets inside the requested window. Gaps come back as
+half-open ms ranges [frm, to) aligned to bucket starts, so a caller can issue
+one market_chart/range request per gap and keep only the points that land in
+it.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import duckdb, pandas as pd
+
+DAY_MS = 86_400_000
+INTERVAL_MS = {"daily": DAY_MS, "hourly": 3_600_000}
+
+# CoinGecko has no market data before this (2013-04-28 UTC)
+EARLIEST_MS = 1_367_107_200_000
+
+Gap = Tuple[int, int]
+
+
+def _floor(ts: int, step: int) -> int:
+    return ts - ts % step
+
+
+def plan_gaps(con: duckdb.DuckDBPyConnection, table: str, ids: Iterable[str], start_ms: int, end_ms: int,
+              step_ms: int = DAY_MS, head_known: Optional[Iterable[str]] = None) -> Dict[str, List[Gap]]:
+    """
+    Missing ranges per coin between start_ms and end_ms (inclusive).
+
+    A coin with no rows gets the whole window. Otherwise there is a head gap
+    (window start -> first stored bucket), interior gaps, and a tail gap
+    (after the last stored bucket -> end_ms). Ids in `head_known` skip the head
+    gap: their history was already fetched from the window start and simply
+    begins later (a coin launched after `start_ms`).
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    head_known = set(head_known or ())
+    lo, hi = _floor(max(start_ms, EARLIEST_MS), step_ms), end_ms
+    plan: Dict[str, List[Gap]] = {cid: [] for cid in ids}
+
+    exists = con.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [table]
+    ).fetchone()[0]
+    if not exists:
+        return {cid: [(lo, hi)] for cid in ids}
+
+    con.register("gap_ids", pd.DataFrame({"id": ids}))
+    try:
+        bounds = con.execute(f"""
+            SELECT id, min(ts - ts % {step_ms}), max(ts - ts % {step_ms})
+            FROM {table}
+            WHERE id IN (SELECT id FROM gap_ids) AND ts BETWEEN ? AND ?
+            GROUP BY id
+        """, [lo, hi]).fetchall()
+        holes = con.execute(f"""
+            WITH b AS (
+                SELECT DISTINCT id, ts - ts % {step_ms} AS bk
+                FROM {table}
+                WHERE id IN (SELECT id FROM gap_ids) AND ts BETWEEN ? AND ?
+            ), l AS (
+                SELECT id, bk, lag(bk) OVER (PARTITION BY id ORDER BY bk) AS prev FROM b
+            )
+            SELECT id, prev + {step_ms}, bk FROM l WHERE bk - prev > {step_ms}
+            ORDER BY id, bk
+        """, [lo, hi]).fetchall()
+    finally:
+        con.unregister("gap_ids")
+
+    first_last = {cid: (first, last) for cid, first, last in bounds}
+    for cid in ids:
+        if cid not in first_last:
+            plan[cid].append((lo, hi))
+            continue
+        first, _ = first_last[cid]
+        if first > lo and cid not in head_known:
+            plan[cid].append((lo, first))
+    for cid, frm, to in holes:
+        plan[cid].append((int(frm), int(to)))
+    for cid, (_, last) in first_last.items():
+        if last + step_ms <= hi:
+            plan[cid].append((last + step_ms, hi))
+    return plan
+
+
+def clip_to_gap(df: pd.DataFrame, gap: Gap, step_ms: Optional[int]) -> pd.DataFrame:
+    """
+    Keep the points of a range response that fall inside `gap`. With a step,
+    thin to the first point per bucket so a short range (which the API returns
+    at 5-minute resolution) matches the stored daily/hourly series.
+    """
+    frm, to = gap
+    out = df[(df["ts"] >= frm) & (df["ts"] < to)]
+    if step_ms and not out.empty:
+        out = out.assign(_bk=out["ts"] - out["ts"] % step_ms).sort_values("ts")
+        out = out.drop_duplicates("_bk").drop(columns="_bk")
+    return out.reset_index(drop=True)
@@ -4,6 +4,7 @@ import pandas as pd
 from typing import List
 from ..data.coingecko_client import CoinGeckoClient
 from ..models.market import MarketQuote
+from .symbol_index import resolve_symbols
 from ..storage.io import to_parquet, to_duckdb
 from ..config import SETTINGS
 
@@ -17,16 +18,9 @@ def parse_args():
     return ap.parse_args()
 
 async def _resolve_ids(client: CoinGeckoClient, symbols: List[str]) -> List[str]:
-    listed = await client.coins_list(include_platform=True)
-    sym_map = {}
-    for c in listed:
-        sym_map.setdefault(c['symbol'].upper(), []).append(c['id'])
-    ids = []
-    for s in symbols:
-        if s.upper() in sym_map:
-            # prefer the first, CoinGecko symbols are unique-ish but duplicates exist
-            ids.append(sym_map[s.upper()][0])
-    return ids
+    # duplicates resolve to the highest market cap coin (see symbol_index)
+    id_map = await resolve_symbols(client, symbols)
+    return [id_map[s.upper()] for s in symbols if s.upper() in id_map]
 
 async def main():
     args = parse_args()
@@ -0,0 +1,141 @@
+"""
+Persistent SYMBOL -> CoinGecko id index.
+
+CoinGecko symbols are not unique (hundreds of tokens call themselves "ETH"), so
+each symbol's candidates are ranked by market cap and rank 1 wins. The table
+lives in DuckDB (written through the storage service); ingest jobs load the
+rank-1 rows into a dict once at startup and only touch the network when the
+index is older than the refresh TTL.
+"""
+
+from __future__ import annotations
+import asyncio, os, time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+import duckdb, pandas as pd
+from ..data.coingecko_client import CoinGeckoClient
+from ..config import SETTINGS
+from ..storage.service import StorageService, get_service
+
+TABLE = "cg_symbol_index"
+DDL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    symbol       VARCHAR,
+    id           VARCHAR,
+    name         VARCHAR,
+    market_cap   DOUBLE,
+    rank         INTEGER,
+    refreshed_at TIMESTAMP
+)
+"""
+
+REFRESH_TTL_S = float(os.getenv("CG_SYMBOL_INDEX_TTL_H", "24")) * 3600
+CAP_PAGES = int(os.getenv("CG_SYMBOL_INDEX_CAP_PAGES", "4"))  # top 1000 coins get a market cap
+
+
+def _apply_refresh(con: duckdb.DuckDBPyConnection, listed: pd.DataFrame, caps: pd.DataFrame,
+                   now: datetime) -> None:
+    """Merge coins/list and market caps into the index and re-rank (writer thread)."""
+    con.register("listed", listed)
+    con.register("caps", caps)
+    try:
+        con.execute(f"DELETE FROM {TABLE} WHERE id NOT IN (SELECT id FROM listed)")
+        con.execute(f"""
+            INSERT INTO {TABLE} (symbol, id, name)
+            SELECT l.symbol, l.id, l.name FROM listed l
+            ANTI JOIN {TABLE} t ON t.id = l.id
+        """)
+        # symbol/name can change upstream; caps only for coins we just saw
+        con.execute(f"""
+            UPDATE {TABLE} SET symbol = l.symbol, name = l.name
+            FROM listed l WHERE {TABLE}.id = l.id
+        """)
+        con.execute(f"""
+            UPDATE {TABLE} SET market_cap = c.market_cap
+            FROM caps c WHERE {TABLE}.id = c.id
+        """)
+        con.execute(f"""
+            UPDATE {TABLE} SET rank = r.rn, refreshed_at = ?
+            FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY symbol ORDER BY market_cap DESC NULLS LAST, id
+                ) AS rn
+                FROM {TABLE}
+            ) r
+            WHERE {TABLE}.id = r.id
+        """, [now])
+    finally:
+        con.unregister("listed")
+        con.unregister("caps")
+
+
+class SymbolIndex:
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or SETTINGS.duckdb_path
+        self._best: Dict[str, str] = {}
+        self._svc: Optional[StorageService] = None
+
+    def _service(self) -> StorageService:
+        if self._svc is None:
+            svc = get_service(self.db_path)
+            svc.execute(DDL).result()
+            self._svc = svc
+        return self._svc
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last refresh (None if never built)."""
+        with self._service().reader() as cur:
+            ts = cur.execute(f"SELECT epoch(max(refreshed_at)) FROM {TABLE}").fetchone()[0]
+        return None if ts is None else time.time() - float(ts)
+
+    def load(self) -> Dict[str, str]:
+        with self._service().reader() as cur:
+            rows = cur.execute(f"SELECT symbol, id FROM {TABLE} WHERE rank = 1").fetchall()
+        self._best = dict(rows)
+        return self._best
+
+    def resolve(self, symbols: Iterable[str]) -> Dict[str, str]:
+        """Map each known symbol (upper-cased) to its highest-market-cap id."""
+        out = {}
+        for s in symbols:
+            cid = self._best.get(s.upper())
+            if cid:
+                out[s.upper()] = cid
+        return out
+
+    async def refresh(self, client: CoinGeckoClient, force: bool = False) -> bool:
+        """
+        Bring the index up to date if stale: add new ids, drop delisted ones,
+        refresh market caps for the top CAP_PAGES pages and re-rank duplicates.
+        coins/list is disk-cached by the client, so a refresh is usually a 304.
+        """
+        age = self.age()
+        if not force and age is not None and age < REFRESH_TTL_S:
+            return False
+
+        listed = pd.DataFrame(
+            [{"symbol": (c.get("symbol") or "").upper(), "id": c.get("id"), "name": c.get("name")}
+             for c in await client.coins_list() if c.get("id")],
+            columns=["symbol", "id", "name"],
+        )
+        caps: List[dict] = []
+        for page in range(1, CAP_PAGES + 1):
+            mk = await client.coins_markets(per_page=250, page=page)
+            caps += [{"id": m.get("id"), "market_cap": m.get("market_cap")} for m in mk]
+            if len(mk) < 250:
+                break
+        caps_df = pd.DataFrame(caps, columns=["id", "market_cap"]).drop_duplicates("id")
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        # one transaction on the storage writer thread
+        await asyncio.wrap_future(self._service().submit(_apply_refresh, listed, caps_df, now))
+        return True
+
+
+async def resolve_symbols(client: CoinGeckoClient, symbols: List[str],
+                          db_path: Optional[str] = None) -> Dict[str, str]:
+    """Refresh-if-stale, then resolve. Returns {SYMBOL: id} for known symbols."""
+    idx = SymbolIndex(db_path)
+    await idx.refresh(client)
+    idx.load()
+    return idx.resolve(symbols)
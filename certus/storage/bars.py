@@ -0,0 +1,243 @@
+"""
+Multi-timeframe OHLCV bars maintained in `ohlcv`.
+
+    markets ticks -> 1m -> 5m -> 15m -> 1h -> 4h -> 1d
+
+Each tier is built from the one below it, never from raw ticks, so a run
+only touches the buckets that new data can change. The bars are their own
+watermark: per (id, vs_currency) the newest 1m bar is rebuilt from ticks at
+or after its start (it may have been partial), together with every newer
+minute. Every higher tier then rebuilds just the buckets that contain a
+rebuilt child bar.
+
+Ticks that arrive behind the watermark (a backfill of older history) cannot
+be handled that way: the finer tiers and raw ticks around them may already
+be pruned. `ohlcv_ticks` keeps, per asset, how many ticks were behind its
+watermark after the last build; when that count grew, the asset's older
+ticks are merged straight into the existing bar of every tier (earliest
+open, latest close by open_ts / close_ts, max high, min low). The merge is
+idempotent, so ticks a bar already contains change nothing.
+
+Bars: open/close are the first/last value in the bucket, high/low the
+extremes, volume the last value (total_volume is already a rolling 24h
+figure, summing it would be meaningless). Buckets are aligned to UTC midnight.
+
+This module is the only writer of bars; retention.py builds them before it
+prunes ticks and old bars.
+"""
+
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+
+import duckdb
+import pandas as pd
+
+BAR_KEY = ("id", "vs_currency", "timeframe", "ts")
+
+# timeframe -> (bucket width, timeframe it is built from)
+TIMEFRAMES: Dict[str, Tuple[str, Optional[str]]] = {
+    "1m": ("1 minute", None),
+    "5m": ("5 minutes", "1m"),
+    "15m": ("15 minutes", "5m"),
+    "1h": ("1 hour", "15m"),
+    "4h": ("4 hours", "1h"),
+    "1d": ("1 day", "4h"),
+}
+
+
+def ensure_ohlcv(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS ohlcv (
+            id TEXT, symbol TEXT, ts TIMESTAMP,
+            open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE, volume DOUBLE
+        )
+    """)
+    con.execute("ALTER TABLE ohlcv ADD COLUMN IF NOT EXISTS vs_currency TEXT")
+    con.execute("ALTER TABLE ohlcv ADD COLUMN IF NOT EXISTS timeframe TEXT")
+    con.execute("ALTER TABLE ohlcv ADD COLUMN IF NOT EXISTS open_ts TIMESTAMP")
+    con.execute("ALTER TABLE ohlcv ADD COLUMN IF NOT EXISTS close_ts TIMESTAMP")
+    # ticks behind each asset's watermark as of the last build (late-tick detection)
+    con.execute("CREATE TABLE IF NOT EXISTS ohlcv_ticks (id TEXT, vs_currency TEXT, behind BIGINT)")
+
+
+def _columns(con: duckdb.DuckDBPyConnection, table: str) -> Dict[str, str]:
+    return {r[1]: r[2] for r in con.execute(f"PRAGMA table_info('{table}')").fetchall()}
+
+
+def tick_exprs(cols: Dict[str, str], alias: str = "") -> Tuple[str, str]:
+    """(timestamp, vs_currency) SQL expressions for a tick table with columns `cols`."""
+    a = f"{alias}." if alias else ""
+    ts = f"epoch_ms(CAST({a}ts AS BIGINT))" if cols.get("ts") in ("BIGINT", "INTEGER", "DOUBLE") \
+        else f"CAST({a}ts AS TIMESTAMP)"
+    if "last_updated" in cols:
+        lu = f"CAST({a}last_updated AS TIMESTAMP)"
+        ts = f"COALESCE({lu}, {ts})" if "ts" in cols else lu
+    vs = f"upper({a}vs_currency)" if "vs_currency" in cols else "'USD'"
+    return ts, vs
+
+
+def _bucket(width: str, ts: str) -> str:
+    return f"time_bucket(INTERVAL '{width}', {ts}, TIMESTAMP '2000-01-01')"
+
+
+def _replace_bars(con: duckdb.DuckDBPyConnection) -> int:
+    """Swap the bars in temp table new_bars into ohlcv; leaves new_bars for the next tier."""
+    match = " AND ".join(f"o.{k} IS NOT DISTINCT FROM n.{k}" for k in BAR_KEY)
+    con.execute(f"DELETE FROM ohlcv o USING new_bars n WHERE {match}")
+    con.execute("INSERT INTO ohlcv BY NAME SELECT * FROM new_bars")
+    return con.execute("SELECT count(*) FROM new_bars").fetchone()[0]
+
+
+def _ticks(con: duckdb.DuckDBPyConnection, table: str) -> str:
+    """CTEs `ticks` (id, symbol, vs_currency, t, price, vol) and `since` (1m watermark per asset)."""
+    cols = _columns(con, table)
+    ts, vs = tick_exprs(cols)
+    vol = next((c for c in ("total_volume", "volume_24h", "volume") if c in cols), "NULL")
+    sym = "symbol" if "symbol" in cols else "NULL"
+    return f"""
+        ticks AS (
+            SELECT id, {sym} AS symbol, {vs} AS vs_currency, {ts} AS t, price, {vol} AS vol
+            FROM {table}
+            WHERE price IS NOT NULL AND id IS NOT NULL
+        ),
+        since AS (
+            SELECT id, vs_currency, max(ts) AS since FROM ohlcv WHERE timeframe = '1m' GROUP BY ALL
+        )"""
+
+
+def _tick_bars(timeframe: str, src: str) -> str:
+    """Bars of `timeframe` aggregated straight from the ticks in `src`."""
+    bucket = _bucket(TIMEFRAMES[timeframe][0], "k.t")
+    return f"""
+        SELECT k.id, any_value(k.symbol) AS symbol, k.vs_currency, '{timeframe}' AS timeframe, {bucket} AS ts,
+               arg_min(k.price, k.t) AS open, max(k.price) AS high, min(k.price) AS low,
+               arg_max(k.price, k.t) AS close, arg_max(k.vol, k.t) AS volume,
+               min(k.t) AS open_ts, max(k.t) AS close_ts
+        FROM {src} k
+        GROUP BY k.id, k.vs_currency, {bucket}"""
+
+
+def _minute_bars(con: duckdb.DuckDBPyConnection, table: str) -> None:
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE new_bars AS
+        WITH {_ticks(con, table)},
+        fresh AS (
+            SELECT k.* FROM ticks k
+            LEFT JOIN since s ON s.id = k.id AND s.vs_currency IS NOT DISTINCT FROM k.vs_currency
+            WHERE k.t IS NOT NULL AND (s.since IS NULL OR k.t >= s.since)
+        )
+        {_tick_bars("1m", "fresh")}
+    """)
+
+
+def _late_ticks(con: duckdb.DuckDBPyConnection, table: str) -> int:
+    """Temp table late_ticks: every tick behind the watermark of assets whose behind-count grew."""
+    return con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE late_ticks AS
+        WITH {_ticks(con, table)},
+        behind AS (
+            SELECT k.* FROM ticks k
+            JOIN since s ON s.id = k.id AND s.vs_currency IS NOT DISTINCT FROM k.vs_currency
+            WHERE k.t < s.since
+        ),
+        grown AS (
+            SELECT b.id, b.vs_currency FROM behind b
+            JOIN ohlcv_ticks m ON m.id = b.id AND m.vs_currency IS NOT DISTINCT FROM b.vs_currency
+            GROUP BY ALL HAVING count(*) > any_value(m.behind)
+        )
+        SELECT b.id, b.symbol, b.vs_currency, b.t, b.price, b.vol FROM behind b
+        SEMI JOIN grown g ON g.id = b.id AND g.vs_currency IS NOT DISTINCT FROM b.vs_currency
+    """).fetchone()[0]
+
+
+def _merge_late(con: duckdb.DuckDBPyConnection, timeframe: str) -> None:
+    """new_bars: each `timeframe` bar touched by late_ticks, merged with the bar already stored."""
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE new_bars AS
+        WITH late AS ({_tick_bars(timeframe, "late_ticks")}),
+        pair AS (
+            SELECT l.*, o.symbol AS o_symbol, o.open AS o_open, o.high AS o_high, o.low AS o_low,
+                   o.close AS o_close, o.volume AS o_volume, o.open_ts AS o_open_ts, o.close_ts AS o_close_ts,
+                   o.ts IS NULL OR l.open_ts < coalesce(o.open_ts, o.ts) AS late_open,
+                   o.ts IS NULL OR l.close_ts >= coalesce(o.close_ts, o.ts) AS late_close
+            FROM late l
+            LEFT JOIN ohlcv o ON o.timeframe = l.timeframe AND o.id = l.id
+                 AND o.vs_currency IS NOT DISTINCT FROM l.vs_currency AND o.ts = l.ts
+        )
+        SELECT id, coalesce(o_symbol, symbol) AS symbol, vs_currency, timeframe, ts,
+               CASE WHEN late_open THEN open ELSE o_open END AS open,
+               greatest(high, o_high) AS high, least(low, o_low) AS low,
+               CASE WHEN late_close THEN close ELSE o_close END AS close,
+               CASE WHEN late_close THEN volume ELSE o_volume END AS volume,
+               least(open_ts, o_open_ts) AS open_ts, greatest(close_ts, o_close_ts) AS close_ts
+        FROM pair
+    """)
+
+
+def _mark_ticks(con: duckdb.DuckDBPyConnection, table: str) -> None:
+    """Record how many ticks each barred asset has behind its watermark now."""
+    con.execute("DELETE FROM ohlcv_ticks")
+    con.execute(f"""
+        INSERT INTO ohlcv_ticks
+        WITH {_ticks(con, table)}
+        SELECT s.id, s.vs_currency, count(k.t) AS behind
+        FROM since s
+        LEFT JOIN ticks k ON k.id = s.id AND k.vs_currency IS NOT DISTINCT FROM s.vs_currency AND k.t < s.since
+        GROUP BY ALL
+    """)
+
+
+def _rollup_bars(con: duckdb.DuckDBPyConnection, timeframe: str) -> None:
+    """new_bars (the child tier's rebuilt bars) -> rebuilt bars of `timeframe`."""
+    width, child = TIMEFRAMES[timeframe]
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE next_bars AS
+        WITH dirty AS (
+            SELECT id, vs_currency, {_bucket(width, "min(ts)")} AS since FROM new_bars GROUP BY ALL
+        )
+        SELECT o.id, any_value(o.symbol) AS symbol, o.vs_currency, '{timeframe}' AS timeframe,
+               {_bucket(width, "o.ts")} AS ts,
+               arg_min(o.open, o.ts) AS open, max(o.high) AS high, min(o.low) AS low,
+               arg_max(o.close, o.ts) AS close, arg_max(o.volume, o.ts) AS volume,
+               min(o.open_ts) AS open_ts, max(o.close_ts) AS close_ts
+        FROM ohlcv o
+        JOIN dirty d ON d.id = o.id AND d.vs_currency IS NOT DISTINCT FROM o.vs_currency
+        WHERE o.timeframe = '{child}' AND o.ts >= d.since
+        GROUP BY o.id, o.vs_currency, {_bucket(width, "o.ts")}
+    """)
+    con.execute("DROP TABLE new_bars")
+    con.execute("ALTER TABLE next_bars RENAME TO new_bars")
+
+
+def build_bars(con: duckdb.DuckDBPyConnection, table: str = "markets") -> Dict[str, int]:
+    """Bring every tier up to date with `table`; returns bars rebuilt or merged per timeframe."""
+    ensure_ohlcv(con)
+    stats: Dict[str, int] = {tf: 0 for tf in TIMEFRAMES}
+    # late ticks first: the rollups below then see their merged child bars
+    if _late_ticks(con, table):
+        for tf in TIMEFRAMES:
+            _merge_late(con, tf)
+            stats[tf] += _replace_bars(con)
+    con.execute("DROP TABLE late_ticks")
+    for tf, (_, child) in TIMEFRAMES.items():
+        if child is None:
+            _minute_bars(con, table)
+        else:
+            _rollup_bars(con, tf)
+        stats[tf] += _replace_bars(con)
+    con.execute("DROP TABLE new_bars")
+    _mark_ticks(con, table)
+    return stats
+
+
+def read_bars(con: duckdb.DuckDBPyConnection, coin_id: str, timeframe: str = "1h", vs_currency: str = "USD",
+              start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Pre-aggregated bars [start, end) for one coin, oldest first (ts, open, high, low, close, volume)."""
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"timeframe must be one of {sorted(TIMEFRAMES)}")
+    return con.execute("""
+        SELECT ts, open, high, low, close, volume FROM ohlcv
+        WHERE id = ? AND timeframe = ? AND upper(vs_currency) = upper(?)
+          AND (CAST(? AS TIMESTAMP) IS NULL OR ts >= ?) AND (CAST(? AS TIMESTAMP) IS NULL OR ts < ?)
+        ORDER BY ts
+    """, [coin_id, timeframe, vs_currency, start, start, end, end]).df()
@@ -0,0 +1,138 @@
+"""
+Hive-partitioned Parquet datasets.
+
+    <root>/date=2025-01-31/hour=13/vs_currency=USD/part-<uuid>-0.parquet
+
+Each write adds new files under the partitions its rows fall into (date and
+hour of `ts`, in UTC), so a minutely loop never rewrites existing data. The
+partition keys live in the directory names only; DuckDB recovers them with
+hive_partitioning and prunes directories from WHERE clauses on them:
+
+    SELECT ... FROM read_parquet('<root>/**/*.parquet', hive_partitioning = true)
+    WHERE date = '2025-01-31' AND hour BETWEEN 12 AND 14
+
+Frequent small writes leave many small files per partition; `compact()`
+merges them into one file sorted by (id, ts) with size-targeted row groups.
+"""
+
+from __future__ import annotations
+import os, time, uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITION_COLS = ("date", "hour")
+EXTRA_PARTITIONS = ("vs_currency",)
+SORT_KEYS = ("id", "ts")
+
+# compaction targets
+SMALL_FILE_BYTES = 32 * 1024 * 1024     # files below this are merge candidates
+ROW_GROUP_ROWS = 256 * 1024
+SETTLE_SECONDS = 2 * 3600               # leave partitions still being written alone
+
+Data = Union[pd.DataFrame, pa.Table]
+
+
+def _as_table(data: Data) -> pa.Table:
+    if isinstance(data, pa.Table):
+        return data
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def _utc_ts(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Epoch-ms integers or timestamps -> timestamp[ms, UTC]."""
+    if pa.types.is_integer(col.type):
+        return pc.cast(col, pa.int64()).cast(pa.timestamp("ms", tz="UTC"))
+    if pa.types.is_timestamp(col.type):
+        return col if col.type.tz else pc.assume_timezone(col, "UTC")
+    raise TypeError(f"ts column must be epoch ms or timestamp, got {col.type}")
+
+
+def with_partitions(tbl: pa.Table, ts_col: str = "ts") -> pa.Table:
+    """Add `date` (YYYY-MM-DD) and `hour` (0-23) columns derived from ts_col."""
+    ts = _utc_ts(tbl[ts_col])
+    tbl = tbl.drop_columns([c for c in PARTITION_COLS if c in tbl.column_names])
+    return (tbl.append_column("date", pc.strftime(ts, format="%Y-%m-%d"))
+               .append_column("hour", pc.cast(pc.hour(ts), pa.int32())))
+
+
+def write_partitioned(data: Data, root: Union[str, Path], ts_col: str = "ts",
+                      extra: Sequence[str] = EXTRA_PARTITIONS) -> int:
+    """
+    Append rows to the dataset at `root`, partitioned by date/hour (+ `extra`
+    columns that are present). Returns the number of rows written.
+    """
+    tbl = _as_table(data)
+    if tbl.num_rows == 0:
+        return 0
+    tbl = with_partitions(tbl, ts_col)
+    keys = list(PARTITION_COLS) + [c for c in extra if c in tbl.column_names]
+    part_schema = pa.schema([tbl.schema.field(k) for k in keys])
+    ds.write_dataset(
+        tbl, str(root), format="parquet",
+        partitioning=ds.partitioning(part_schema, flavor="hive"),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return tbl.num_rows
+
+
+def scan_sql(root: Union[str, Path]) -> str:
+    """FROM-clause for DuckDB with partition pruning on date/hour/vs_currency."""
+    return f"read_parquet('{Path(root).as_posix()}/**/*.parquet', hive_partitioning = true, union_by_name = true)"
+
+
+def _leaf_dirs(root: Path) -> Dict[Path, List[Path]]:
+    out: Dict[Path, List[Path]] = {}
+    for p in root.rglob("*.parquet"):
+        if not p.name.startswith("."):
+            out.setdefault(p.parent, []).append(p)
+    return out
+
+
+def compact_partition(files: List[Path], sort_by: Sequence[str] = SORT_KEYS,
+                      row_group_rows: int = ROW_GROUP_ROWS) -> Optional[Path]:
+    """Merge `files` (one partition) into a single sorted file; originals are removed."""
+    if len(files) < 2:
+        return None
+    tbl = pa.concat_tables([pq.read_table(f, partitioning=None) for f in files], promote_options="default")
+    keys = [(c, "ascending") for c in sort_by if c in tbl.column_names]
+    if keys:
+        tbl = tbl.sort_by(keys)
+    folder = files[0].parent
+    out = folder / f"part-{uuid.uuid4().hex}-c.parquet"
+    tmp = folder / f".{out.name}.tmp"
+    pq.write_table(tbl, tmp, row_group_size=row_group_rows, compression="zstd")
+    # readers globbing *.parquet never see the temp file; rename then drop inputs
+    os.replace(tmp, out)
+    for f in files:
+        f.unlink(missing_ok=True)
+    return out
+
+
+def compact(root: Union[str, Path], small_bytes: int = SMALL_FILE_BYTES,
+            settle_seconds: float = SETTLE_SECONDS, row_group_rows: int = ROW_GROUP_ROWS) -> Dict[str, int]:
+    """
+    Merge small files in every partition that has not been written to for
+    `settle_seconds`. Returns counts of partitions compacted and files merged.
+    """
+    root = Path(root)
+    stats = {"partitions": 0, "files_in": 0}
+    if not root.exists():
+        return stats
+    now = time.time()
+    for folder, files in sorted(_leaf_dirs(root).items()):
+        small = [f for f in files if f.stat().st_size < small_bytes]
+        if len(small) < 2:
+            continue
+        if now - max(f.stat().st_mtime for f in files) < settle_seconds:
+            continue
+        compact_partition(sorted(small), row_group_rows=row_group_rows)
+        stats["partitions"] += 1
+        stats["files_in"] += len(small)
+    return stats
@@ -1,7 +1,17 @@
 from __future__ import annotations
 import os, time
+from collections import deque
 import duckdb, pandas as pd
-from typing import Iterable
+import pyarrow as pa
+from typing import Iterable, Iterator, Optional, Union
+from .dataset import write_partitioned
+from .service import get_service
+
+ArrowData = Union[pa.Table, pa.RecordBatch, pa.RecordBatchReader, Iterable[pa.RecordBatch]]
+
+# rows per INSERT for append_arrow, and chunks allowed to wait on the writer
+ARROW_CHUNK_ROWS = 1_000_000
+ARROW_MAX_PENDING = 4
 
 def ensure_dirs(path: str) -> None:
     os.makedirs(path, exist_ok=True)
@@ -13,12 +23,80 @@ def to_parquet(df: pd.DataFrame, data_dir: str, name: str) -> str:
     df.to_parquet(pth, index=False)
     return pth
 
-def to_duckdb(df: pd.DataFrame, db_path: str, table: str) -> None:
-    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
-    con = duckdb.connect(db_path)
+def to_dataset(df: pd.DataFrame, data_dir: str, name: str) -> str:
+    """Append to the hive-partitioned dataset <data_dir>/<name>/ (see storage.dataset)."""
+    root = os.path.join(data_dir, name)
+    write_partitioned(df, root)
+    return root
+
+def to_duckdb(df: Union[pd.DataFrame, pa.Table], db_path: str, table: str) -> None:
+    # through the process-wide writer: no connect per call, batched commits
+    if isinstance(df, pa.Table):
+        append_arrow(df, db_path, table)
+        return
+    get_service(db_path).append_df(table, df).result()
+
+
+def _arrow_chunks(data: ArrowData, chunk_rows: int, schema: Optional[pa.Schema]) -> Iterator[pa.Table]:
+    """Re-chunk any Arrow input into tables of ~chunk_rows (slices are zero-copy)."""
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    if isinstance(data, pa.Table):
+        if schema is not None:
+            data = data.select(schema.names).cast(schema)
+        for off in range(0, data.num_rows, chunk_rows):
+            yield data.slice(off, chunk_rows)
+        return
+    pending, n = [], 0
+    for rb in data:
+        pending.append(rb)
+        n += rb.num_rows
+        if n >= chunk_rows:
+            yield from _arrow_chunks(pa.Table.from_batches(pending), chunk_rows, schema)
+            pending, n = [], 0
+    if pending:
+        yield from _arrow_chunks(pa.Table.from_batches(pending), chunk_rows, schema)
+
+def _insert_arrow(con: duckdb.DuckDBPyConnection, table: str, tbl: pa.Table, evolve: bool) -> int:
+    name = f"_arrow_{id(tbl)}"
+    # DuckDB scans the registered Arrow buffers in place; nothing goes through pandas
+    con.register(name, tbl)
     try:
-        con.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM df LIMIT 0")
-        con.register("df", df)
-        con.execute(f"INSERT INTO {table} SELECT * FROM df")
+        con.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM {name} LIMIT 0")
+        if evolve:
+            have = {r[1] for r in con.execute(f"PRAGMA table_info('{table}')").fetchall()}
+            for col, typ, *_ in con.execute(f"DESCRIBE SELECT * FROM {name}").fetchall():
+                if col not in have:
+                    con.execute(f'ALTER TABLE {table} ADD COLUMN "{col}" {typ}')
+        con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {name}")
     finally:
-        con.close()
+        con.unregister(name)
+    return tbl.num_rows
+
+def append_arrow(data: ArrowData, db_path: str, table: str, schema: Optional[pa.Schema] = None,
+                 chunk_rows: int = ARROW_CHUNK_ROWS, evolve: bool = False, atomic: bool = False) -> int:
+    """
+    Append Arrow data (Table, RecordBatch, RecordBatchReader or an iterable of
+    batches) to `table` through the storage service; returns rows written.
+
+    - schema: select + cast the input to this Arrow schema first. Otherwise the
+      table is created from the first chunk's types, and later chunks insert by
+      column name (missing columns become NULL).
+    - evolve: add columns that exist in the data but not in the table.
+    - chunk_rows: rows per INSERT. Chunks are committed as they go (a streaming
+      reader never has to fit in memory) unless atomic=True, which writes every
+      chunk in one transaction.
+    """
+    svc = get_service(db_path)
+    chunks = _arrow_chunks(data, max(1, chunk_rows), schema)
+    if atomic:
+        return svc.submit(lambda con: sum(_insert_arrow(con, table, t, evolve) for t in chunks)).result()
+    total = 0
+    inflight: deque = deque()
+    for tbl in chunks:
+        inflight.append(svc.submit(_insert_arrow, table, tbl, evolve))
+        if len(inflight) >= ARROW_MAX_PENDING:
+            total += inflight.popleft().result()
+    while inflight:
+        total += inflight.popleft().result()
+    return total
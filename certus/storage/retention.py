@@ -0,0 +1,99 @@
+"""
+Retention tiers for the markets snapshot table and the ohlcv bars.
+
+    raw markets rows  --(older than raw_days)-->   dropped
+    ohlcv <tf> bars   --(older than bar_days[tf])--> dropped
+
+Bars are owned by bars.py: every run first brings all timeframes up to date
+(bars.build_bars), so a tick is only deleted once it is part of the 1m bar
+and everything built from it, and only then prunes, all in the caller's
+transaction, so a crash never leaves rows deleted before they were rolled up.
+
+Pruning never touches what the next build_bars still reads: per asset the
+ticks from its newest 1m bar on (the bar watermark) and every bar from the
+UTC day of that watermark on, since a rebuilt 1m bar makes build_bars
+re-aggregate its whole 5m ... 1d buckets from the tier below. Ticks behind
+the watermark are only dropped after the build that merged any late ones,
+and the behind-counts bars.py uses to spot late ticks are re-recorded after
+the drop.
+
+Only snapshot rows are dropped. Rows written by the chart backfill
+(source = 'coingecko_market_chart') are history the gap planner reads back,
+so they stay in markets.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import duckdb
+
+from certus.storage.bars import TIMEFRAMES, _columns, _mark_ticks, build_bars, ensure_ohlcv, tick_exprs
+
+BACKFILL_SOURCE = "coingecko_market_chart"
+
+# timeframe -> days its bars are kept (None = forever)
+BAR_DAYS: Dict[str, Optional[float]] = {"1m": 2, "5m": 7, "15m": 30, "1h": 90, "4h": 365, "1d": None}
+
+
+@dataclass
+class RetentionPolicy:
+    raw_days: float = 7
+    bar_days: Dict[str, Optional[float]] = field(default_factory=lambda: dict(BAR_DAYS))
+    table: str = "markets"
+
+
+def _watermarks(con: duckdb.DuckDBPyConnection) -> None:
+    """Temp table bar_marks: newest 1m bar per (id, vs_currency)."""
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE bar_marks AS
+        SELECT id, vs_currency, max(ts) AS since FROM ohlcv WHERE timeframe = '1m' GROUP BY ALL
+    """)
+
+
+def drop_raw(con: duckdb.DuckDBPyConnection, table: str, cutoff: datetime) -> int:
+    """Delete snapshot rows older than `cutoff` that are behind their asset's bar watermark."""
+    cols = _columns(con, table)
+    ts, vs = tick_exprs(cols, "m")
+    keep = f" AND (m.source IS NULL OR m.source <> '{BACKFILL_SOURCE}')" if "source" in cols else ""
+    return con.execute(f"""
+        DELETE FROM {table} m USING bar_marks w
+        WHERE w.id = m.id AND w.vs_currency IS NOT DISTINCT FROM {vs}
+          AND {ts} < ? AND {ts} < w.since{keep}
+    """, [cutoff]).fetchone()[0]
+
+
+def drop_bars(con: duckdb.DuckDBPyConnection, timeframe: str, cutoff: datetime) -> int:
+    """Delete `timeframe` bars older than `cutoff` and before their asset's watermark day."""
+    return con.execute("""
+        DELETE FROM ohlcv o
+        WHERE o.timeframe = ? AND o.ts < ?
+          AND NOT EXISTS (SELECT 1 FROM bar_marks w
+                          WHERE w.id = o.id AND w.vs_currency IS NOT DISTINCT FROM o.vs_currency
+                            AND o.ts >= date_trunc('day', w.since))
+    """, [timeframe, cutoff]).fetchone()[0]
+
+
+def apply_retention(con: duckdb.DuckDBPyConnection, policy: RetentionPolicy = RetentionPolicy(),
+                    now: Optional[datetime] = None) -> Dict[str, int]:
+    """Run every tier once (transaction: see storage.service)."""
+    now = (now or datetime.now(timezone.utc)).replace(tzinfo=None)
+    unknown = set(policy.bar_days) - set(TIMEFRAMES)
+    if unknown:
+        raise ValueError(f"bar_days has unknown timeframes {sorted(unknown)}; use {list(TIMEFRAMES)}")
+    ensure_ohlcv(con)
+    stats: Dict[str, int] = {"bars": 0, "raw_dropped": 0}
+    has_ticks = {"ts", "id", "price"} <= set(_columns(con, policy.table))
+    if has_ticks:
+        stats["bars"] = sum(build_bars(con, policy.table).values())
+    _watermarks(con)
+    if has_ticks:
+        stats["raw_dropped"] = drop_raw(con, policy.table, now - timedelta(days=policy.raw_days))
+        if stats["raw_dropped"]:
+            _mark_ticks(con, policy.table)
+    for tf in TIMEFRAMES:
+        days = policy.bar_days.get(tf)
+        stats[f"{tf}_dropped"] = 0 if days is None else drop_bars(con, tf, now - timedelta(days=days))
+    con.execute("DROP TABLE bar_marks")
+    return stats
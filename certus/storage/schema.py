@@ -5,6 +5,23 @@ from pathlib import Path
 
 DB_PATH = Path("data/markets.duckdb")
 
+# markets as written by the historical backfills (one row per coin per chart point)
+MARKETS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    ts BIGINT,
+    id VARCHAR,
+    symbol VARCHAR,
+    vs_currency VARCHAR,
+    price DOUBLE,
+    market_cap DOUBLE,
+    total_volume DOUBLE,
+    pct_change_1h DOUBLE,
+    pct_change_24h DOUBLE,
+    pct_change_7d DOUBLE,
+    source VARCHAR
+)
+"""
+
 def ensure_db() -> duckdb.DuckDBPyConnection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     con = duckdb.connect(str(DB_PATH))
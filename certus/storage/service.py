@@ -0,0 +1,268 @@
+"""
+Process-wide DuckDB storage service.
+
+DuckDB allows one read-write process per database file, and every
+duckdb.connect() pays for opening the file and loading the catalog. The
+service keeps one long-lived connection per file instead:
+
+  * writes are submitted as requests to a queue and applied by a single
+    writer thread; requests that arrive together are committed in one
+    transaction (a failing batch is replayed one request at a time so only
+    the bad request fails);
+  * reads use cursors (`con.cursor()`), which share the open database and
+    are safe to use from other threads while the writer runs.
+
+Read-only services (API, Streamlit pages) open the file on first use and
+release it once readers have been idle for READER_LINGER_S, so a UI process
+does not hold the lock that ingest jobs in other processes need.
+
+    svc = get_service("data/markets.duckdb")
+    svc.append_df("markets", df).result()
+    with svc.reader() as cur:
+        cur.execute("SELECT count(*) FROM markets").fetchone()
+
+Helpers that take a connection as their first argument (bulk_upsert,
+apply_retention, build_bars, update_indicators, ...) never BEGIN or COMMIT
+themselves. Submitting one runs it in a single transaction on the writer
+thread; called directly, the caller owns the transaction:
+
+    get_service(db).submit(apply_retention, policy).result()
+"""
+
+from __future__ import annotations
+import atexit, os, queue, threading, time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import duckdb, pandas as pd
+
+# How long to wait for another process to release the file lock on open
+LOCK_WAIT_S = float(os.getenv("DUCKDB_LOCK_WAIT_S", "30"))
+MAX_BATCH = int(os.getenv("DUCKDB_WRITE_BATCH", "64"))
+READER_LINGER_S = float(os.getenv("DUCKDB_READER_LINGER_S", "2"))
+
+WriteFn = Callable[..., Any]
+_STOP = object()
+
+
+def connect_with_retry(db_path: str, read_only: bool = False,
+                       wait_s: float = LOCK_WAIT_S) -> duckdb.DuckDBPyConnection:
+    """duckdb.connect that waits (with backoff) while another process holds the lock."""
+    if not read_only:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    deadline = time.monotonic() + wait_s
+    delay = 0.1
+    while True:
+        try:
+            return duckdb.connect(db_path, read_only=read_only)
+        except duckdb.IOException as e:
+            if "lock" not in str(e).lower() or time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+
+class StorageService:
+    def __init__(self, db_path: str, read_only: bool = False, max_batch: int = MAX_BATCH):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.max_batch = max(1, max_batch)
+        self._con: Optional[duckdb.DuckDBPyConnection] = (
+            None if read_only else connect_with_retry(db_path))
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._idle_timer: Optional[threading.Timer] = None
+
+    # ---- writes ----
+    def submit(self, fn: WriteFn, *args: Any, **kwargs: Any) -> Future:
+        """
+        Run fn(con, *args, **kwargs) on the writer thread inside a transaction.
+        fn must not BEGIN/COMMIT itself, nor wait on another submit().
+        """
+        if self.read_only:
+            raise RuntimeError(f"storage service for {self.db_path} is read-only")
+        fut: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("storage service is closed")
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name=f"duckdb-writer:{self.db_path}",
+                                                daemon=True)
+                self._writer.start()
+            self._queue.put((fn, args, kwargs, fut))
+        return fut
+
+    def execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> Future:
+        return self.submit(lambda con: con.execute(sql, params or []).fetchall())
+
+    def append_df(self, table: str, df: pd.DataFrame, create: bool = True) -> Future:
+        """Append df by column name, creating the table from df's schema if needed."""
+        return self.submit(_append_df, table, df, create)
+
+    def flush(self) -> None:
+        """Block until every request submitted so far has been applied."""
+        if self._writer is not None:
+            self.submit(lambda con: None).result()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.put(_STOP)
+                    break
+                batch.append(item)
+            self._apply(batch)
+
+    def _apply(self, batch: List[Tuple[WriteFn, tuple, dict, Future]]) -> None:
+        con = self._con
+        live = [b for b in batch if b[3].set_running_or_notify_cancel()]
+        if not live:
+            return
+        results: List[Any] = []
+        try:
+            con.execute("BEGIN")
+            for fn, args, kwargs, _ in live:
+                results.append(fn(con, *args, **kwargs))
+            con.execute("COMMIT")
+        except Exception as e:
+            _rollback(con)
+            if len(live) == 1:
+                live[0][3].set_exception(e)
+                return
+            # replay one by one so only the failing request(s) fail
+            for item in live:
+                _run_one(con, *item)
+            return
+        for (_, _, _, fut), res in zip(live, results):
+            fut.set_result(res)
+
+    # ---- reads ----
+    @contextmanager
+    def reader(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """A cursor on the shared database; use one per thread, closed on exit."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("storage service is closed")
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            if self._con is None:
+                self._con = connect_with_retry(self.db_path, read_only=True)
+            self._readers += 1
+            cur = self._con.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            with self._lock:
+                self._readers -= 1
+                if self.read_only and self._readers == 0 and not self._closed:
+                    self._idle_timer = threading.Timer(READER_LINGER_S, self._release_idle)
+                    self._idle_timer.daemon = True
+                    self._idle_timer.start()
+
+    def _release_idle(self) -> None:
+        with self._lock:
+            if self._readers == 0 and self._con is not None and self.read_only:
+                self._con.close()
+                self._con = None
+            self._idle_timer = None
+
+    def query_df(self, sql: str, params: Optional[Sequence[Any]] = None) -> pd.DataFrame:
+        with self.reader() as cur:
+            return cur.execute(sql, params or []).fetchdf()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join()
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            if self._con is not None:
+                self._con.close()
+                self._con = None
+
+
+def _rollback(con: duckdb.DuckDBPyConnection) -> None:
+    try:
+        con.execute("ROLLBACK")
+    except duckdb.Error:
+        pass  # no transaction open
+
+
+def _run_one(con, fn: WriteFn, args: tuple, kwargs: dict, fut: Future) -> None:
+    try:
+        con.execute("BEGIN")
+        res = fn(con, *args, **kwargs)
+        con.execute("COMMIT")
+    except Exception as e:
+        _rollback(con)
+        fut.set_exception(e)
+    else:
+        fut.set_result(res)
+
+
+def _append_df(con: duckdb.DuckDBPyConnection, table: str, df: pd.DataFrame, create: bool) -> int:
+    if df.empty:
+        return 0
+    name = f"_append_{id(df)}"
+    con.register(name, df)
+    try:
+        if create:
+            con.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM {name} LIMIT 0")
+        con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {name}")
+    finally:
+        con.unregister(name)
+    return len(df)
+
+
+_SERVICES: Dict[Tuple[str, bool], StorageService] = {}
+_SERVICES_LOCK = threading.Lock()
+
+
+def get_service(db_path: Optional[str] = None, read_only: bool = False) -> StorageService:
+    """
+    The process-wide service for db_path (default SETTINGS.duckdb_path).
+    Writers should ask for read_only=False; UI/API readers for read_only=True.
+    """
+    if db_path is None:
+        from ..config import SETTINGS
+        db_path = SETTINGS.duckdb_path
+    ident = (os.path.abspath(db_path), read_only)
+    with _SERVICES_LOCK:
+        rw = _SERVICES.get((ident[0], False))
+        if read_only and rw is not None and not rw._closed:
+            return rw  # one process can't open a file both ways; the writer can read
+        svc = _SERVICES.get(ident)
+        if svc is None or svc._closed:
+            svc = _SERVICES[ident] = StorageService(db_path, read_only=read_only)
+        return svc
+
+
+def close_services() -> None:
+    with _SERVICES_LOCK:
+        services = list(_SERVICES.values())
+        _SERVICES.clear()
+    for svc in services:
+        svc.close()
+
+
+atexit.register(close_services)
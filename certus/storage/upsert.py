@@ -0,0 +1,79 @@
+"""
+Bulk, idempotent upserts into DuckDB.
+
+One staging scan per batch instead of a DELETE + INSERT round trip per row:
+
+  * tables with a PRIMARY KEY / UNIQUE constraint on the key get
+    INSERT OR REPLACE (DuckDB's ON CONFLICT DO UPDATE over all columns);
+  * tables without one get DELETE ... USING staging, then INSERT.
+
+Rows repeated within a batch are collapsed to the last occurrence, so
+replaying a batch leaves the table unchanged.
+"""
+
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import duckdb, pandas as pd
+
+Rows = Union[pd.DataFrame, List[Dict[str, Any]]]
+
+
+def _json(v: Any) -> Optional[str]:
+    return None if v is None else json.dumps(v, default=str)
+
+
+def has_unique_key(con: duckdb.DuckDBPyConnection, table: str, key: Sequence[str]) -> bool:
+    rows = con.execute("""
+        SELECT constraint_column_names FROM duckdb_constraints()
+        WHERE table_name = ? AND constraint_type IN ('PRIMARY KEY', 'UNIQUE')
+    """, [table]).fetchall()
+    return any(sorted(cols) == sorted(key) for (cols,) in rows)
+
+
+def bulk_upsert(con: duckdb.DuckDBPyConnection, table: str, rows: Rows, key: Sequence[str],
+                json_cols: Sequence[str] = (), stamp: Optional[str] = "ingested_at") -> int:
+    """
+    Upsert `rows` into `table` keyed on `key`; returns the number of distinct keys written.
+
+    json_cols are serialized to JSON text and cast to JSON. If the table has a
+    `stamp` column that the rows don't carry, it is set to now() for every
+    written row (as a fresh DELETE + INSERT would have done via its DEFAULT).
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(rows)
+    if df.empty:
+        return 0
+    df = df.copy()
+    for c in json_cols:
+        df[c] = df[c].map(_json)
+    df["_ord"] = range(len(df))
+
+    cols = [c for c in df.columns if c != "_ord"]
+    table_cols = {r[1] for r in con.execute(f"PRAGMA table_info('{table}')").fetchall()}
+    select = [f"CAST({c} AS JSON) AS {c}" if c in json_cols else c for c in cols]
+    if stamp and stamp in table_cols and stamp not in cols:
+        cols.append(stamp)
+        select.append(f"now() AS {stamp}")
+
+    keys = ", ".join(key)
+    name = f"_upsert_{table}"
+    con.register(name, df)
+    try:
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {name}_b AS
+            SELECT {", ".join(select)} FROM {name}
+            QUALIFY row_number() OVER (PARTITION BY {keys} ORDER BY _ord DESC) = 1
+        """)
+        col_list = ", ".join(cols)
+        if has_unique_key(con, table, key):
+            con.execute(f"INSERT OR REPLACE INTO {table} ({col_list}) SELECT {col_list} FROM {name}_b")
+        else:
+            match = " AND ".join(f"{table}.{k} = s.{k}" for k in key)
+            con.execute(f"DELETE FROM {table} USING {name}_b s WHERE {match}")
+            con.execute(f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {name}_b")
+        n = con.execute(f"SELECT count(*) FROM {name}_b").fetchone()[0]
+        con.execute(f"DROP TABLE {name}_b")
+    finally:
+        con.unregister(name)
+    return n
@@ -0,0 +1,98 @@
+# certus/utils/aimd.py
+from __future__ import annotations
+import asyncio, math, time
+from typing import List, Optional
+
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease cap on in-flight requests.
+
+    Use as `async with ctl:` around each request and feed every HTTP attempt to
+    `observe(status, elapsed)` (status=None for transport errors).
+
+    - After each `window` healthy samples (p95 within `latency_tolerance` x the best
+      p95 seen so far, error rate <= `max_error_rate`) the limit grows by 1.
+    - A 429/5xx/transport error multiplies the limit by `backoff` (at most once per
+      `cooldown` seconds, so one burst of failures counts as one signal).
+    """
+
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 64,
+                 window: int = 10, latency_tolerance: float = 2.0,
+                 max_error_rate: float = 0.05, backoff: float = 0.5, cooldown: float = 2.0):
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.inflight = 0
+        self.peak = self.limit
+        self.baseline_p95: Optional[float] = None
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._last_decrease = 0.0
+        self._changed: Optional[asyncio.Event] = None
+
+    # ---- gating ----
+    async def __aenter__(self):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        while self.inflight >= self.limit:
+            self._changed.clear()
+            await self._changed.wait()
+        self.inflight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+
+    # ---- feedback ----
+    def observe(self, status: Optional[int], elapsed: float) -> None:
+        if status is None or status in THROTTLE_STATUS:
+            self._errors += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, int(math.floor(self.limit * self.backoff)))
+                self._reset()
+                return
+        else:
+            self._latencies.append(elapsed)
+        if len(self._latencies) + self._errors >= self.window:
+            self._evaluate()
+
+    def _evaluate(self) -> None:
+        total = len(self._latencies) + self._errors
+        err_rate = self._errors / total if total else 0.0
+        p95 = _p95(self._latencies)
+        if p95 is not None:
+            self.baseline_p95 = p95 if self.baseline_p95 is None else min(self.baseline_p95, p95)
+        healthy = err_rate <= self.max_error_rate and (
+            p95 is None or p95 <= self.baseline_p95 * self.latency_tolerance
+        )
+        if healthy and self.limit < self.max_limit:
+            self.limit += 1
+            self.peak = max(self.peak, self.limit)
+            self._wake()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._latencies = []
+        self._errors = 0
+
+
+def _p95(xs: List[float]) -> Optional[float]:
+    if not xs:
+        return None
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(math.ceil(0.95 * len(xs))) - 1)]
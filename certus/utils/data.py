@@ -40,7 +40,8 @@ async def fetch_markets(per_page: int = 25, page: int = 1) -> pd.DataFrame:
 async def fetch_ohlcv_minute(coin_id: str, days: int = 1) -> pd.DataFrame:
     """
     Pulls minute data for 'days' (1 or 7 typical for minute resolution from CG).
-    We then resample to 3m/5m/15m/30m/1h in the UI.
+    Stored history is served pre-aggregated from ohlcv (certus.storage.bars:
+    1m/5m/15m/1h/4h/1d, kept current by scripts/build_bars.py) instead.
     """
     url = f"{COINGECKO_API}/coins/{coin_id}/market_chart"
     params = {"vs_currency": "usd", "days": days, "interval": "minute"}
@@ -12,3 +12,8 @@ def get_env(name: str, default: str | None = None) -> str:
     return v
 
 HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+# Shared connection pool (certus.utils.http)
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "1").strip().lower() in {"1", "true", "yes", "on"}
+HTTP_MAX_CONNS_PER_HOST = int(os.getenv("HTTP_MAX_CONNS_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
@@ -1,15 +1,81 @@
 from __future__ import annotations
-import time, random
+import asyncio, atexit, threading, time, random
+from urllib.parse import urlsplit
 import httpx
-from .env import HTTP_TIMEOUT
+from .env import HTTP_TIMEOUT, HTTP_HTTP2, HTTP_MAX_CONNS_PER_HOST, HTTP_KEEPALIVE_EXPIRY
 from .logging import logger
 
 RETRY_STATUS = {429, 500, 502, 503, 504}
 
+try:
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when h2 is installed)
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+# One keep-alive pool per scheme://host, so each provider gets its own connection
+# cap and TLS sessions are reused across calls (and retries).
+_CLIENTS: dict[str, httpx.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def _origin(url: str) -> str:
+    u = urlsplit(url)
+    return f"{u.scheme}://{u.netloc}"
+
+def _pool_kwargs() -> dict:
+    return dict(
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+        http2=HTTP_HTTP2 and _H2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNS_PER_HOST,
+            max_keepalive_connections=HTTP_MAX_CONNS_PER_HOST,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+def get_client(url: str) -> httpx.Client:
+    key = _origin(url)
+    with _CLIENTS_LOCK:
+        c = _CLIENTS.get(key)
+        if c is None or c.is_closed:
+            c = _CLIENTS[key] = httpx.Client(**_pool_kwargs())
+        return c
+
+# Async pools are bound to the event loop that opened their connections, so a new
+# loop (e.g. another asyncio.run) gets fresh clients.
+_ACLIENTS: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    key = _origin(url)
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        entry = _ACLIENTS.get(key)
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            entry = _ACLIENTS[key] = (loop, httpx.AsyncClient(**_pool_kwargs()))
+        return entry[1]
+
+async def aclose_clients() -> None:
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        mine = [k for k, (l, _) in _ACLIENTS.items() if l is loop]
+        clients = [_ACLIENTS.pop(k)[1] for k in mine]
+    for c in clients:
+        await c.aclose()
+
+@atexit.register
+def close_clients() -> None:
+    with _CLIENTS_LOCK:
+        for c in _CLIENTS.values():
+            c.close()
+        _CLIENTS.clear()
+
+def _delay(backoff: float, attempt: int) -> float:
+    return min(backoff * (2 ** (attempt - 1)), 20.0) * (0.7 + 0.6 * random.random())
+
 def _sleep(backoff: float, attempt: int):
     # expo backoff with jitter (cap at ~20s)
-    delay = min(backoff * (2 ** (attempt - 1)), 20.0) * (0.7 + 0.6 * random.random())
-    time.sleep(delay)
+    time.sleep(_delay(backoff, attempt))
 
 def get_json(url: str, headers: dict | None = None, params: dict | None = None) -> dict:
     # one-shot (kept for compatibility); now uses retry client under the hood
@@ -18,14 +84,14 @@ def get_json(url: str, headers: dict | None = None, params: dict | None = None)
 def get_json_retry(url: str, headers: dict | None = None, params: dict | None = None,
                    retries: int = 4, backoff: float = 0.8) -> dict:
     last_err: Exception | None = None
+    c = get_client(url)
     for attempt in range(1, retries + 1):
         try:
-            with httpx.Client(timeout=HTTP_TIMEOUT, follow_redirects=True) as c:
-                r = c.get(url, headers=headers, params=params)
-                if r.status_code in RETRY_STATUS:
-                    raise httpx.HTTPStatusError(f"retryable {r.status_code}", request=r.request, response=r)
-                r.raise_for_status()
-                return r.json()
+            r = c.get(url, headers=headers, params=params)
+            if r.status_code in RETRY_STATUS:
+                raise httpx.HTTPStatusError(f"retryable {r.status_code}", request=r.request, response=r)
+            r.raise_for_status()
+            return r.json()
         except (httpx.HTTPStatusError, httpx.TransportError) as e:
             last_err = e
             logger.warning(f"[HTTP retry {attempt}/{retries}] {url} — {e}")
@@ -34,3 +100,24 @@ def get_json_retry(url: str, headers: dict | None = None, params: dict | None =
     assert last_err is not None
     logger.error(f"[HTTP failed] {url} — {last_err}")
     raise last_err
+
+async def aget_json(url: str, headers: dict | None = None, params: dict | None = None,
+                    retries: int = 4, backoff: float = 0.8) -> dict:
+    # async twin of get_json_retry on the pooled AsyncClient
+    last_err: Exception | None = None
+    c = get_async_client(url)
+    for attempt in range(1, retries + 1):
+        try:
+            r = await c.get(url, headers=headers, params=params)
+            if r.status_code in RETRY_STATUS:
+                raise httpx.HTTPStatusError(f"retryable {r.status_code}", request=r.request, response=r)
+            r.raise_for_status()
+            return r.json()
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            last_err = e
+            logger.warning(f"[HTTP retry {attempt}/{retries}] {url} — {e}")
+            if attempt >= retries: break
+            await asyncio.sleep(_delay(backoff, attempt))
+    assert last_err is not None
+    logger.error(f"[HTTP failed] {url} — {last_err}")
+    raise last_err
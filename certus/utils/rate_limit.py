@@ -0,0 +1,138 @@
+# certus/utils/rate_limit.py
+from __future__ import annotations
+import asyncio, json, os, threading, time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+try:
+    import fcntl  # POSIX only; cross-process sharing is disabled without it
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+class TokenBucket:
+    """
+    Token bucket sized in calls-per-minute.
+
+    - `acquire()` waits until a token is available (async, never blocks the loop).
+    - `pause(seconds)` empties the bucket and blocks every caller until the
+      cooldown ends (used for 429 / Retry-After).
+    - If `state_path` is given, bucket state lives in a small JSON file guarded by
+      `flock`, so every process pointing at the same file shares one budget.
+    """
+
+    def __init__(self, calls_per_min: float, burst: Optional[float] = None,
+                 state_path: Optional[str] = None):
+        if calls_per_min <= 0:
+            raise ValueError("calls_per_min must be > 0")
+        self.rate = calls_per_min / 60.0                      # tokens per second
+        self.capacity = float(burst if burst is not None else max(1.0, min(calls_per_min / 6.0, 50.0)))
+        self.state_path = state_path if (state_path and fcntl is not None) else None
+        # threading lock (not asyncio) so one bucket can serve several event loops
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._stamp = time.time()
+        self._blocked_until = 0.0
+
+    # ---- state (in-memory or file-backed) ----
+    def _load(self, fh) -> None:
+        try:
+            fh.seek(0)
+            s = json.loads(fh.read() or "{}")
+            self._tokens = float(s.get("tokens", self.capacity))
+            self._stamp = float(s.get("stamp", time.time()))
+            self._blocked_until = float(s.get("blocked_until", 0.0))
+        except ValueError:
+            pass
+
+    def _save(self, fh) -> None:
+        fh.seek(0)
+        fh.truncate()
+        fh.write(json.dumps({"tokens": self._tokens, "stamp": self._stamp,
+                             "blocked_until": self._blocked_until}))
+        fh.flush()
+
+    def _locked(self, fn):
+        with self._lock:
+            if not self.state_path:
+                return fn()
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(self.state_path, "a+") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    self._load(fh)
+                    out = fn()
+                    self._save(fh)
+                    return out
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _try_take(self) -> float:
+        """Take one token if possible; otherwise return seconds to wait."""
+        def _take() -> float:
+            now = time.time()
+            self._refill(now)
+            if self._blocked_until > now:
+                return self._blocked_until - now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+        return self._locked(_take)
+
+    # ---- public API ----
+    async def acquire(self) -> None:
+        while True:
+            wait = self._try_take()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        def _pause() -> None:
+            now = time.time()
+            self._refill(now)
+            self._tokens = 0.0
+            self._blocked_until = max(self._blocked_until, now + max(0.0, seconds))
+        self._locked(_pause)
+
+    def available(self) -> float:
+        """Tokens currently available (0 while paused)."""
+        def _avail() -> float:
+            now = time.time()
+            self._refill(now)
+            return 0.0 if self._blocked_until > now else self._tokens
+        return self._locked(_avail)
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def shared_bucket(name: str, calls_per_min: float, burst: Optional[float] = None,
+                  state_path: Optional[str] = None) -> TokenBucket:
+    """Process-wide bucket registry: every caller using `name` draws from one budget."""
+    with _BUCKETS_LOCK:
+        b = _BUCKETS.get(name)
+        if b is None:
+            b = _BUCKETS[name] = TokenBucket(calls_per_min, burst=burst, state_path=state_path)
+        return b
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
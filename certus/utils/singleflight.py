@@ -0,0 +1,56 @@
+# certus/utils/singleflight.py
+from __future__ import annotations
+import asyncio, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical async calls.
+
+    The first caller for `key` starts `fn()` as a task; callers arriving while it
+    is in flight await the same task (shielded, so one caller being cancelled
+    doesn't cancel it for the rest). With `ttl > 0` the result is also kept for
+    that many seconds. Results are shared between callers, so return immutable
+    values (e.g. bytes).
+
+    In-flight tasks are tracked per event loop; the TTL cache is loop-agnostic.
+    """
+
+    def __init__(self, ttl: float = 0.0, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ttl > 0:
+            hit = self._results.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+
+        loop = asyncio.get_running_loop()
+        fkey = (id(loop), key)
+        task = self._inflight.get(fkey)
+        if task is None:
+            task = loop.create_task(self._run(fkey, key, fn))
+            self._inflight[fkey] = task
+        return await asyncio.shield(task)
+
+    async def _run(self, fkey, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            val = await fn()
+            if self.ttl > 0:
+                if len(self._results) >= self.max_entries:
+                    self._evict()
+                self._results[key] = (time.monotonic() + self.ttl, val)
+            return val
+        finally:
+            self._inflight.pop(fkey, None)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for k in [k for k, (exp, _) in self._results.items() if exp <= now]:
+            self._results.pop(k, None)
+        while len(self._results) >= self.max_entries:
+            self._results.pop(next(iter(self._results)))
@@ -1,7 +1,7 @@
 # pages/01_Markets.py
-import duckdb
 import pandas as pd
 import streamlit as st
+from certus.storage.service import get_service
 
 DB_PATH = "data/markets.duckdb"
 
@@ -31,9 +31,10 @@ h1 {margin: 0.3rem 0 0.6rem 0;}
 st.markdown(COMPACT_CSS, unsafe_allow_html=True)
 
 # ---------- DB helpers ----------
-@st.cache_resource
-def get_con():
-    return duckdb.connect(DB_PATH, read_only=True)
+def query_df(sql: str):
+    # pooled read-only cursor; the file is released when the page goes idle
+    with get_service(DB_PATH, read_only=True).reader() as con:
+        return con.sql(sql).fetchdf()
 
 # Money / price / units formatters
 def money_short(x):
@@ -67,9 +68,7 @@ def units_short(x):
 
 @st.cache_data(ttl=30)
 def load_top_markets_with_extras(quote: str | None = None):
-    con = get_con()
-
-    tm = con.sql("SELECT * FROM top_markets").fetchdf()
+    tm = query_df("SELECT * FROM top_markets")
     if tm.empty:
         return pd.DataFrame(columns=["market","name","price","pct_change_24h","total_volume","market_cap","symbol","trend"])
 
@@ -84,24 +83,24 @@ def load_top_markets_with_extras(quote: str | None = None):
         tm = tm[tm["market"].str.endswith("/" + quote.upper())]
 
     # Optional extras from markets (latest row per symbol)
-    cols = con.sql("PRAGMA table_info('markets')").fetchdf()["name"].tolist()
+    cols = query_df("PRAGMA table_info('markets')")["name"].tolist()
     extras = [c for c in ["high_24h","low_24h","circulating_supply","total_supply","max_supply"] if c in cols]
     if extras:
         sql_cols = ", ".join(["m.symbol"] + [f"m.{c}" for c in extras])
-        extra_df = con.sql(f"""
+        extra_df = query_df(f"""
             WITH last_ts AS (SELECT symbol, MAX(ts) ts FROM markets GROUP BY 1)
             SELECT {sql_cols}
             FROM markets m
             JOIN last_ts t ON m.symbol=t.symbol AND m.ts=t.ts
-        """).fetchdf()
+        """)
         tm = tm.merge(extra_df, on="symbol", how="left")
 
     # Sparklines (last 50)
-    hist = con.sql("""
+    hist = query_df("""
         SELECT symbol, ts, price,
                ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY ts DESC) rn
         FROM markets
-    """).fetchdf()
+    """)
     hist = hist[hist["rn"] <= 50].sort_values(["symbol","ts"])
     spark = hist.groupby("symbol")["price"].apply(list).rename("trend")
     tm = tm.merge(spark, on="symbol", how="left")
@@ -1,7 +1,7 @@
 import subprocess
 import pandas as pd
-import duckdb
 import streamlit as st
+from certus.storage.service import get_service
 
 st.set_page_config(page_title="Certus — Trends", layout="wide")
 st.title("📈 Certus — Trend Feed")
@@ -10,8 +10,6 @@ DB = "data/markets.duckdb"
 
 @st.cache_data(ttl=60)
 def load_data(limit:int=100, symbol:str|None=None):
-    con = duckdb.connect(DB)
-    con.execute("SET TimeZone='UTC';")
     q = """
       SELECT kind, ts, symbol_clean AS symbol,
              title, trend_score, last_price, quote_provider
@@ -24,9 +22,9 @@ def load_data(limit:int=100, symbol:str|None=None):
         sym_clause = "AND upper(symbol_clean)=upper(?)" if symbol else "",
         lim = max(1, min(limit, 1000)),
     )
-    df = con.execute(q, [symbol] if symbol else []).fetchdf()
-    con.close()
-    return df
+    with get_service(DB, read_only=True).reader() as con:
+        con.execute("SET TimeZone='UTC';")
+        return con.execute(q, [symbol] if symbol else []).fetchdf()
 
 # Sidebar controls
 with st.sidebar:
@@ -1,4 +1,5 @@
-import duckdb, streamlit as st
+import streamlit as st
+from certus.storage.service import get_service
 
 st.set_page_config(page_title="Certus — Trends Pro", layout="wide")
 st.title("⚡️ Certus — Trends (Pro)")
@@ -6,11 +7,9 @@ st.title("⚡️ Certus — Trends (Pro)")
 DB = "data/markets.duckdb"
 
 def q(sql, *params):
-    con = duckdb.connect(DB)
-    con.execute("SET TimeZone='UTC';")
-    df = con.execute(sql, params).fetchdf()
-    con.close()
-    return df
+    with get_service(DB, read_only=True).reader() as con:
+        con.execute("SET TimeZone='UTC';")
+        return con.execute(sql, params).fetchdf()
 
 # Available categories from watchlist-scoped categorized view
 cats = q("select distinct category from trend_feed_categorized order by 1")["category"].tolist()
@@ -1,4 +1,5 @@
-import duckdb, streamlit as st
+import streamlit as st
+from certus.storage.service import get_service
 import plotly.express as px
 
 st.set_page_config(page_title="Certus — Charts", layout="wide")
@@ -7,11 +8,9 @@ st.title("📊 Certus — Price & Changes")
 DB = "data/markets.duckdb"
 
 def q(sql, *params):
-    con = duckdb.connect(DB)
-    con.execute("SET TimeZone='UTC';")
-    df = con.execute(sql, params).fetchdf()
-    con.close()
-    return df
+    with get_service(DB, read_only=True).reader() as con:
+        con.execute("SET TimeZone='UTC';")
+        return con.execute(sql, params).fetchdf()
 
 symbols = q("select distinct symbol from quotes_ts order by 1")["symbol"].tolist()
 symbol = st.selectbox("Symbol", symbols)
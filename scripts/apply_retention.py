@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Bring the ohlcv bars up to date, then drop old markets snapshots and bars.
+
+    python scripts/apply_retention.py --raw-days 7 --bar-days 1m=2 --bar-days 1h=90
+"""
+import argparse
+import logging
+
+from certus.storage.retention import BAR_DAYS, RetentionPolicy, apply_retention
+from certus.storage.service import get_service
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
+DB_PATH = "data/markets.duckdb"
+
+
+def _bar_days(spec: str):
+    tf, _, days = spec.partition("=")
+    if tf not in BAR_DAYS or not days:
+        raise argparse.ArgumentTypeError(f"expected TF=DAYS with TF in {list(BAR_DAYS)}, got {spec!r}")
+    return tf, None if days.lower() in ("none", "forever") else float(days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply retention tiers (markets snapshots and ohlcv bars).")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--raw-days", type=float, default=7, help="keep raw snapshots this long")
+    parser.add_argument("--bar-days", type=_bar_days, action="append", default=[], metavar="TF=DAYS",
+                        help=f"keep TF bars this long ('none' = forever); repeatable, defaults {BAR_DAYS}")
+    parser.add_argument("--vacuum", action="store_true", help="CHECKPOINT afterwards to reclaim space")
+    args = parser.parse_args()
+
+    policy = RetentionPolicy(raw_days=args.raw_days, bar_days={**BAR_DAYS, **dict(args.bar_days)})
+    svc = get_service(args.db)
+    stats = svc.submit(apply_retention, policy).result()   # one transaction
+    logging.info(f"[retention] {stats}")
+    if args.vacuum:
+        svc.flush()
+        with svc.reader() as cur:
+            cur.execute("CHECKPOINT")
+
+
+if __name__ == "__main__":
+    main()
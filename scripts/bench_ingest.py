@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark DuckDB ingestion: pandas DataFrame path vs Arrow path.
+
+Generates a synthetic market_chart backfill (ts, id, symbol, vs_currency,
+price, market_cap, total_volume, source) and loads it into a fresh database
+with storage.io.to_duckdb(DataFrame) and storage.io.append_arrow(Table).
+
+    python scripts/bench_ingest.py --rows 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from certus.storage.io import append_arrow, to_duckdb
+from certus.storage.service import close_services, get_service
+
+
+def make_arrow(rows: int, coins: int = 1000) -> pa.Table:
+    rng = np.random.default_rng(7)
+    per = max(1, rows // coins)
+    ids = np.array([f"coin-{i:05d}" for i in range(coins)], dtype=object)
+    coin_idx = np.repeat(np.arange(coins), per)[:rows]
+    ts = 1_367_107_200_000 + np.tile(np.arange(per, dtype=np.int64) * 3_600_000, coins)[:rows]
+    return pa.table({
+        "ts": ts,
+        "id": pa.DictionaryArray.from_arrays(coin_idx.astype(np.int32), ids).dictionary_decode(),
+        "symbol": pa.DictionaryArray.from_arrays(coin_idx.astype(np.int32),
+                                                 np.char.upper(ids.astype(str))).dictionary_decode(),
+        "vs_currency": pa.array(["USD"] * rows),
+        "price": rng.random(rows) * 100,
+        "market_cap": rng.random(rows) * 1e9,
+        "total_volume": rng.random(rows) * 1e7,
+        "source": pa.array(["coingecko_market_chart"] * rows),
+    })
+
+
+def timed(label: str, rows: int, fn) -> None:
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<32} {dt:8.2f}s  {rows / dt / 1e6:6.2f}M rows/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--chunk-rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    tbl = make_arrow(args.rows)
+    df = tbl.to_pandas()
+    print(f"{args.rows:,} rows, {tbl.nbytes / 1e6:.0f} MB in Arrow")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdb, adb = os.path.join(tmp, "pandas.duckdb"), os.path.join(tmp, "arrow.duckdb")
+        timed("pandas to_duckdb", args.rows, lambda: to_duckdb(df, pdb, "markets"))
+        timed(f"arrow append ({args.chunk_rows:,}/chunk)", args.rows,
+              lambda: append_arrow(tbl, adb, "markets", chunk_rows=args.chunk_rows))
+        timed("arrow append (reader)", args.rows,
+              lambda: append_arrow(pa.RecordBatchReader.from_batches(tbl.schema, tbl.to_batches()),
+                                   adb, "markets_stream", chunk_rows=args.chunk_rows))
+        for path in (pdb, adb):
+            n = get_service(path).query_df("SELECT count(*) AS n FROM markets")["n"][0]
+            assert n == args.rows, (path, n)
+        close_services()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Maintain 1m/5m/15m/1h/4h/1d OHLCV bars in ohlcv from new markets ticks.
+
+    python scripts/build_bars.py --loop 60
+"""
+import argparse
+import logging
+import time
+
+from certus.storage.bars import build_bars
+from certus.storage.service import get_service
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
+DB_PATH = "data/markets.duckdb"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build multi-timeframe OHLCV bars incrementally.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--table", default="markets", help="tick table (markets or cg_prices)")
+    parser.add_argument("--loop", type=float, default=0, help="repeat every N seconds (0 = run once)")
+    args = parser.parse_args()
+
+    svc = get_service(args.db)
+    while True:
+        stats = svc.submit(build_bars, args.table).result()   # one transaction
+        logging.info(f"[bars] rebuilt {stats}")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,15 @@
 from certus.utils.pause_guard import guard_pause
 guard_pause()
 
+import argparse
 import logging
-import duckdb
 import pandas as pd
 
+from certus.analytics import indicator_engine as engine
+from certus.analytics.indicator_state import reset_state, update_indicators
+from certus.analytics.sql_indicators import materialize_indicators
+from certus.storage.service import get_service
+
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
 
 DB_PATH = "data/markets.duckdb"
@@ -26,86 +31,42 @@ def rsi_wilder(price: pd.Series, period: int = 14) -> pd.Series:
     return 100 - (100 / (1 + rs))
 
 def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    # Expect columns: id, symbol, ts (datetime64[ns] naive), price (float)
-    def _calc(g: pd.DataFrame) -> pd.DataFrame:
-        g = g.sort_values("ts").copy()
-        g["ema_9"] = ema(g["price"], 9)
-        g["ema_20"] = ema(g["price"], 20)
-        macd_fast = ema(g["price"], 12)
-        macd_slow = ema(g["price"], 26)
-        g["macd"] = macd_fast - macd_slow
-        g["macd_signal"] = g["macd"].ewm(span=9, adjust=False, min_periods=9).mean()
-        g["macd_hist"] = g["macd"] - g["macd_signal"]
-        g["rsi_14"] = rsi_wilder(g["price"], 14)
-        return g
-
-    # Avoid deprecation: group on a narrow frame (don’t include extra cols)
-    base = df[["id","symbol","ts","price"]].copy()
-    out = base.groupby("id", group_keys=False).apply(_calc)
+    # Expect columns: id, symbol, ts (datetime64[ns] naive), price (float).
+    # Same definitions as ema()/rsi_wilder() above, computed for every id in
+    # one pass (certus.analytics.indicator_engine) instead of groupby.apply.
+    base = df.loc[df["id"].notna(), ["id","symbol","ts","price"]]
+    out = engine.compute_indicators(base, key="id", ts="ts", warmup=True, rsi_mode="wilder")
     return out[["id","symbol","ts","price","rsi_14","ema_9","ema_20","macd","macd_signal","macd_hist"]]
 
 def main():
-    logging.info("Loading markets & computing indicators (pandas)…")
-    con = duckdb.connect(DB_PATH)
-
-    # Ensure fixed schema (10 columns)
-    con.execute("""
-    CREATE TABLE IF NOT EXISTS indicators (
-        id           VARCHAR,
-        symbol       VARCHAR,
-        ts           TIMESTAMP,
-        price        DOUBLE,
-        rsi_14       DOUBLE,
-        ema_9        DOUBLE,
-        ema_20       DOUBLE,
-        macd         DOUBLE,
-        macd_signal  DOUBLE,
-        macd_hist    DOUBLE
-    );
-    """)
-
-    # Pull ordered price history; create a tz-naive UTC timestamp column
-    df = con.sql("""
-        SELECT
-            id,
-            UPPER(symbol) AS symbol,
-            COALESCE(last_updated, TO_TIMESTAMP(ts/1000)) AS ts,
-            price
-        FROM markets
-        WHERE price IS NOT NULL
-        ORDER BY id, ts
-    """).fetchdf()
-
-    if df.empty:
-        logging.warning("No market rows to compute.")
-        con.close()
+    parser = argparse.ArgumentParser(description="Advance indicators past each asset's watermark.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="drop the saved indicator state and recompute from full history")
+    parser.add_argument("--table", default="markets", help="price table (markets or cg_prices)")
+    parser.add_argument("--sql", action="store_true",
+                        help="compute inside DuckDB (window functions) instead of in Python; appends a row only "
+                             "for assets with new prices and does not read or update indicator_state")
+    args = parser.parse_args()
+
+    svc = get_service(args.db)
+    if args.sql:
+        stats = svc.submit(materialize_indicators, args.table).result()
+        logging.info("Indicators computed in DuckDB for %s assets.", stats["assets"])
         return
-
-    # Normalize ts → ensure tz-naive (UTC) to satisfy DuckDB TIMESTAMP (no TZ)
-    df["ts"] = pd.to_datetime(df["ts"], utc=True).dt.tz_convert("UTC").dt.tz_localize(None)
-
-    ind = compute_indicators(df).dropna(subset=["price"])
-
-    # Keep only the latest row per asset (snapshot table)
-    ind_latest = (
-        ind.sort_values(["id","ts"])
-           .groupby("id", as_index=False)
-           .tail(1)
-           .reset_index(drop=True)
-    )
-
-    # Register and insert (explicit column list to match table)
-    con.register("ind_latest", ind_latest)
-    con.execute("""
-        INSERT INTO indicators (id, symbol, ts, price, rsi_14, ema_9, ema_20, macd, macd_signal, macd_hist)
-        SELECT id, symbol, ts, price, rsi_14, ema_9, ema_20, macd, macd_signal, macd_hist
-        FROM ind_latest
-    """)
-
-    total = con.sql("SELECT COUNT(*) AS n FROM indicators").fetchdf().iloc[0,0]
-    logging.info("Indicators saved. Table row count: %s", total)
-    con.close()
-    logging.info("Done.")
+    if args.rebuild:
+        logging.info("Resetting indicator state…")
+        svc.submit(reset_state).result()
+
+    # Only rows newer than indicator_state.last_ts are loaded; EMA/RSI/MACD
+    # continue from the saved recursive state (same values as a full recompute).
+    stats = svc.submit(update_indicators, args.table).result()
+    if not stats["rows"]:
+        logging.info("No new market rows since the last run.")
+        return
+    total = svc.query_df("SELECT COUNT(*) AS n FROM indicators")["n"][0]
+    logging.info("Indicators advanced: %s assets, %s new rows. Table row count: %s",
+                 stats["assets"], stats["rows"], total)
 
 if __name__ == "__main__":
     main()
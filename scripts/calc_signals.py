@@ -4,89 +4,68 @@ import time
 import duckdb
 import pandas as pd
 
-from certus.analytics.signals import compute_signals
-from certus.analytics.scores import compute_scores
+from certus.analytics.signals import SIGNALS_DDL, compute_signals
+from certus.analytics.scores import compute_trend_score, replace_scores
+from certus.storage.service import get_service
 
 DB_PATH = "data/markets.duckdb"
 
+def _insert_signals(con: duckdb.DuckDBPyConnection, sig_df: pd.DataFrame) -> None:
+    # signals table (id is VARCHAR — asset id string like 'bitcoin')
+    con.execute(SIGNALS_DDL)
+    con.register("sig_df", sig_df)
+    con.execute("""
+        INSERT INTO signals (id, symbol, price, rsi_14, ema_9, ema_20, macd, signal_type, signal_strength, ts)
+        SELECT id, symbol, price, rsi_14, ema_9, ema_20, macd, signal_type, signal_strength, ts
+        FROM sig_df
+    """)
+    con.unregister("sig_df")
+
+def _write_scores(con: duckdb.DuckDBPyConnection, sco_df: pd.DataFrame) -> int:
+    con.register("sco_df", sco_df)
+    try:
+        return replace_scores(con, "sco_df")
+    finally:
+        con.unregister("sco_df")
+
 def main():
-    con = duckdb.connect(DB_PATH)
+    svc = get_service(DB_PATH)
 
     # 1) Load indicators
-    indicators = con.sql("SELECT * FROM indicators").fetchdf()
+    indicators = svc.query_df("SELECT * FROM indicators")
     if indicators.empty:
         print("[calc_signals] No indicator rows found in 'indicators'.")
-        con.close()
         return
 
     # 2) Compute signals
     sig_df = compute_signals(indicators)
     sig_df["ts"] = int(time.time() * 1000)
 
-    # 3) Ensure signals table (id is VARCHAR — asset id string like 'bitcoin')
-    con.sql("""
-        CREATE TABLE IF NOT EXISTS signals (
-            id VARCHAR,
-            symbol VARCHAR,
-            price DOUBLE,
-            rsi_14 DOUBLE,
-            ema_9 DOUBLE,
-            ema_20 DOUBLE,
-            macd DOUBLE,
-            signal_type VARCHAR,
-            signal_strength DOUBLE,
-            ts BIGINT
-        )
-    """)
-    con.register("sig_df", sig_df)
-    con.sql("""
-        INSERT INTO signals (id, symbol, price, rsi_14, ema_9, ema_20, macd, signal_type, signal_strength, ts)
-        SELECT id, symbol, price, rsi_14, ema_9, ema_20, macd, signal_type, signal_strength, ts
-        FROM sig_df
-    """)
+    # 3) Write signals
+    svc.submit(_insert_signals, sig_df).result()
 
-    # 4) Compute scores
-    scores_in = sig_df[["symbol","signal_type","signal_strength"]].copy()
-    sco_df = compute_scores(scores_in)
-    # join price + same batch ts
-    price_map = sig_df.set_index("symbol")["price"]
-    sco_df["price"] = price_map.reindex(sco_df["symbol"]).values
-    sco_df["ts"] = sig_df["ts"].iloc[0]
+    # 4) Trend scores from the latest indicators row per id (as calc_scores / the sharded chain)
+    latest = (indicators.dropna(subset=["id"]).sort_values(["id", "ts"], kind="stable")
+              .groupby("id").tail(1).reset_index(drop=True))
+    latest["symbol"] = latest["symbol"].str.upper()
+    sco_df = compute_trend_score(latest)
 
-    # 5) Ensure scores table (includes trend_tier)
-    con.sql("""
-        CREATE TABLE IF NOT EXISTS scores (
-            symbol VARCHAR,
-            signal_type VARCHAR,
-            signal_strength DOUBLE,
-            trend_score DOUBLE,
-            trend_tier VARCHAR,
-            price DOUBLE,
-            ts BIGINT
-        )
-    """)
-    con.register("sco_df", sco_df)
-    con.sql("""
-        INSERT INTO scores (symbol, signal_type, signal_strength, trend_score, trend_tier, price, ts)
-        SELECT symbol, signal_type, signal_strength, trend_score, trend_tier, price, ts
-        FROM sco_df
-    """)
+    # 5) Replace each id's score
+    svc.submit(_write_scores, sco_df).result()
 
     # 6) Print summary
-    top = con.sql("""
-        SELECT symbol, ROUND(price,2) AS price, ROUND(trend_score,2) AS score, trend_tier
+    top = svc.query_df("""
+        SELECT symbol, ROUND(price,2) AS price, ROUND(trend_score,2) AS score
         FROM scores
-        WHERE ts = (SELECT MAX(ts) FROM scores)
+        WHERE id IN (SELECT id FROM indicators)
         ORDER BY score DESC
         LIMIT 15
-    """).fetchdf()
+    """)
     print("\n== Top bullish (latest batch) ==")
     if isinstance(top, pd.DataFrame) and not top.empty:
         print(top.to_string(index=False))
     else:
         print("(no rows)")
 
-    con.close()
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Compact hive-partitioned Parquet datasets (see certus.storage.dataset).
+
+Merges the small files that frequent appends leave in each settled
+date=/hour= partition into one file sorted by (id, ts).
+
+    python scripts/compact_parquet.py data/coingecko_prices
+    python scripts/compact_parquet.py data/coingecko_prices data/markets_ds --loop 900
+"""
+import argparse
+import logging
+import time
+
+from certus.storage.dataset import ROW_GROUP_ROWS, SETTLE_SECONDS, SMALL_FILE_BYTES, compact
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
+
+
+def run_once(roots, args) -> None:
+    for root in roots:
+        t0 = time.monotonic()
+        stats = compact(root, small_bytes=int(args.small_mb * 1024 * 1024),
+                        settle_seconds=args.settle, row_group_rows=args.row_group_rows)
+        logging.info(f"[compact] {root}: {stats['files_in']} files -> {stats['partitions']} "
+                     f"in {time.monotonic() - t0:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge small Parquet files per partition.")
+    parser.add_argument("roots", nargs="+", help="dataset root directories")
+    parser.add_argument("--small-mb", type=float, default=SMALL_FILE_BYTES / 1024 / 1024,
+                        help="files below this size are merged")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="skip partitions written to within this many seconds")
+    parser.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS)
+    parser.add_argument("--loop", type=float, default=0, help="repeat every N seconds (background mode)")
+    args = parser.parse_args()
+
+    while True:
+        run_once(args.roots, args)
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
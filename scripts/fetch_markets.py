@@ -10,126 +10,118 @@ import logging
 Certus Market Fetcher — Pro-ready, parallel, schema-safe, rich fields.
 Pulls ~10k markets with extended columns.
 """
-import time, asyncio
-from typing import List, Tuple
-import pandas as pd, duckdb
+import os, time, asyncio, argparse
+from typing import Dict, Optional
+import duckdb
+import pyarrow as pa, pyarrow.compute as pc
 from certus.data.coingecko_client import CoinGeckoClient, CoinGeckoHTTPError
+from certus.data.markets_columns import CANON_COLS, decode_markets_page, empty_markets_table
+from certus.storage.dataset import write_partitioned
+from certus.storage.service import StorageService, get_service
+from certus.utils.aimd import AIMDController
 
 DB_PATH = "data/markets.duckdb"
 TABLE   = "markets"
 
 MAX_PAGES = 40      # 40 * 250 = ~10k
 PER_PAGE  = 250
-CONCURRENCY_PRO   = 20
-CONCURRENCY_FREE  = 2
-
-CANON_COLS: List[Tuple[str, str]] = [
-    ("ts", "BIGINT"),
-    ("id", "VARCHAR"),
-    ("symbol", "VARCHAR"),
-    ("name", "VARCHAR"),
-    ("vs_currency", "VARCHAR"),
-    ("price", "DOUBLE"),
-    ("market_cap", "DOUBLE"),
-    ("total_volume", "DOUBLE"),
-    ("high_24h", "DOUBLE"),
-    ("low_24h", "DOUBLE"),
-    ("price_change_24h", "DOUBLE"),
-    ("price_change_percentage_1h", "DOUBLE"),
-    ("price_change_percentage_24h", "DOUBLE"),
-    ("price_change_percentage_7d", "DOUBLE"),
-    ("market_cap_change_24h", "DOUBLE"),
-    ("market_cap_change_percentage_24h", "DOUBLE"),
-    ("circulating_supply", "DOUBLE"),
-    ("total_supply", "DOUBLE"),
-    ("max_supply", "DOUBLE"),
-    ("ath", "DOUBLE"),
-    ("ath_change_percentage", "DOUBLE"),
-    ("ath_date", "TIMESTAMP"),
-    ("atl", "DOUBLE"),
-    ("atl_change_percentage", "DOUBLE"),
-    ("atl_date", "TIMESTAMP"),
-    ("last_updated", "TIMESTAMP"),
-    ("image", "VARCHAR"),
-    ("roi_times", "DOUBLE"),
-    ("roi_currency", "VARCHAR"),
-    ("roi_percentage", "DOUBLE"),
-]
-
-def _rows_to_df(rows: List[dict]) -> pd.DataFrame:
-    cols = [c for c, _ in CANON_COLS]
-    if not rows:
-        return pd.DataFrame(columns=cols)
-    df = pd.DataFrame(rows)
-    for col in cols:
-        if col not in df.columns:
-            df[col] = None
-    return df[cols]
-
-async def fetch_page(c: CoinGeckoClient, page: int, ts_ms: int, vs_currency="usd") -> List[dict]:
-    mkts = await c.coins_markets(
+# In-flight requests adapt between these bounds (AIMD on p95 latency / 429 / 5xx);
+# the client's token bucket still caps the request *rate* per plan.
+CONCURRENCY_START = 2
+CONCURRENCY_MAX   = 32
+# --stream: decoded pages waiting for the writer (bounds peak memory)
+STREAM_QUEUE_PAGES = 4
+
+async def fetch_page(c: CoinGeckoClient, page: int, ts_ms: int, vs_currency="usd") -> pa.Table:
+    body = await c.coins_markets_raw(
         vs_currency=vs_currency,
         per_page=PER_PAGE,
         page=page,
         price_change_percentage="1h,24h,7d",
         sparkline=False,
     )
-    out = []
-    for m in mkts:
-        roi = m.get("roi") or {}
-        out.append({
-            "ts": ts_ms,
-            "id": m.get("id"),
-            "symbol": (m.get("symbol") or "").upper(),
-            "name": m.get("name"),
-            "vs_currency": vs_currency.upper(),
-            "price": m.get("current_price"),
-            "market_cap": m.get("market_cap"),
-            "total_volume": m.get("total_volume"),
-            "high_24h": m.get("high_24h"),
-            "low_24h": m.get("low_24h"),
-            "price_change_24h": m.get("price_change_24h"),
-            "price_change_percentage_1h": m.get("price_change_percentage_1h_in_currency"),
-            "price_change_percentage_24h": m.get("price_change_percentage_24h_in_currency") or m.get("price_change_percentage_24h"),
-            "price_change_percentage_7d": m.get("price_change_percentage_7d_in_currency"),
-            "market_cap_change_24h": m.get("market_cap_change_24h"),
-            "market_cap_change_percentage_24h": m.get("market_cap_change_percentage_24h"),
-            "circulating_supply": m.get("circulating_supply"),
-            "total_supply": m.get("total_supply"),
-            "max_supply": m.get("max_supply"),
-            "ath": m.get("ath"),
-            "ath_change_percentage": m.get("ath_change_percentage"),
-            "ath_date": m.get("ath_date"),
-            "atl": m.get("atl"),
-            "atl_change_percentage": m.get("atl_change_percentage"),
-            "atl_date": m.get("atl_date"),
-            "last_updated": m.get("last_updated"),
-            "image": m.get("image"),
-            "roi_times": (roi.get("times") if isinstance(roi, dict) else None),
-            "roi_currency": (roi.get("currency") if isinstance(roi, dict) else None),
-            "roi_percentage": (roi.get("percentage") if isinstance(roi, dict) else None),
-        })
-    return out
-
-def _ensure_table_schema(con: duckdb.DuckDBPyConnection, df: pd.DataFrame):
-    con.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} AS SELECT * FROM df LIMIT 0")
+    return decode_markets_page(body, ts_ms, vs_currency)
+
+def _floor_filter(tbl: pa.Table, min_cap: float, min_volume: float) -> pa.Table:
+    cap = pc.fill_null(tbl["market_cap"], 0.0)
+    vol = pc.fill_null(tbl["total_volume"], 0.0)
+    return tbl.filter(pc.and_(pc.greater_equal(cap, min_cap), pc.greater_equal(vol, min_volume)))
+
+def _page_below_cap(tbl: pa.Table, min_cap: float) -> bool:
+    # Pages come back in market_cap_desc order, so once a page's largest cap is
+    # under the floor every later page is too. Volume is not monotonic, so the
+    # volume floor only filters rows and never ends the walk.
+    top = pc.max(tbl["market_cap"]).as_py()
+    return min_cap > 0 and (top or 0) < min_cap
+
+def _ensure_table_schema(con: duckdb.DuckDBPyConnection):
+    ddl = ", ".join(f"{c} {t}" for c, t in CANON_COLS)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} ({ddl})")
     existing = con.sql(f"PRAGMA table_info('{TABLE}')").fetchdf()
     existing_cols = set(existing["name"].tolist())
     for col, typ in CANON_COLS:
         if col not in existing_cols:
             con.execute(f"ALTER TABLE {TABLE} ADD COLUMN {col} {typ}")
 
-def _insert_df(con: duckdb.DuckDBPyConnection, df: pd.DataFrame):
-    if df.empty:
+def _insert_table(con: duckdb.DuckDBPyConnection, tbl: pa.Table):
+    if tbl.num_rows == 0:
         print("[i] Nothing to insert.")
         return
     table_cols = con.sql(f"PRAGMA table_info('{TABLE}')").fetchdf()["name"].tolist()
-    insert_cols = [c for c, _ in CANON_COLS if c in table_cols and c in df.columns]
+    insert_cols = [c for c, _ in CANON_COLS if c in table_cols and c in tbl.column_names]
     col_list = ", ".join(insert_cols)
-    con.register("df", df[insert_cols])
-    con.execute(f"INSERT INTO {TABLE} ({col_list}) SELECT {col_list} FROM df")
+    con.register("page_tbl", tbl.select(insert_cols))
+    con.execute(f"INSERT INTO {TABLE} ({col_list}) SELECT {col_list} FROM page_tbl")
+    con.unregister("page_tbl")
+
+def _write_page(svc: StorageService, parquet_dir: Optional[str], tbl: pa.Table) -> int:
+    if tbl is None or tbl.num_rows == 0:
+        return 0
+    svc.submit(_insert_table, tbl).result()
+    if parquet_dir:
+        write_partitioned(tbl, parquet_dir)
+    return tbl.num_rows
+
+async def _page_writer(queue: "asyncio.Queue", svc: StorageService,
+                       parquet_dir: Optional[str], keep) -> int:
+    """
+    Drain (page, table-or-None) items until a None sentinel; returns rows written.
+
+    Pages are persisted in page order, each only once every earlier page has
+    reported, so a page is never written before an earlier one had the chance
+    to end the walk via stop_after() -- the same universe batch mode keeps.
+    Out-of-order pages wait in `pending` (at most the fetch concurrency).
+    """
+    written, nxt, pending = 0, 1, {}
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        page, tbl = item
+        pending[page] = tbl
+        while nxt in pending:
+            tbl = pending.pop(nxt)
+            if keep(nxt):
+                # DuckDB / Parquet writes block; run them off the event loop so fetches continue
+                written += await asyncio.to_thread(_write_page, svc, parquet_dir, tbl)
+            nxt += 1
+    for page in sorted(pending):   # after a gap (a worker died unexpectedly); last_page is final now
+        if keep(page):
+            written += await asyncio.to_thread(_write_page, svc, parquet_dir, pending[page])
+    return written
+
+async def _put(queue: "asyncio.Queue", item, writer: "asyncio.Task") -> None:
+    """queue.put that fails instead of blocking forever once the writer has died."""
+    put = asyncio.ensure_future(queue.put(item))
+    done, _ = await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+    if put in done:
+        return
+    put.cancel()
+    writer.result()                # re-raises the writer's exception
+    raise RuntimeError("page writer exited before the fetch finished")
 
-async def main():
+async def main(min_cap: float = 0.0, min_volume: float = 0.0, max_pages: int = MAX_PAGES,
+               stream: bool = False, parquet_dir: Optional[str] = None):
     ts = int(time.time() * 1000)
     client = CoinGeckoClient()
     try:
@@ -141,34 +133,102 @@ async def main():
         await client.close()
         return
 
-    concurrency = 20 if client.is_pro else 2
-    print(f"[Certus] Fetching {MAX_PAGES} pages x {PER_PAGE} (concurrency={concurrency})…")
-
-    sem = asyncio.Semaphore(concurrency)
-    results: List[List[dict]] = []
+    ctl = AIMDController(initial=CONCURRENCY_START, max_limit=CONCURRENCY_MAX)
+    client.on_response = ctl.observe
+    floor = min_cap > 0 or min_volume > 0
+    print(f"[Certus] Fetching up to {max_pages} pages x {PER_PAGE} (adaptive concurrency, start={ctl.limit})"
+          + (f", floor cap>={min_cap:,.0f} vol>={min_volume:,.0f}" if floor else "")
+          + (", streaming to storage" if stream else "") + "…")
+
+    results: Dict[int, pa.Table] = {}
+    tasks: Dict[int, asyncio.Task] = {}
+    last_page: Optional[int] = None   # set once we know no later page is needed
+    t0 = time.monotonic()
+
+    def keep(p: int) -> bool:
+        return last_page is None or p <= last_page
+
+    svc = get_service(DB_PATH)
+    queue: Optional[asyncio.Queue] = None
+    writer: Optional[asyncio.Task] = None
+    if stream:
+        svc.submit(_ensure_table_schema).result()
+        if parquet_dir:
+            os.makedirs(parquet_dir, exist_ok=True)
+        # bounded: a slow writer stalls fetchers instead of piling pages up in memory
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_PAGES)
+        writer = asyncio.create_task(_page_writer(queue, svc, parquet_dir, keep))
+        # a failed writer stops the fetch instead of leaving workers blocked on a full queue
+        writer.add_done_callback(lambda w: w.cancelled() or w.exception() is None
+                                 or [t.cancel() for t in tasks.values()])
+
+    def stop_after(p: int):
+        nonlocal last_page
+        if last_page is not None and last_page <= p:
+            return
+        last_page = p
+        for q, t in tasks.items():
+            if q > p and not t.done():
+                t.cancel()
 
     async def worker(p: int):
-        async with sem:
+        async with ctl:
+            if not keep(p):
+                return
             try:
                 rows = await fetch_page(client, p, ts)
-                print(f"[+] Page {p}: {len(rows)} rows")
-                results.append(rows)
             except CoinGeckoHTTPError as e:
                 print(f"[ERR] Page {p}: {e}")
-
-    tasks = [asyncio.create_task(worker(p)) for p in range(1, MAX_PAGES + 1)]
-    await asyncio.gather(*tasks)
+                if queue is not None:
+                    await _put(queue, (p, None), writer)   # lets the writer move past this page
+                return
+            print(f"[+] Page {p}: {rows.num_rows} rows")
+            if rows.num_rows < PER_PAGE:      # end of the universe
+                stop_after(p)
+            if floor:
+                if rows.num_rows and _page_below_cap(rows, min_cap):
+                    stop_after(p)
+                rows = _floor_filter(rows, min_cap, min_volume)
+            if queue is not None:
+                # still holding the concurrency slot, so backpressure reaches the fetchers
+                await _put(queue, (p, rows), writer)
+            else:
+                results[p] = rows
+
+    tasks.update({p: asyncio.create_task(worker(p)) for p in range(1, max_pages + 1)})
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
     await client.close()
+    skipped = sum(1 for t in tasks.values() if t.cancelled())
+    print(f"[i] Fetch took {time.monotonic() - t0:.1f}s (concurrency peak={ctl.peak}, final={ctl.limit})"
+          + (f"; stopped after page {last_page}, {skipped} in-flight/queued pages cancelled" if last_page else ""))
+
+    if stream:
+        if not writer.done():
+            await _put(queue, None, writer)
+        total = await writer              # re-raises a writer failure
+        print(f"[✔] Streamed {total} rows to storage.")
+        return
 
-    flat = [r for batch in results for r in batch]
-    df = _rows_to_df(flat)
-    print(f"[✔] Retrieved {len(df)} rows total.")
+    keep_pages = sorted(p for p in results if keep(p))
+    tbl = pa.concat_tables([results[p] for p in keep_pages]) if keep_pages else empty_markets_table()
+    print(f"[✔] Retrieved {tbl.num_rows} rows total.")
 
-    con = duckdb.connect(DB_PATH)
-    _ensure_table_schema(con, df)
-    _insert_df(con, df)
-    con.close()
+    svc.submit(_ensure_table_schema)
+    svc.submit(_insert_table, tbl).result()
     print("[✅] Market data saved successfully.")
 
+def parse_args():
+    ap = argparse.ArgumentParser(description="Fetch the CoinGecko coins/markets universe into DuckDB.")
+    ap.add_argument("--min-market-cap", type=float, default=0.0,
+                    help="floor mode: stop paging once a whole page is below this cap (e.g. 10000000)")
+    ap.add_argument("--min-volume", type=float, default=0.0,
+                    help="floor mode: drop rows with 24h volume below this")
+    ap.add_argument("--max-pages", type=int, default=MAX_PAGES, help="upper bound on pages fetched")
+    ap.add_argument("--stream", action="store_true",
+                    help="write each page as it arrives (bounded queue) instead of after the whole fetch")
+    ap.add_argument("--parquet-dir", default=None, help="with --stream, also append each page to this hive-partitioned Parquet dataset")
+    return ap.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    asyncio.run(main(args.min_market_cap, args.min_volume, args.max_pages, args.stream, args.parquet_dir))
@@ -1,6 +1,8 @@
 from __future__ import annotations
-import duckdb, datetime as dt
+import datetime as dt
 from certus.ingest.coinmarketcal import fetch_events
+from certus.storage.service import get_service
+from certus.storage.upsert import bulk_upsert
 
 def page(p:int): 
     j = fetch_events(max_items=20, page=p, days_ahead=45)
@@ -33,17 +35,16 @@ def norm(ev):
 evs = page(1) + page(2)
 rows = [norm(e) for e in evs if e.get("id")][:40]
 
-con = duckdb.connect("data/markets.duckdb")
-con.execute("""CREATE TABLE IF NOT EXISTS events_coinmarketcal (
+svc = get_service("data/markets.duckdb")
+svc.execute("""CREATE TABLE IF NOT EXISTS events_coinmarketcal (
   id VARCHAR PRIMARY KEY, title VARCHAR, description VARCHAR,
   coin_symbol VARCHAR, coin_name VARCHAR, date_event TIMESTAMP,
   is_hot BOOLEAN, source VARCHAR, proof VARCHAR, url VARCHAR,
   raw JSON, ingested_at TIMESTAMP DEFAULT now()
 )""")
-for r in rows:
-    con.execute("DELETE FROM events_coinmarketcal WHERE id = ?", [r[0]])
-    con.execute("""INSERT INTO events_coinmarketcal
-      (id,title,description,coin_symbol,coin_name,date_event,is_hot,source,proof,url,raw)
-      VALUES (?,?,?,?,?,?,?,?,?,?,to_json(?))""", r)
-print("events_coinmarketcal inserted:", len(rows))
-con.close()
+cols = ["id", "title", "description", "coin_symbol", "coin_name", "date_event",
+        "is_hot", "source", "proof", "url", "raw"]
+# one statement + one transaction for the whole batch
+n = svc.submit(bulk_upsert, "events_coinmarketcal", [dict(zip(cols, r)) for r in rows], ["id"],
+               json_cols=["raw"]).result()
+print("events_coinmarketcal upserted:", n)
@@ -1,7 +1,9 @@
 from __future__ import annotations
-import duckdb, datetime as dt
+import datetime as dt
 from typing import Any
 from certus.ingest.cryptopanic import latest_posts
+from certus.storage.service import get_service
+from certus.storage.upsert import bulk_upsert
 
 def norm(item: dict[str, Any]) -> tuple:
     id_ = str(item.get("id"))
@@ -33,8 +35,8 @@ def norm(item: dict[str, Any]) -> tuple:
 rows = latest_posts(public=True, page=1).get("results", [])[:25]
 tuples = [norm(x) for x in rows if x.get("id")]
 
-con = duckdb.connect("data/markets.duckdb")
-con.execute("""
+svc = get_service("data/markets.duckdb")
+svc.execute("""
   CREATE TABLE IF NOT EXISTS news_cryptopanic (
     id            VARCHAR PRIMARY KEY,
     published_at  TIMESTAMP,
@@ -49,11 +51,8 @@ con.execute("""
     ingested_at   TIMESTAMP DEFAULT now()
   )
 """)
-for t in tuples:
-    con.execute("DELETE FROM news_cryptopanic WHERE id = ?", [t[0]])
-    con.execute("""
-      INSERT INTO news_cryptopanic (id,published_at,title,url,domain,source,currencies,kind,votes,raw)
-      VALUES (?,?,?,?,?,?,?,?,?,to_json(?))
-    """, t)
-print(f"news_cryptopanic inserted: {len(tuples)}")
-con.close()
+cols = ["id", "published_at", "title", "url", "domain", "source", "currencies", "kind", "votes", "raw"]
+# one statement + one transaction for the whole batch
+n = svc.submit(bulk_upsert, "news_cryptopanic", [dict(zip(cols, t)) for t in tuples], ["id"],
+               json_cols=["raw"]).result()
+print(f"news_cryptopanic upserted: {n}")
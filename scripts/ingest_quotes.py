@@ -1,44 +1,55 @@
 from __future__ import annotations
-import duckdb, datetime as dt
-from certus.ingest.finnhub_client import quote as fh_quote
-from certus.ingest.alphavantage_client import global_quote as av_quote
+import asyncio, datetime as dt
+from certus.ingest.finnhub_client import aquote as fh_quote
+from certus.ingest.alphavantage_client import aglobal_quote as av_quote
+from certus.ingest.fanout import fan_out
+from certus.storage.service import get_service
+from certus.storage.upsert import bulk_upsert
+from certus.utils.http import aclose_clients
 
 FH_SYMBOLS = ["AAPL","MSFT","TSLA"]
 AV_SYMBOLS = ["IBM","AAPL"]
 
-def upsert_fh(con, sym):
-    j = fh_quote(sym)
-    t = (sym, float(j.get("c") or 0), float(j.get("h") or 0), float(j.get("l") or 0),
-         float(j.get("o") or 0), float(j.get("pc") or 0), int(j.get("t") or 0), j)
-    con.execute("DELETE FROM quotes_finnhub WHERE symbol = ?", [sym])
-    con.execute("""
-      INSERT INTO quotes_finnhub (symbol,price,high,low,open,prev_close,t_unix_ms,raw)
-      VALUES (?,?,?,?,?,?,?,to_json(?))
-    """, t)
-
-def upsert_av(con, sym):
-    j = av_quote(sym)
+async def fetch_all():
+    # both providers fan out concurrently, each paced by its own rate limit
+    try:
+        return await asyncio.gather(
+            fan_out(fh_quote, FH_SYMBOLS, "finnhub"),
+            fan_out(av_quote, AV_SYMBOLS, "alphavantage"),
+        )
+    finally:
+        await aclose_clients()
+
+def fh_row(sym, j):
+    return {"symbol": sym, "price": float(j.get("c") or 0), "high": float(j.get("h") or 0),
+            "low": float(j.get("l") or 0), "open": float(j.get("o") or 0),
+            "prev_close": float(j.get("pc") or 0), "t_unix_ms": int(j.get("t") or 0), "raw": j}
+
+def av_row(sym, j):
     g = j.get("Global Quote", {})
-    t = (sym,
-         float(g.get("05. price") or 0),
-         float(g.get("03. high") or 0),
-         float(g.get("04. low") or 0),
-         float(g.get("02. open") or 0),
-         float(g.get("08. previous close") or 0),
-         float(g.get("06. volume") or 0),
-         None,
-         j)
-    con.execute("DELETE FROM quotes_av WHERE symbol = ?", [sym])
-    con.execute("""
-      INSERT INTO quotes_av (symbol,price,high,low,open,prev_close,volume,ts,raw)
-      VALUES (?,?,?,?,?,?,?,?,to_json(?))
-    """, t)
-
-con = duckdb.connect("data/markets.duckdb")
-con.execute("CREATE TABLE IF NOT EXISTS quotes_finnhub (symbol VARCHAR, price DOUBLE, high DOUBLE, low DOUBLE, open DOUBLE, prev_close DOUBLE, t_unix_ms BIGINT, raw JSON, ingested_at TIMESTAMP DEFAULT now())")
-con.execute("CREATE TABLE IF NOT EXISTS quotes_av (symbol VARCHAR, price DOUBLE, high DOUBLE, low DOUBLE, open DOUBLE, prev_close DOUBLE, volume DOUBLE, ts TIMESTAMP, raw JSON, ingested_at TIMESTAMP DEFAULT now())")
-
-for s in FH_SYMBOLS: upsert_fh(con, s)
-for s in AV_SYMBOLS: upsert_av(con, s)
-print(f"quotes_finnhub upserted: {len(FH_SYMBOLS)}; quotes_av upserted: {len(AV_SYMBOLS)}")
-con.close()
+    return {"symbol": sym,
+            "price": float(g.get("05. price") or 0),
+            "high": float(g.get("03. high") or 0),
+            "low": float(g.get("04. low") or 0),
+            "open": float(g.get("02. open") or 0),
+            "prev_close": float(g.get("08. previous close") or 0),
+            "volume": float(g.get("06. volume") or 0),
+            "ts": None,
+            "raw": j}
+
+def upsert_all(con, fh_ok, av_ok):
+    # both tables in one transaction (runs on the storage writer)
+    n_fh = bulk_upsert(con, "quotes_finnhub", [fh_row(s, j) for s, j in fh_ok.items()], ["symbol"], json_cols=["raw"])
+    n_av = bulk_upsert(con, "quotes_av", [av_row(s, j) for s, j in av_ok.items()], ["symbol"], json_cols=["raw"])
+    return n_fh, n_av
+
+fh_res, av_res = asyncio.run(fetch_all())
+fh_ok = {s: j for s, j in fh_res.items() if not isinstance(j, Exception)}
+av_ok = {s: j for s, j in av_res.items() if not isinstance(j, Exception)}
+
+svc = get_service("data/markets.duckdb")
+svc.execute("CREATE TABLE IF NOT EXISTS quotes_finnhub (symbol VARCHAR, price DOUBLE, high DOUBLE, low DOUBLE, open DOUBLE, prev_close DOUBLE, t_unix_ms BIGINT, raw JSON, ingested_at TIMESTAMP DEFAULT now())")
+svc.execute("CREATE TABLE IF NOT EXISTS quotes_av (symbol VARCHAR, price DOUBLE, high DOUBLE, low DOUBLE, open DOUBLE, prev_close DOUBLE, volume DOUBLE, ts TIMESTAMP, raw JSON, ingested_at TIMESTAMP DEFAULT now())")
+
+n_fh, n_av = svc.submit(upsert_all, fh_ok, av_ok).result()
+print(f"quotes_finnhub upserted: {n_fh}/{len(FH_SYMBOLS)}; quotes_av upserted: {n_av}/{len(AV_SYMBOLS)}")
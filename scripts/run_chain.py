@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Recompute indicators -> scores -> signals from full history across worker processes.
+
+Assets are sharded by hash(symbol); each worker reads its shard from Parquet
+and writes Parquet back, and the results are merged into DuckDB at the end.
+
+    python scripts/run_chain.py --workers 8 --shards 32
+"""
+from certus.utils.pause_guard import guard_pause
+guard_pause()
+
+import argparse
+import logging
+import os
+import time
+
+from certus.analytics.sharded import run_chain
+
+logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
+DB_PATH = "data/markets.duckdb"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded indicator/score/signal recompute.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--table", default="markets", help="price table (markets or cg_prices)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes (1 = in-process)")
+    parser.add_argument("--shards", type=int, default=None, help="shard count (default: one per worker)")
+    parser.add_argument("--work-dir", default=None, help="scratch directory for shard Parquet files")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stats = run_chain(args.db, args.table, workers=args.workers, shards=args.shards, work_dir=args.work_dir)
+    dt = time.perf_counter() - t0
+    logging.info("[chain] %s in %.1fs (%.0f rows/s, %s workers)", stats, dt, stats["rows"] / dt if dt else 0,
+                 args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Fixtures over the shared synthetic market data in helpers.py."""
+import duckdb
+import pytest
+
+from helpers import insert, market_frame
+
+
+@pytest.fixture
+def markets():
+    return market_frame
+
+
+@pytest.fixture
+def duck():
+    """In-memory DuckDB with `df` loaded into `table`: duck(df, table="markets")."""
+    cons = []
+
+    def _make(df=None, table="markets"):
+        con = duckdb.connect()
+        cons.append(con)
+        if df is not None:
+            insert(con, df, table)
+        return con
+    yield _make
+    for con in cons:
+        con.close()
@@ -0,0 +1,30 @@
+"""Synthetic market data and DuckDB loading shared by the analytics and storage tests."""
+import numpy as np, pandas as pd
+
+T0 = 1_704_067_200_000  # 2024-01-01 UTC, epoch ms
+H = 3_600_000
+
+
+def market_frame(lengths, seed=0, symbols=None, start=T0, step=H, scale=100.0):
+    """
+    Random-walk prices (ts BIGINT ms, id, symbol, price), one row per step.
+    `lengths` is {id: n} or a list of n (ids c0, c1, ...); `symbols` maps id -> symbol (default: id).
+    """
+    if not isinstance(lengths, dict):
+        lengths = {f"c{i}": n for i, n in enumerate(lengths)}
+    rng = np.random.default_rng(seed)
+    parts = [pd.DataFrame({"ts": start + np.arange(n, dtype=np.int64) * step, "id": cid,
+                           "symbol": (symbols or {}).get(cid, cid),
+                           "price": scale * np.exp(np.cumsum(rng.normal(0, 0.02, n)))})
+             for cid, n in lengths.items()]
+    return pd.concat(parts, ignore_index=True)
+
+
+def insert(con, df, table="markets"):
+    """Append df to `table` by column name, creating it from df if missing."""
+    con.register("_df", df)
+    try:
+        con.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM _df LIMIT 0")
+        con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM _df")
+    finally:
+        con.unregister("_df")
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from certus.utils.aimd import AIMDController
+
+def test_additive_increase_when_healthy():
+    c = AIMDController(initial=2, max_limit=4, window=5)
+    for _ in range(20):
+        c.observe(200, 0.1)
+    assert c.limit == 4
+
+def test_multiplicative_decrease_on_429():
+    c = AIMDController(initial=16, window=5)
+    c.observe(429, 0.1)
+    assert c.limit == 8
+    c.observe(503, 0.1)          # same burst, inside cooldown
+    assert c.limit == 8
+
+def test_no_increase_when_latency_degrades():
+    c = AIMDController(initial=2, window=5)
+    for _ in range(5):
+        c.observe(200, 0.1)
+    assert c.limit == 3
+    for _ in range(5):
+        c.observe(200, 1.0)
+    assert c.limit == 3
+
+@pytest.mark.asyncio
+async def test_gate_caps_inflight():
+    c = AIMDController(initial=2)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with c:
+            peak = max(peak, c.inflight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(job() for _ in range(10)))
+    assert peak == 2 and c.inflight == 0
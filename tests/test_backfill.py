@@ -0,0 +1,103 @@
+import duckdb, pytest
+from certus.data.coingecko_client import CoinGeckoHTTPError
+from certus.ingestion.backfill import BackfillEngine
+
+class FakeClient:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    async def market_chart(self, coin_id, vs_currency, days, interval):
+        self.calls.append(coin_id)
+        if coin_id in self.fail:
+            raise CoinGeckoHTTPError("boom", status_code=404)
+        pts = [[1_700_000_000_000 + i * 86_400_000, 1.0 + i] for i in range(3)]
+        return {"prices": pts, "market_caps": pts, "total_volumes": pts}
+
+UNIVERSE = [("bitcoin", "BTC"), ("ethereum", "ETH"), ("solana", "SOL")]
+
+@pytest.mark.asyncio
+async def test_resumes_after_failed_coin(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    eng = BackfillEngine(db, days="3", batch_rows=2)
+    s1 = await eng.run(UNIVERSE, client=FakeClient(fail={"solana"}))
+    assert (s1.done, s1.failed, s1.rows) == (2, 1, 6)
+
+    c = FakeClient()
+    s2 = await eng.run(UNIVERSE, client=c)
+    assert c.calls == ["solana"] and s2.skipped == 2
+
+    con = duckdb.connect(db)
+    assert con.execute("SELECT count(*), count(DISTINCT id) FROM markets").fetchone() == (9, 3)
+    con.close()
+
+@pytest.mark.asyncio
+async def test_restart_refetches_without_duplicates(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    eng = BackfillEngine(db, days="3")
+    await eng.run(UNIVERSE, client=FakeClient())
+    c = FakeClient()
+    await eng.run(UNIVERSE, restart=True, client=c)
+    assert sorted(c.calls) == sorted(i for i, _ in UNIVERSE)
+    con = duckdb.connect(db)
+    assert con.execute("SELECT count(*) FROM markets").fetchone()[0] == 9
+    con.close()
+
+@pytest.mark.asyncio
+async def test_completed_job_is_fetched_again_by_the_next_run(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    eng = BackfillEngine(db, days="3")
+    s1 = await eng.run(UNIVERSE, client=FakeClient())
+    assert s1.done == 3
+
+    c = FakeClient()
+    s2 = await eng.run(UNIVERSE, client=c)
+    assert sorted(c.calls) == sorted(i for i, _ in UNIVERSE) and s2.skipped == 0
+    con = duckdb.connect(db)
+    assert con.execute("SELECT count(*) FROM markets").fetchone()[0] == 9
+    assert con.execute("SELECT count(*) FROM backfill_progress").fetchone()[0] == 0
+    con.close()
+
+class FlakyClient(FakeClient):
+    async def market_chart(self, coin_id, vs_currency, days, interval):
+        if coin_id == "ethereum":
+            self.calls.append(coin_id)
+            raise ConnectionResetError("peer reset")
+        if coin_id == "solana":
+            self.calls.append(coin_id)
+            return {"prices": [[1_700_000_000_000]]}
+        return await super().market_chart(coin_id, vs_currency, days, interval)
+
+@pytest.mark.asyncio
+async def test_unexpected_errors_are_recorded_per_coin(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    eng = BackfillEngine(db, days="3")
+    s = await eng.run(UNIVERSE, client=FlakyClient())
+    assert (s.done, s.failed) == (1, 2)
+    assert s.errors["ethereum"] == "ConnectionResetError: peer reset"
+    con = duckdb.connect(db)
+    assert con.execute("SELECT id, status FROM backfill_progress ORDER BY id").fetchall() == [
+        ("bitcoin", "done"), ("ethereum", "error"), ("solana", "error")]
+    con.close()
+
+class RangeClient(FakeClient):
+    async def market_chart_range(self, coin_id, vs_currency, frm_unix, to_unix, granularity="auto"):
+        self.calls.append((coin_id, frm_unix, to_unix))
+        pts = [[t * 1000, 2.0] for t in range(frm_unix - frm_unix % 3600, to_unix, 3600)]
+        return {"prices": pts, "market_caps": pts, "total_volumes": pts}
+
+@pytest.mark.asyncio
+async def test_gaps_only_tops_up_missing_days(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    eng = BackfillEngine(db, days="10", gaps_only=True)
+    c = RangeClient()
+    await eng.run([("bitcoin", "BTC")], client=c)
+    assert len(c.calls) == 1
+    con = duckdb.connect(db)
+    n = con.execute("SELECT count(*) FROM markets").fetchone()[0]
+    assert n == con.execute("SELECT count(DISTINCT ts // 86400000) FROM markets").fetchone()[0]
+    con.close()
+
+    c = RangeClient()
+    await eng.run([("bitcoin", "BTC")], client=c)
+    assert c.calls == []
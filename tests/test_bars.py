@@ -0,0 +1,56 @@
+import duckdb, numpy as np, pandas as pd
+import pytest
+from certus.storage.bars import TIMEFRAMES, build_bars, read_bars
+from helpers import insert
+
+START = pd.Timestamp("2025-03-01 22:00")     # two hours before midnight: 1d and 4h buckets are split
+RULE = {"1m": "1min", "5m": "5min", "15m": "15min", "1h": "1h", "4h": "4h", "1d": "1D"}
+
+def _ticks(lo, hi, seed):
+    rng = np.random.default_rng(seed)
+    secs = np.sort(rng.choice(np.arange(lo, hi), 400, replace=False))   # unique: ties make close ambiguous
+    ts = START + pd.to_timedelta(secs, unit="s")
+    return pd.DataFrame({"ts": (ts - pd.Timestamp(0)) // pd.Timedelta("1ms"), "id": "btc", "symbol": "BTC",
+                         "vs_currency": "usd", "price": rng.random(400) * 100, "total_volume": rng.random(400)})
+
+def _expected(df, tf):
+    s = df.assign(t=pd.to_datetime(df["ts"], unit="ms")).set_index("t").sort_index()
+    r = s["price"].resample(RULE[tf]).ohlc()
+    r["volume"] = s["total_volume"].resample(RULE[tf]).last()
+    return r.dropna(subset=["open"]).reset_index(drop=True)
+
+def test_incremental_bars_match_resample_of_all_ticks(duck):
+    first, later = _ticks(0, 3 * 3600, 1), _ticks(3 * 3600 - 90, 30 * 3600, 2)   # overlaps the last minute
+    con = duck(first)
+    assert build_bars(con)["1m"] > 0
+    insert(con, later)
+    stats = build_bars(con)
+    assert stats["1d"] == 2 and stats["1m"] < len(_expected(pd.concat([first, later]), "1m"))
+    allticks = pd.concat([first, later])
+    for tf in TIMEFRAMES:
+        got = read_bars(con, "btc", tf)
+        want = _expected(allticks, tf)
+        assert len(got) == len(want), tf
+        np.testing.assert_allclose(got[["open", "high", "low", "close", "volume"]].to_numpy(),
+                                   want[["open", "high", "low", "close", "volume"]].to_numpy(), err_msg=tf)
+    assert build_bars(con)["1m"] == 1            # only the (possibly partial) newest minute is redone
+
+def test_late_ticks_behind_the_watermark_are_merged_into_every_tier(duck):
+    # the backfill arrives after the live ticks; both share the minute at 3h
+    live, late = _ticks(3 * 3600 + 15, 30 * 3600, 3), _ticks(0, 3 * 3600 + 15, 4)
+    con = duck(live)
+    build_bars(con)
+    insert(con, late)
+    assert build_bars(con)["1m"] > 1
+    allticks = pd.concat([live, late])
+    for tf in TIMEFRAMES:
+        got = read_bars(con, "btc", tf)
+        want = _expected(allticks, tf)
+        assert len(got) == len(want), tf
+        np.testing.assert_allclose(got[["open", "high", "low", "close", "volume"]].to_numpy(),
+                                   want[["open", "high", "low", "close", "volume"]].to_numpy(), err_msg=tf)
+    assert build_bars(con)["1m"] == 1            # merged once; nothing is late any more
+
+def test_read_bars_rejects_unknown_timeframe():
+    with pytest.raises(ValueError):
+        read_bars(duckdb.connect(), "btc", "3m")
@@ -0,0 +1,20 @@
+import math
+from certus.data.chart_columns import chart_frame
+
+def test_aligns_caps_and_volumes_by_timestamp():
+    chart = {
+        "prices": [[3000, 3.0], [1000, 1.0], [2000, None]],
+        "market_caps": [[1000, 10.0], [3000, 30.0]],
+        "total_volumes": [[2000, 200.0], [3000, 300.0], [4000, 400.0]],
+    }
+    df = chart_frame(chart, "bitcoin", "BTC", "usd")
+    assert df["ts"].tolist() == [1000, 2000, 3000]
+    assert df["market_cap"].tolist()[::2] == [10.0, 30.0] and math.isnan(df["market_cap"][1])
+    assert math.isnan(df["total_volume"][0]) and df["total_volume"].tolist()[1:] == [200.0, 300.0]
+    assert math.isnan(df["price"][1])
+    assert set(df["vs_currency"]) == {"USD"} and set(df["source"]) == {"coingecko_market_chart"}
+
+def test_empty_and_renamed_volume():
+    df = chart_frame({"prices": [[1, 1.0]]}, "x", "X", "eur", volume_col="volume", source=None)
+    assert list(df.columns) == ["ts", "id", "symbol", "vs_currency", "price", "market_cap", "volume"]
+    assert chart_frame({}, "x", "X", "usd").empty
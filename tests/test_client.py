@@ -6,3 +6,31 @@ async def test_ping():
     c = CoinGeckoClient()
     r = await c.ping()
     assert isinstance(r, dict)
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_the_file_backed_key_bucket(tmp_path, monkeypatch):
+    import time, httpx
+    from certus.utils.rate_limit import TokenBucket
+    state = str(tmp_path / "cg_rate.json")
+    monkeypatch.setenv("CG_BASE_URL", f"http://retry-after.test/{tmp_path.name}")   # fresh shared pool
+    monkeypatch.setenv("CG_RATE_STATE", state)
+    monkeypatch.setenv("CG_CALLS_PER_MIN", "6000")
+    monkeypatch.setenv("CG_CACHE", "0")
+    for k in ("COINGECKO_API_KEY", "COINGECKO_API_KEYS"):
+        monkeypatch.delenv(k, raising=False)
+    replies = [httpx.Response(429, headers={"Retry-After": "1"}), httpx.Response(200, json={"ok": 1})]
+
+    c = CoinGeckoClient()
+    await c._client.aclose()
+    c._client = httpx.AsyncClient(base_url=c.base_url, transport=httpx.MockTransport(lambda req: replies.pop(0)))
+    try:
+        t0 = time.monotonic()
+        assert await c.ping() == {"ok": 1}
+        assert time.monotonic() - t0 >= 0.9                         # the retry waited out Retry-After
+        # one key: the budget lives in CG_RATE_STATE itself, so other processes see the pause
+        assert c.keys.slots[0].bucket.state_path == state
+        other = TokenBucket(6000, state_path=state)
+        c.keys.slots[0].bucket.pause(5)
+        assert other.available() == 0
+    finally:
+        await c.close()
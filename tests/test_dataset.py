@@ -0,0 +1,30 @@
+import duckdb, pandas as pd
+from certus.storage.dataset import compact, scan_sql, write_partitioned
+
+H = 3_600_000
+T0 = 1_735_689_600_000  # 2025-01-01T00:00Z
+
+def _rows(ts, ids):
+    return pd.DataFrame({"ts": ts, "id": ids, "vs_currency": "USD", "price": 1.0})
+
+def test_partitions_and_pruning(tmp_path):
+    root = tmp_path / "ds"
+    write_partitioned(_rows([T0, T0 + H, T0 + 25 * H], ["a", "b", "c"]), root)
+    dirs = sorted(str(p.relative_to(root)) for p in root.glob("*/*/*"))
+    assert dirs == ["date=2025-01-01/hour=0/vs_currency=USD", "date=2025-01-01/hour=1/vs_currency=USD",
+                    "date=2025-01-02/hour=1/vs_currency=USD"]
+    con = duckdb.connect()
+    got = con.execute(f"SELECT id FROM {scan_sql(root)} WHERE date = '2025-01-01' AND hour = 1").fetchall()
+    assert got == [("b",)]
+
+def test_compaction_merges_and_sorts(tmp_path):
+    root = tmp_path / "ds"
+    for i in range(5):
+        write_partitioned(_rows([T0 + 60_000 * (5 - i)], [f"c{4 - i}"]), root)
+    part = root / "date=2025-01-01" / "hour=0" / "vs_currency=USD"
+    assert len(list(part.glob("*.parquet"))) == 5
+    stats = compact(root, settle_seconds=0)
+    assert stats == {"partitions": 1, "files_in": 5}
+    assert len(list(part.glob("*.parquet"))) == 1
+    ids = duckdb.connect().execute(f"SELECT id FROM {scan_sql(root)}").fetchall()
+    assert [r[0] for r in ids] == ["c0", "c1", "c2", "c3", "c4"]
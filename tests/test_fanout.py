@@ -0,0 +1,30 @@
+import asyncio, time
+import pytest
+from certus.ingest.fanout import fan_out, provider_bucket
+
+@pytest.mark.asyncio
+async def test_fan_out_is_paced_per_provider_and_keeps_failures(monkeypatch):
+    monkeypatch.setenv("PACEDPROV_CALLS_PER_MIN", "600")          # 10/s after a burst of 5
+    live, peak = 0, 0
+
+    async def call(sym):
+        nonlocal live, peak
+        live += 1
+        peak = max(peak, live)
+        await asyncio.sleep(0.01)
+        live -= 1
+        if sym == "BAD":
+            raise ValueError("no quote")
+        return sym.lower()
+
+    t0 = time.monotonic()
+    out = await fan_out(call, ["A", "B", "A", "C", "D", "E", "F", "G", "BAD"], "pacedprov", concurrency=3)
+    assert time.monotonic() - t0 >= 0.25                             # 8 calls: 5 burst + 3 paced
+    assert list(out) == ["A", "B", "C", "D", "E", "F", "G", "BAD"]   # de-duplicated, input order
+    assert out["A"] == "a" and isinstance(out["BAD"], ValueError)
+    assert peak <= 3
+
+def test_providers_have_separate_shared_buckets():
+    assert provider_bucket("finnhub") is provider_bucket("finnhub")
+    assert provider_bucket("finnhub") is not provider_bucket("alphavantage")
+    assert provider_bucket("alphavantage").rate == 5 / 60
@@ -0,0 +1,78 @@
+import asyncio, importlib.util, json, os
+import pytest
+from certus.storage.service import get_service
+
+_spec = importlib.util.spec_from_file_location(
+    "fetch_markets", os.path.join(os.path.dirname(__file__), "..", "scripts", "fetch_markets.py"))
+fm = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(fm)
+
+
+class FakeClient:
+    """coins/markets with `n_rows` coins, served as PER_PAGE pages; page delays control arrival order."""
+
+    def __init__(self, n_rows, delays=None, caps=None):
+        self.n_rows, self.delays, self.caps = n_rows, delays or {}, caps or {}
+        self.is_pro, self.on_response = False, None
+        self.started, self.served = [], []
+
+    async def ping(self):
+        return {}
+
+    async def coins_markets(self, **kw):
+        return []
+
+    async def coins_markets_raw(self, page, per_page, **kw):
+        self.started.append(page)
+        await asyncio.sleep(self.delays.get(page, 0))
+        self.served.append(page)
+        lo = (page - 1) * per_page
+        ids = range(lo, min(lo + per_page, self.n_rows))
+        return json.dumps([{"id": f"c{i}", "symbol": "x", "current_price": 1.0,
+                            "market_cap": self.caps.get(page, 1e9 - i), "total_volume": 1.0} for i in ids]).encode()
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    monkeypatch.setattr(fm, "PER_PAGE", 10)
+    runs = iter(range(100))
+
+    def _run(client, **kw):
+        db = str(tmp_path / f"m{next(runs)}.duckdb")
+        monkeypatch.setattr(fm, "DB_PATH", db)
+        monkeypatch.setattr(fm, "CoinGeckoClient", lambda: client)
+        asyncio.run(asyncio.wait_for(fm.main(max_pages=8, **kw), timeout=10))
+        return sorted(get_service(db).query_df("SELECT id FROM markets")["id"])
+    return _run
+
+
+def test_stream_keeps_the_same_universe_as_batch(run):
+    # page 2 ends the walk (whole page under the cap floor) but arrives last; ranks
+    # shifted between requests, so page 3 has rows above the floor and arrives first
+    client = lambda: FakeClient(50, delays={2: 0.2}, caps={2: 1.0, 3: 1e10})
+    batch = run(client(), min_cap=1e6)
+    streamed = run(client(), min_cap=1e6, stream=True)
+    assert streamed == batch and len(batch) == 10     # page 1 only
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_cap_floor_stops_at_first_page_below_it_and_cancels_later_pages(run, monkeypatch, stream):
+    monkeypatch.setattr(fm, "CONCURRENCY_START", 8)
+    # page 3 is the first whole page under the floor; later pages are still in flight when it lands
+    client = FakeClient(80, delays={p: 0.5 for p in range(4, 9)}, caps={3: 1.0})
+    ids = run(client, min_cap=1e6, stream=stream)
+    assert ids == sorted(f"c{i}" for i in range(20))       # pages 1-2 only
+    assert {4, 5, 6, 7, 8} & set(client.started)           # they were requested ...
+    assert sorted(client.served) == [1, 2, 3]              # ... and cancelled before completing
+
+
+def test_stream_fails_instead_of_hanging_when_the_writer_dies(run, monkeypatch):
+    def boom(con, tbl):
+        raise OSError("disk full")
+    monkeypatch.setattr(fm, "_insert_table", boom)
+    monkeypatch.setattr(fm, "STREAM_QUEUE_PAGES", 1)
+    with pytest.raises(OSError, match="disk full"):
+        run(FakeClient(80), stream=True)
@@ -0,0 +1,29 @@
+import duckdb, pandas as pd
+from certus.ingestion.gaps import DAY_MS, clip_to_gap, plan_gaps
+
+T0 = 1_700_006_400_000 - 1_700_006_400_000 % DAY_MS
+
+def _con(points):
+    con = duckdb.connect()
+    con.execute("CREATE TABLE markets (ts BIGINT, id VARCHAR)")
+    con.executemany("INSERT INTO markets VALUES (?, ?)", points)
+    return con
+
+def test_head_interior_and_tail_gaps():
+    days = [0, 1, 2, 5, 6]
+    con = _con([(T0 + d * DAY_MS + 60_000, "btc") for d in days])
+    start, end = T0 - 2 * DAY_MS, T0 + 8 * DAY_MS + 5
+    plan = plan_gaps(con, "markets", ["btc", "new"], start, end)
+    assert plan["btc"] == [(start, T0), (T0 + 3 * DAY_MS, T0 + 5 * DAY_MS), (T0 + 7 * DAY_MS, end)]
+    assert plan["new"] == [(start, end)]
+    # head already fetched for this job -> coin just starts later
+    assert plan_gaps(con, "markets", ["btc"], start, end, head_known={"btc"})["btc"][0][0] == T0 + 3 * DAY_MS
+
+def test_fully_covered_has_no_gaps():
+    con = _con([(T0 + d * DAY_MS, "eth") for d in range(4)])
+    assert plan_gaps(con, "markets", ["eth"], T0, T0 + 3 * DAY_MS + 10)["eth"] == []
+
+def test_clip_thins_to_one_point_per_bucket():
+    df = pd.DataFrame({"ts": [T0 + i * 300_000 for i in range(600)]})  # ~2 days of 5-minute points
+    out = clip_to_gap(df, (T0, T0 + 2 * DAY_MS), DAY_MS)
+    assert out["ts"].tolist() == [T0, T0 + DAY_MS]
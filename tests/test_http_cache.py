@@ -0,0 +1,19 @@
+from certus.data.http_cache import ResponseCache
+
+def test_roundtrip_and_validators(tmp_path):
+    c = ResponseCache(tmp_path)
+    k = c.key("https://x/coins/list", {"b": 1, "a": "z"})
+    assert k == c.key("https://x/coins/list", {"a": "z", "b": "1"})
+    assert c.get(k) is None
+    c.put(k, b"[1,2]", etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    e = c.get(k)
+    assert e.body == b"[1,2]"
+    assert e.validators() == {"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+def test_touch_refreshes_age(tmp_path):
+    c = ResponseCache(tmp_path)
+    k = c.key("u", {})
+    c.put(k, b"{}")
+    old = c.get(k).stored_at
+    c.touch(k)
+    assert c.get(k).stored_at >= old
@@ -0,0 +1,47 @@
+import asyncio
+import httpx, pytest
+from certus.utils import http
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    """Route every pooled client through a MockTransport; returns the list of requests seen."""
+    seen, replies = [], []
+
+    def handler(req):
+        seen.append(req)
+        return replies.pop(0) if replies else httpx.Response(200, json={"ok": True})
+    kw = http._pool_kwargs
+    monkeypatch.setattr(http, "_pool_kwargs", lambda: {**kw(), "transport": httpx.MockTransport(handler)})
+    monkeypatch.setattr(http, "_CLIENTS", {})
+    monkeypatch.setattr(http, "_ACLIENTS", {})
+    return seen, replies
+
+def test_one_pooled_client_per_host_reused_across_retries(mock_transport):
+    seen, replies = mock_transport
+    replies.append(httpx.Response(503))
+    assert http.get_json_retry("https://a.test/x", backoff=0) == {"ok": True}
+    assert http.get_json("https://a.test/y") == {"ok": True}
+    assert len(seen) == 3 and len(http._CLIENTS) == 1
+    assert http.get_client("https://a.test/z") is http.get_client("https://a.test/")
+    assert http.get_client("https://b.test/") is not http.get_client("https://a.test/")
+
+    http.get_client("https://a.test/").close()                # a closed pool is replaced, not reused
+    assert not http.get_client("https://a.test/").is_closed
+
+def test_pool_limits_follow_settings():
+    kw = http._pool_kwargs()
+    assert kw["http2"] == (http.HTTP_HTTP2 and http._H2_AVAILABLE)
+    pool = httpx.Client(**kw)._transport._pool
+    assert pool._max_connections == http.HTTP_MAX_CONNS_PER_HOST
+    assert pool._keepalive_expiry == http.HTTP_KEEPALIVE_EXPIRY
+
+def test_async_clients_are_cached_per_event_loop(mock_transport):
+    async def grab():
+        a, b = http.get_async_client("https://a.test/1"), http.get_async_client("https://a.test/2")
+        assert a is b
+        assert await http.aget_json("https://a.test/q") == {"ok": True}
+        await http.aclose_clients()
+        assert a.is_closed and not http._ACLIENTS
+        return http.get_async_client("https://a.test/")
+    first, second = asyncio.run(grab()), asyncio.run(grab())
+    assert first is not second                                # a new loop never reuses another loop's pool
@@ -0,0 +1,72 @@
+import numpy as np, pandas as pd
+from certus.analytics import indicator_engine as engine
+from certus.analytics import indicators
+
+COLS = engine.INDICATOR_COLS
+
+def _frame(lengths, seed=3):
+    rng = np.random.default_rng(seed)
+    parts = []
+    for i, n in enumerate(lengths):
+        parts.append(pd.DataFrame({
+            "id": f"c{i}", "symbol": f"S{i}",
+            "ts": pd.date_range("2024-01-01", periods=n, freq="h"),
+            "price": 100 + np.cumsum(rng.normal(size=n)),
+        }))
+    df = pd.concat(parts, ignore_index=True)
+    return df.sample(frac=1, random_state=1).reset_index(drop=True)   # engine must sort
+
+def _wilder_groupby(df):
+    # the previous scripts/calc_indicators groupby.apply implementation
+    def ema(s, span):
+        return s.ewm(span=span, adjust=False, min_periods=span).mean()
+    def calc(g):
+        g = g.sort_values("ts").copy()
+        p = g["price"]
+        g["ema_9"], g["ema_20"] = ema(p, 9), ema(p, 20)
+        g["macd"] = ema(p, 12) - ema(p, 26)
+        g["macd_signal"] = g["macd"].ewm(span=9, adjust=False, min_periods=9).mean()
+        g["macd_hist"] = g["macd"] - g["macd_signal"]
+        d = p.diff()
+        ag = d.clip(lower=0).ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+        al = (-d.clip(upper=0)).ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+        g["rsi_14"] = 100 - 100 / (1 + ag / al.replace(0, np.nan))
+        return g
+    return pd.concat([calc(g) for _, g in df.groupby("id")]).sort_values(["id", "ts"]).reset_index(drop=True)
+
+def test_wilder_matches_groupby_path():
+    df = _frame([60, 1, 14, 26, 40, 5, 200])
+    got = engine.compute_indicators(df)
+    want = _wilder_groupby(df)
+    assert got["id"].tolist() == want["id"].tolist()
+    for c in COLS:
+        np.testing.assert_allclose(got[c].to_numpy(), want[c].to_numpy(float), rtol=1e-10, equal_nan=True)
+
+def test_analytics_sma_mode_matches_per_series():
+    df = _frame([50, 3, 30]).rename(columns={"ts": "last_updated"})
+    out = indicators.compute_indicators(df)
+    for sym, g in out.groupby("symbol"):
+        px = g["price"].reset_index(drop=True)
+        np.testing.assert_allclose(g["rsi_14"], indicators.rsi(px), equal_nan=True)
+        np.testing.assert_allclose(g["ema_20"], indicators.ema(px, 20))
+        m, s, h = indicators.macd(px)
+        np.testing.assert_allclose(g["macd_signal"], s)
+        assert g["trend"].tolist() == [indicators.classify_trend(*r) for r in
+                                       zip(g["rsi_14"], g["ema_9"], g["ema_20"], g["macd"])]
+
+def test_latest_per_key_and_flat_prices():
+    df = pd.DataFrame({"id": ["a"] * 30, "ts": range(30), "price": [5.0] * 30})
+    out = engine.compute_indicators(df)
+    assert out["rsi_14"].isna().all()            # no losses -> undefined, as in pandas
+    assert out["ema_9"].iloc[-1] == 5.0
+    assert engine.latest_per_key(out)["ts"].tolist() == [29]
+
+def test_sma_rsi_precision_is_independent_of_other_series():
+    # large-priced series sorted ahead of a tiny-priced one must not cost it precision
+    big = _frame([2000] * 30).assign(price=lambda d: d["price"] * 1e5)
+    tiny = _frame([300], seed=8).assign(id="zz", symbol="ZZ", price=lambda d: d["price"] * 1e-7)
+    df = pd.concat([big, tiny], ignore_index=True).rename(columns={"ts": "last_updated"})
+    out = indicators.compute_indicators(df)
+    got = out[out["symbol"] == "ZZ"]["rsi_14"].to_numpy()
+    want = indicators.rsi(tiny.sort_values("ts")["price"].reset_index(drop=True)).to_numpy()
+    np.testing.assert_allclose(got, want, rtol=1e-9, equal_nan=True)
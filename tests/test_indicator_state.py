@@ -0,0 +1,41 @@
+import numpy as np, pandas as pd
+from certus.analytics import indicator_engine as engine
+from certus.analytics.indicator_state import update_indicators, reset_state
+from helpers import H, T0, insert
+
+def test_incremental_runs_match_full_recompute(markets, duck):
+    full = markets({"btc": 80, "eth": 40}, seed=5)
+    late = markets({"new": 30}, seed=9)
+    con = duck(full.iloc[:0])
+    # feed history in uneven slices, advancing after each one
+    for lo, hi in [(0, 10), (10, 11), (11, 35), (35, 80)]:
+        part = full[(full["ts"] >= T0 + lo * H) & (full["ts"] < T0 + hi * H)]
+        if hi == 35:
+            part = pd.concat([part, late])
+        insert(con, part)
+        assert update_indicators(con)["rows"] == len(part)
+    assert update_indicators(con) == {"assets": 0, "rows": 0}    # nothing past the watermark
+
+    want = engine.latest_per_key(engine.compute_indicators(pd.concat([full, late])))
+    got = con.execute("SELECT * FROM indicators QUALIFY row_number() OVER (PARTITION BY id ORDER BY ts DESC) = 1 "
+                      "ORDER BY id").df()
+    assert got["id"].tolist() == want["id"].tolist()
+    for c in engine.INDICATOR_COLS:
+        np.testing.assert_allclose(got[c].to_numpy(float), want[c].to_numpy(float), rtol=1e-9, equal_nan=True)
+    st = con.execute("SELECT id, n, last_ts FROM indicator_state ORDER BY id").fetchall()
+    assert [(i, n) for i, n, _ in st] == [("btc", 80), ("eth", 40), ("new", 30)]
+
+def test_late_rows_are_skipped_until_rebuild(markets, duck):
+    con = duck(markets({"btc": 30}))
+    update_indicators(con)
+    insert(con, pd.DataFrame({"ts": [T0 - H], "id": ["btc"], "symbol": ["btc"], "price": [1.0]}))
+    assert update_indicators(con)["rows"] == 0
+    reset_state(con)
+    assert update_indicators(con)["rows"] == 31
+
+def test_rows_without_a_timestamp_never_become_the_watermark(markets, duck):
+    con = duck(markets({"btc": 30}))
+    insert(con, pd.DataFrame({"ts": [None], "id": ["btc"], "symbol": ["btc"], "price": [1.0]}))
+    assert update_indicators(con)["rows"] == 30
+    assert update_indicators(con)["rows"] == 0
+    assert con.execute("SELECT n, last_ts IS NOT NULL FROM indicator_state").fetchall() == [(30, True)]
@@ -0,0 +1,37 @@
+import pytest
+from certus.data.key_pool import KeyPool, KeySlot, KeysExhausted
+from certus.utils.rate_limit import TokenBucket
+
+def _pool(n, **kw):
+    return KeyPool([KeySlot(f"key{i}", TokenBucket(600, burst=5)) for i in range(n)], **kw)
+
+@pytest.mark.asyncio
+async def test_picks_key_with_most_budget():
+    pool = _pool(2)
+    first = await pool.acquire()
+    second = await pool.acquire()
+    assert first is not second
+
+@pytest.mark.asyncio
+async def test_rejected_keys_leave_rotation():
+    pool = _pool(2)
+    pool.report(pool.slots[0], 401)
+    assert {(await pool.acquire()).key for _ in range(4)} == {"key1"}
+    pool.report(pool.slots[1], 403)
+    with pytest.raises(KeysExhausted):
+        await pool.acquire()
+
+def test_repeated_429_benches_key():
+    pool = _pool(2, max_429=2, bench_seconds=60)
+    pool.report(pool.slots[0], 429, retry_after=0)
+    assert pool.slots[0].active(0)
+    pool.report(pool.slots[0], 429, retry_after=0)
+    assert not pool.slots[0].active(__import__("time").time())
+
+def test_shared_pool_names_never_contain_the_key(tmp_path):
+    from certus.data.key_pool import shared_key_pool
+    keys = ["CG-secretAAAA1", "CG-secretAAAA2"]      # same 8-char prefix
+    pool = shared_key_pool("http://x", keys, 60, "h", state_path=str(tmp_path / "cg.json"))
+    a, b = (s.bucket for s in pool.slots)
+    assert a is not b and a.state_path != b.state_path
+    assert not any("secret" in s.bucket.state_path for s in pool.slots)
@@ -0,0 +1,74 @@
+import pytest
+from certus.data.coingecko_client import CoinGeckoClient, range_chunks, stitch_ranges
+
+DAY = 86_400
+
+def test_range_chunks_cover_window_without_overlap():
+    chunks = range_chunks(0, 201 * DAY, 90 * DAY)
+    assert chunks == [(0, 67 * DAY), (67 * DAY, 134 * DAY), (134 * DAY, 201 * DAY)]
+    assert range_chunks(0, DAY, None) == [(0, DAY)]
+    chunks = range_chunks(7, 7 + 91 * DAY + 1, 90 * DAY)     # just over the span: no 1-day tail
+    assert chunks[0][0] == 7 and chunks[-1][1] == 7 + 91 * DAY + 1
+    assert all(b - a <= 90 * DAY and b - a > 45 * DAY for a, b in chunks)
+
+def test_stitch_drops_edge_duplicates_and_sorts():
+    a = {"prices": [[2000, 2.0], [1000, 1.0]], "market_caps": [], "total_volumes": []}
+    b = {"prices": [[2000, 9.0], [3000, 3.0]], "market_caps": [], "total_volumes": []}
+    assert stitch_ranges([a, b])["prices"] == [[1000, 1.0], [2000, 2.0], [3000, 3.0]]
+
+@pytest.mark.asyncio
+async def test_hourly_range_is_fetched_in_chunks():
+    client = CoinGeckoClient()
+    seen = []
+
+    async def fake_get(endpoint, params):
+        seen.append((params["from"], params["to"]))
+        return {"prices": [[params["from"] * 1000, 1.0], [params["to"] * 1000, 1.0]],
+                "market_caps": [], "total_volumes": []}
+
+    client._get = fake_get
+    try:
+        out = await client.market_chart_range("bitcoin", "usd", 0, 365 * DAY, granularity="hourly")
+        with pytest.raises(ValueError):
+            await client.market_chart_range("bitcoin", granularity="weekly")
+    finally:
+        await client.close()
+    assert len(seen) == 5
+    ts = [p[0] for p in out["prices"]]
+    assert ts == sorted(set(ts)) and len(ts) == 6
+
+@pytest.mark.asyncio
+async def test_daily_range_keeps_one_point_per_day():
+    client = CoinGeckoClient()
+    calls = []
+
+    async def fake_get(endpoint, params):            # a 10-day window comes back hourly
+        calls.append(params)
+        pts = [[t * 1000, float(t)] for t in range(params["from"], params["to"], 3600)]
+        return {"prices": pts, "market_caps": pts, "total_volumes": pts}
+
+    client._get = fake_get
+    try:
+        out = await client.market_chart_range("bitcoin", "usd", 0, 10 * DAY, granularity="daily")
+    finally:
+        await client.close()
+    assert len(calls) == 1
+    assert [p[0] for p in out["prices"]] == [(d * DAY + DAY - 3600) * 1000 for d in range(10)]
+
+@pytest.mark.asyncio
+async def test_hourly_range_just_over_90_days_stays_hourly():
+    client = CoinGeckoClient()
+
+    async def fake_get(endpoint, params):            # CoinGecko: <= 1 day -> 5-minutely, else hourly
+        step = 300 if params["to"] - params["from"] <= DAY else 3600
+        pts = [[t * 1000, 1.0] for t in range(params["from"], params["to"] + 1, step)]
+        return {"prices": pts, "market_caps": pts, "total_volumes": pts}
+
+    client._get = fake_get
+    try:
+        out = await client.market_chart_range("bitcoin", "usd", 0, 91 * DAY, granularity="hourly")
+    finally:
+        await client.close()
+    ts = [p[0] // 1000 for p in out["prices"]]
+    assert {b - a for a, b in zip(ts, ts[1:])} == {3600}
+    assert ts[0] == 0 and ts[-1] == 91 * DAY
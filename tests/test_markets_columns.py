@@ -0,0 +1,36 @@
+import json
+from certus.data.markets_columns import CANON_COLS, decode_markets_page, loads
+
+PAGE = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "current_price": 65000, "market_cap": 1.2e12,
+     "total_volume": 3e10, "price_change_percentage_24h": 1.5, "price_change_percentage_1h_in_currency": 0.1,
+     "ath_date": "2024-03-14T07:10:36.635Z", "last_updated": "2024-05-01T00:00:00.000Z",
+     "roi": None, "total_supply": 21000000},
+    {"id": "weird", "symbol": "wrd", "name": "Weird", "current_price": None, "market_cap": 10,
+     "total_supply": 10**21, "roi": {"times": 2.5, "currency": "usd", "percentage": 250.0}},
+]
+
+def test_decode_matches_canonical_schema():
+    tbl = decode_markets_page(json.dumps(PAGE).encode(), 1700000000000, "usd")
+    assert tbl.column_names == [c for c, _ in CANON_COLS]
+    rows = tbl.to_pylist()
+    assert rows[0]["symbol"] == "BTC" and rows[0]["vs_currency"] == "USD"
+    assert rows[0]["price"] == 65000.0 and rows[1]["price"] is None
+    assert rows[0]["price_change_percentage_24h"] == 1.5          # falls back to the plain field
+    assert rows[0]["ath_date"].isoformat() == "2024-03-14T07:10:36.635000"
+    assert rows[1]["total_supply"] == 1e21                        # beyond int64
+    assert rows[1]["roi_times"] == 2.5 and rows[1]["roi_currency"] == "usd"
+    assert rows[0]["ts"] == rows[1]["ts"] == 1700000000000
+
+def test_loads_handles_big_ints():
+    assert loads(b'[{"x": 1000000000000000000000}]')[0]["x"] == 10**21
+
+def test_arrow_pass_matches_python_fallback():
+    from certus.data.markets_columns import _fields_python
+    page = [dict(PAGE[0], total_supply=21e6), dict(PAGE[1], total_supply=1e9), {"id": "bare"}]
+    fast = decode_markets_page(json.dumps(page).encode(), 1, "usd")
+    assert fast.column("roi_times").to_pylist() == [None, 2.5, None]     # roi null -> children null
+    assert fast.column("symbol").to_pylist() == ["BTC", "WRD", ""]
+    slow = {k: v.to_pylist() for k, v in _fields_python(page).items()}
+    assert fast.column("price").to_pylist() == slow["current_price"]
+    assert fast.column("roi_currency").to_pylist() == slow["roi_currency"]
@@ -0,0 +1,36 @@
+import asyncio, time
+import pytest
+from certus.utils.rate_limit import TokenBucket, parse_retry_after, shared_bucket
+
+@pytest.mark.asyncio
+async def test_bucket_paces_after_burst():
+    b = TokenBucket(calls_per_min=600, burst=2)   # 10/s after a burst of 2
+    t0 = time.monotonic()
+    for _ in range(4):
+        await b.acquire()
+    assert time.monotonic() - t0 >= 0.15
+
+@pytest.mark.asyncio
+async def test_pause_blocks_callers():
+    b = TokenBucket(calls_per_min=6000, burst=5)
+    b.pause(0.2)
+    assert b.available() == 0
+    t0 = time.monotonic()
+    await b.acquire()
+    assert time.monotonic() - t0 >= 0.15
+
+def test_file_backed_state_is_shared(tmp_path):
+    path = str(tmp_path / "cg.json")
+    a = TokenBucket(calls_per_min=60, burst=3, state_path=path)
+    b = TokenBucket(calls_per_min=60, burst=3, state_path=path)
+    for _ in range(3):
+        assert a._try_take() == 0
+    assert b._try_take() > 0
+
+def test_shared_bucket_registry():
+    assert shared_bucket("x", 60) is shared_bucket("x", 120)
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
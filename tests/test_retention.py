@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import duckdb
+from certus.storage.bars import TIMEFRAMES, build_bars
+from certus.storage.retention import RetentionPolicy, apply_retention
+
+NOW = datetime(2025, 6, 1, 12, 30)
+PRUNE_ALL = {"1m": 0, "5m": 0, "15m": 0, "1h": 0, "4h": 0}     # 1d kept forever
+
+def _ms(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+def _con():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE markets (ts BIGINT, id VARCHAR, symbol VARCHAR, vs_currency VARCHAR, "
+                "price DOUBLE, total_volume DOUBLE, source VARCHAR)")
+    return con
+
+def _bars(con, tf):
+    return con.execute("SELECT vs_currency, ts, open, high, low, close, volume FROM ohlcv "
+                       "WHERE timeframe = ? ORDER BY ts", [tf]).fetchall()
+
+def test_ticks_are_barred_before_tiers_are_pruned():
+    con = _con()
+    old = datetime(2025, 5, 1, 10, 0)
+    rows = [(_ms(old + timedelta(minutes=m)), "btc", "BTC", "usd", p, v, None)
+            for m, p, v in [(0, 10.0, 1.0), (20, 30.0, 2.0), (40, 5.0, 3.0), (59, 20.0, 4.0)]]
+    rows.append((_ms(NOW - timedelta(hours=1)), "btc", "BTC", "usd", 99.0, 9.0, None))          # recent: kept
+    rows.append((_ms(old - timedelta(days=1)), "btc", "BTC", "usd", 1.0, 1.0, "coingecko_market_chart"))  # kept
+    con.executemany("INSERT INTO markets VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    stats = apply_retention(con, now=NOW)
+    assert stats["raw_dropped"] == 4 and stats["bars"] > 0
+    assert con.execute("SELECT count(*) FROM markets").fetchone()[0] == 2
+    assert _bars(con, "1h")[1] == ("USD", datetime(2025, 5, 1, 10), 10.0, 30.0, 5.0, 20.0, 4.0)
+    # 1m/5m/15m keep only the recent bar, 1h/4h/1d keep everything
+    counts = dict(con.execute("SELECT timeframe, count(*) FROM ohlcv GROUP BY ALL").fetchall())
+    assert counts == {"1m": 1, "5m": 1, "15m": 1, "1h": 3, "4h": 3, "1d": 3}
+
+    # idempotent: nothing left to drop
+    stats = apply_retention(con, now=NOW)
+    assert stats["raw_dropped"] == 0 and all(v == 0 for k, v in stats.items() if k.endswith("_dropped"))
+
+    stats = apply_retention(con, RetentionPolicy(bar_days={"1h": 10}), now=NOW)
+    assert stats["1h_dropped"] == 2
+    assert [b[1:3] + b[5:6] for b in _bars(con, "1d")[1:2]] == [(datetime(2025, 5, 1), 10.0, 20.0)]
+
+def test_watermark_day_survives_pruning_so_late_ticks_rebuild_whole_buckets():
+    con = _con()
+    t = datetime(2025, 5, 1, 10, 0)
+    policy = RetentionPolicy(raw_days=0, bar_days=PRUNE_ALL)
+    con.execute("INSERT INTO markets VALUES (?, 'eth', 'ETH', 'usd', 5.0, 1.0, NULL)", [_ms(t)])
+    apply_retention(con, policy, now=NOW)
+    con.execute("INSERT INTO markets VALUES (?, 'eth', 'ETH', 'usd', 50.0, 2.0, NULL)", [_ms(t + timedelta(minutes=30))])
+    assert apply_retention(con, policy, now=NOW)["raw_dropped"] == 1         # the 10:00 tick, now behind the watermark
+    for tf in ("1h", "1d"):
+        assert [b[2:6] for b in _bars(con, tf)] == [(5.0, 50.0, 5.0, 50.0)], tf
+
+    # the next day's tick moves the watermark: the fine tiers of May 1 go, its daily bar stays
+    con.execute("INSERT INTO markets VALUES (?, 'eth', 'ETH', 'usd', 7.0, 3.0, NULL)", [_ms(t + timedelta(days=1))])
+    apply_retention(con, policy, now=NOW)
+    assert con.execute("SELECT count(*) FROM ohlcv WHERE ts < '2025-05-02'").fetchone()[0] == 1
+    assert [b[2:6] for b in _bars(con, "1d")] == [(5.0, 50.0, 5.0, 50.0), (7.0, 7.0, 7.0, 7.0)]
+
+def test_late_backfill_is_merged_into_surviving_bars_before_ticks_are_pruned():
+    con = _con()
+    t = datetime(2025, 5, 1, 10, 0)
+    policy = RetentionPolicy(raw_days=0, bar_days=PRUNE_ALL)
+    con.executemany("INSERT INTO markets VALUES (?, 'eth', 'ETH', 'usd', ?, ?, NULL)",
+                    [(_ms(t + timedelta(minutes=10)), 5.0, 1.0), (_ms(t + timedelta(minutes=40)), 8.0, 2.0),
+                     (_ms(t + timedelta(days=2)), 9.0, 3.0)])
+    apply_retention(con, policy, now=NOW)
+    assert con.execute("SELECT count(*) FROM markets").fetchone()[0] == 1     # May 1 ticks and fine bars gone
+
+    # backfill of May 1 lands after that: earlier open, new high, then a later close
+    con.executemany("INSERT INTO markets VALUES (?, 'eth', 'ETH', 'usd', ?, ?, 'coingecko_market_chart')",
+                    [(_ms(t), 4.0, 7.0), (_ms(t + timedelta(minutes=20)), 12.0, 7.0),
+                     (_ms(t + timedelta(minutes=50)), 6.0, 6.0)])
+    apply_retention(con, policy, now=NOW)
+    # only the daily bar of May 1 survived; it now also covers the backfill
+    assert _bars(con, "1d")[0][2:7] == (4.0, 12.0, 4.0, 6.0, 6.0)
+    # merged once: the backfill rows stay in markets, only the newest minute is redone
+    assert build_bars(con) == {tf: 1 for tf in TIMEFRAMES}
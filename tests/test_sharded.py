@@ -0,0 +1,61 @@
+import numpy as np, pandas as pd
+from certus.analytics import indicator_engine as engine
+from certus.analytics.indicator_state import update_indicators
+from certus.analytics.sharded import run_chain
+from certus.analytics.signals import compute_signals
+from certus.storage.service import get_service
+from helpers import H, market_frame
+
+def _seed(db, n_coins=12, seed=4):
+    lengths = np.random.default_rng(seed).integers(5, 90, n_coins)
+    df = market_frame(list(lengths), seed=seed, symbols={f"c{i}": f"s{i % 9}" for i in range(n_coins)}, scale=50)
+    svc = get_service(db)
+    svc.append_df("markets", df, create=True).result()
+    svc.flush()
+    return svc, df
+
+def test_sharded_chain_matches_single_process(tmp_path):
+    svc, df = _seed(str(tmp_path / "m.duckdb"))
+    stats = run_chain(str(tmp_path / "m.duckdb"), workers=2, shards=3)
+    assert stats["assets"] == stats["indicators"] == stats["scores"] == df["id"].nunique()
+    assert stats["signals"] == df["symbol"].nunique()
+
+    want = engine.latest_per_key(engine.compute_indicators(df))
+    got = svc.query_df("SELECT * FROM indicators ORDER BY id")
+    assert got["id"].tolist() == want["id"].tolist()
+    for c in engine.INDICATOR_COLS:
+        np.testing.assert_allclose(got[c].to_numpy(float), want[c].to_numpy(float), rtol=1e-12, equal_nan=True)
+
+    # state was left at the end of history: nothing new for the incremental path
+    assert svc.submit(update_indicators).result()["rows"] == 0
+
+def test_signals_compare_consecutive_snapshots_like_calc_signals(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    svc, df = _seed(db)
+    run_chain(db, workers=1, shards=3)
+    last = df.groupby("id").tail(1)
+    # two new points per asset: the snapshot before them, not the middle point, is "previous"
+    nxt = pd.concat([last.assign(ts=last["ts"] + k * H, price=last["price"] * f) for k, f in ((1, 0.5), (2, 1.6))])
+    svc.append_df("markets", nxt).result()
+    svc.flush()
+    run_chain(db, workers=1, shards=3)
+
+    want = compute_signals(svc.query_df("SELECT * FROM indicators"))       # what calc_signals computes
+    got = svc.query_df("SELECT * FROM signals WHERE ts = (SELECT max(ts) FROM signals) ORDER BY symbol")
+    assert got["symbol"].tolist() == want["symbol"].tolist()
+    assert got["signal_type"].tolist() == want["signal_type"].tolist()
+
+def test_merge_keeps_other_assets_state_and_legacy_scores(tmp_path):
+    db = str(tmp_path / "m.duckdb")
+    svc, df = _seed(db)
+    svc.execute("CREATE TABLE scores (symbol VARCHAR, signal_type VARCHAR, signal_strength DOUBLE, "
+                "trend_score DOUBLE, trend_tier VARCHAR, price DOUBLE, ts BIGINT)")     # calc_signals.py schema
+    svc.execute("INSERT INTO scores (symbol, trend_score, ts) VALUES ('S0', 1.0, 1)")
+    svc.submit(update_indicators).result()
+    svc.execute("INSERT INTO indicator_state (id, symbol, n) VALUES ('delisted', 'OLD', 7)").result()
+    svc.flush()
+
+    stats = run_chain(db, workers=1, shards=2)
+    assert stats["scores"] == df["id"].nunique()
+    assert svc.query_df("SELECT count(*) AS n FROM scores WHERE id IS NULL")["n"][0] == 1
+    assert svc.query_df("SELECT n FROM indicator_state WHERE id = 'delisted'")["n"].tolist() == [7]
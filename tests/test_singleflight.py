@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+from certus.utils.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    sf, calls = SingleFlight(), 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return b"body"
+
+    out = await asyncio.gather(*(sf.do("k", fetch) for _ in range(5)), sf.do("other", fetch))
+    assert out == [b"body"] * 6 and calls == 2
+    await sf.do("k", fetch)          # nothing in flight, no ttl -> runs again
+    assert calls == 3
+
+@pytest.mark.asyncio
+async def test_ttl_reuses_result_and_errors_propagate():
+    sf, calls = SingleFlight(ttl=60), 0
+
+    async def ok():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await sf.do("a", ok) == 1
+    assert await sf.do("a", ok) == 1
+
+    async def boom():
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        await sf.do("b", boom)
+    assert await sf.do("b", ok) == 2
@@ -0,0 +1,38 @@
+import numpy as np, pandas as pd
+from certus.analytics import indicator_engine as engine
+from certus.analytics.sql_indicators import materialize_indicators
+from helpers import H, insert
+
+def _check(con, df, rtol):
+    want = engine.latest_per_key(engine.compute_indicators(df))
+    got = con.execute("SELECT * FROM indicators ORDER BY id").df()
+    assert got["id"].tolist() == want["id"].tolist()
+    for c in engine.INDICATOR_COLS:
+        np.testing.assert_allclose(got[c].to_numpy(float), want[c].to_numpy(float), rtol=rtol, equal_nan=True)
+    return got
+
+def test_sql_matches_engine_exactly_within_tail(markets, duck):
+    df = markets([1, 2, 14, 15, 26, 34, 120, 700], seed=11)
+    con = duck(df, "cg_prices")
+    assert materialize_indicators(con, "cg_prices")["assets"] == 8
+    got = _check(con, df, 1e-9)
+    last = df[df["id"] == "c6"]["price"].to_numpy()
+    row = got[got["id"] == "c6"].iloc[0]
+    assert row["high_20"] == last[-20:].max() and row["low_20"] == last[-20:].min()
+    assert np.isclose(row["return_20"], last[-1] / last[-21] - 1)
+    assert got[got["id"] == "c0"]["return_1"].isna().all()
+
+def test_truncated_tail_converges_to_full_history(markets, duck):
+    df = markets([900, 40], seed=11)
+    con = duck(df, "cg_prices")
+    materialize_indicators(con, "cg_prices", tail=500)
+    _check(con, df, 1e-6)
+
+def test_reruns_only_append_assets_with_new_prices(markets, duck):
+    df = markets([30, 40], seed=3)
+    con = duck(df, "cg_prices")
+    materialize_indicators(con, "cg_prices")
+    assert materialize_indicators(con, "cg_prices")["assets"] == 0
+    insert(con, pd.DataFrame({"ts": [df["ts"].max() + H], "id": ["c0"], "symbol": ["c0"], "price": [1.0]}), "cg_prices")
+    assert materialize_indicators(con, "cg_prices")["assets"] == 1
+    assert con.execute("SELECT id, count(*) FROM indicators GROUP BY id ORDER BY id").fetchall() == [("c0", 2), ("c1", 1)]
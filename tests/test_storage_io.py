@@ -0,0 +1,29 @@
+import duckdb, pandas as pd, pyarrow as pa, pytest
+from certus.storage.io import append_arrow, to_duckdb
+from certus.storage.service import get_service
+
+def test_to_duckdb_creates_table_from_frame(tmp_path):
+    db = str(tmp_path / "io.duckdb")
+    to_duckdb(pd.DataFrame({"ts": [1, 2], "id": ["a", "b"]}), db, "t")
+    to_duckdb(pd.DataFrame({"id": ["c"], "ts": [3]}), db, "t")  # by name
+    assert get_service(db).query_df("SELECT id FROM t ORDER BY ts")["id"].tolist() == ["a", "b", "c"]
+
+def test_append_arrow_chunks_readers_and_evolves(tmp_path):
+    db = str(tmp_path / "io.duckdb")
+    tbl = pa.table({"ts": list(range(10)), "id": ["x"] * 10})
+    assert append_arrow(tbl, db, "t", chunk_rows=3) == 10
+    reader = pa.RecordBatchReader.from_batches(tbl.schema, tbl.to_batches(max_chunksize=4))
+    assert append_arrow(reader, db, "t", chunk_rows=5, atomic=True) == 10
+    wider = tbl.append_column("price", pa.array([1.5] * 10))
+    with pytest.raises(duckdb.Error):
+        append_arrow(wider, db, "t")
+    append_arrow(wider, db, "t", evolve=True)
+    svc = get_service(db)
+    assert svc.query_df("SELECT count(*) n, count(price) p FROM t").iloc[0].tolist() == [30, 10]
+
+def test_append_arrow_casts_to_explicit_schema(tmp_path):
+    db = str(tmp_path / "io.duckdb")
+    schema = pa.schema([("ts", pa.int64()), ("price", pa.float32())])
+    append_arrow(pa.table({"price": [1, 2], "ts": [5, 6], "junk": ["a", "b"]}), db, "t", schema=schema)
+    cols = get_service(db).query_df("DESCRIBE t")[["column_name", "column_type"]].values.tolist()
+    assert cols == [["ts", "BIGINT"], ["price", "FLOAT"]]
@@ -0,0 +1,51 @@
+import threading
+import duckdb, pandas as pd, pytest
+from certus.storage.service import StorageService, get_service
+
+def test_writes_are_serialized_and_readable(tmp_path):
+    svc = StorageService(str(tmp_path / "s.duckdb"))
+    try:
+        svc.execute("CREATE TABLE t (k INTEGER, v VARCHAR)").result()
+        futs = []
+
+        def producer(n):
+            for i in range(50):
+                futs.append(svc.append_df("t", pd.DataFrame({"k": [n * 100 + i], "v": ["x"]})))
+
+        threads = [threading.Thread(target=producer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sum(f.result() for f in futs) == 200
+        with svc.reader() as cur:
+            assert cur.execute("SELECT count(DISTINCT k) FROM t").fetchone()[0] == 200
+    finally:
+        svc.close()
+
+def test_failing_request_does_not_sink_its_batch(tmp_path):
+    svc = StorageService(str(tmp_path / "s.duckdb"), max_batch=8)
+    try:
+        svc.execute("CREATE TABLE t (k INTEGER)").result()
+        good1 = svc.execute("INSERT INTO t VALUES (1)")
+        bad = svc.execute("INSERT INTO missing VALUES (1)")
+        good2 = svc.execute("INSERT INTO t VALUES (2)")
+        good1.result(); good2.result()
+        with pytest.raises(duckdb.Error):
+            bad.result()
+        assert svc.query_df("SELECT k FROM t ORDER BY k")["k"].tolist() == [1, 2]
+    finally:
+        svc.close()
+
+def test_read_only_service_rejects_writes_and_reuses_writer(tmp_path):
+    db = str(tmp_path / "s.duckdb")
+    duckdb.connect(db).close()
+    ro = StorageService(db, read_only=True)
+    with pytest.raises(RuntimeError):
+        ro.submit(lambda con: None)
+    with ro.reader() as cur:
+        assert cur.execute("SELECT 1").fetchone() == (1,)
+    ro.close()
+    rw = get_service(db)
+    assert get_service(db, read_only=True) is rw
+    rw.close()
@@ -0,0 +1,34 @@
+import pytest
+from certus.ingestion.symbol_index import SymbolIndex
+
+class FakeClient:
+    def __init__(self):
+        self.listed = [
+            {"id": "eth-clone", "symbol": "eth", "name": "Clone"},
+            {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+            {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+        ]
+
+    async def coins_list(self):
+        return self.listed
+
+    async def coins_markets(self, per_page, page):
+        return [{"id": "bitcoin", "market_cap": 1e12}, {"id": "ethereum", "market_cap": 4e11}] if page == 1 else []
+
+@pytest.mark.asyncio
+async def test_duplicates_rank_by_market_cap(tmp_path):
+    idx = SymbolIndex(str(tmp_path / "t.duckdb"))
+    assert await idx.refresh(FakeClient())
+    idx.load()
+    assert idx.resolve(["eth", "BTC", "missing"]) == {"ETH": "ethereum", "BTC": "bitcoin"}
+
+@pytest.mark.asyncio
+async def test_refresh_skipped_while_fresh_and_incremental(tmp_path):
+    idx = SymbolIndex(str(tmp_path / "t.duckdb"))
+    c = FakeClient()
+    await idx.refresh(c)
+    assert not await idx.refresh(c)
+    c.listed = c.listed[1:] + [{"id": "solana", "symbol": "sol", "name": "Solana"}]
+    assert await idx.refresh(c, force=True)
+    idx.load()
+    assert idx.resolve(["sol", "eth"]) == {"SOL": "solana", "ETH": "ethereum"}
@@ -0,0 +1,40 @@
+import duckdb
+from certus.storage.upsert import bulk_upsert
+
+def _con():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE news (id VARCHAR PRIMARY KEY, title VARCHAR, raw JSON, "
+                "ingested_at TIMESTAMP DEFAULT now())")
+    con.execute("CREATE TABLE quotes (symbol VARCHAR, price DOUBLE, ingested_at TIMESTAMP DEFAULT now())")
+    return con
+
+def test_primary_key_upsert_is_idempotent_and_last_wins():
+    con = _con()
+    rows = [{"id": "1", "title": "a", "raw": {"k": 1}}, {"id": "2", "title": "b", "raw": None},
+            {"id": "1", "title": "a2", "raw": {"k": 2}}]
+    assert bulk_upsert(con, "news", rows, ["id"], json_cols=["raw"]) == 2
+    bulk_upsert(con, "news", rows, ["id"], json_cols=["raw"])
+    got = con.execute("SELECT id, title, raw->>'k' FROM news ORDER BY id").fetchall()
+    assert got == [("1", "a2", "2"), ("2", "b", None)]
+
+def test_keyless_table_uses_delete_insert_and_refreshes_stamp():
+    con = _con()
+    bulk_upsert(con, "quotes", [{"symbol": "AAPL", "price": 1.0}], ["symbol"])
+    con.execute("UPDATE quotes SET ingested_at = TIMESTAMP '2000-01-01'")
+    bulk_upsert(con, "quotes", [{"symbol": "AAPL", "price": 2.0}, {"symbol": "MSFT", "price": 3.0}], ["symbol"])
+    got = con.execute("SELECT symbol, price, year(ingested_at) > 2000 FROM quotes ORDER BY 1").fetchall()
+    assert got == [("AAPL", 2.0, True), ("MSFT", 3.0, True)]
+
+def test_thousands_of_rows_in_one_pass():
+    con = _con()
+    rows = [{"id": str(i), "title": f"t{i}", "raw": {"i": i}} for i in range(5000)]
+    con.execute("BEGIN")
+    assert bulk_upsert(con, "news", rows, ["id"], json_cols=["raw"]) == 5000
+    con.execute("COMMIT")
+    # replaying an overlapping batch replaces in place instead of adding rows
+    more = [{"id": str(i), "title": f"u{i}", "raw": {"i": -i}} for i in range(4000, 6000)]
+    assert bulk_upsert(con, "news", more, ["id"], json_cols=["raw"]) == 2000
+    got = con.execute("SELECT count(*), count(*) FILTER (title LIKE 'u%'), sum((raw->>'i')::INT) "
+                      "FROM news").fetchone()
+    assert got == (6000, 2000, sum(range(4000)) - sum(range(4000, 6000)))
+    assert con.execute("SELECT count(*) FROM duckdb_tables() WHERE table_name LIKE '_upsert_%'").fetchone()[0] == 0